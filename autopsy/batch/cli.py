@@ -0,0 +1,293 @@
+"""
+Headless batch runner: python -m autopsy.batch config.json [config.json ...]
+
+Runs merge_batches for each config without importing the Qt GUI, so it can be
+used from cron jobs and CI.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from autopsy.core.pdf_batch_backends import DEFAULT_BACKEND, MERGE_BACKENDS, backend_class
+from autopsy.core.pdf_batch_events import (
+    BATCH_FINISHED, ERROR, FILE_SKIPPED, PAGE_ADDED, STATUS_FAILED, STATUS_WRITTEN, STATUS_UP_TO_DATE, STATUS_CANCELLED
+)
+from autopsy.core.pdf_batch_fanout import expand_directories, fan_out, summarize_by_directory
+from autopsy.core.pdf_batch_journal import iter_checkpointed_events, journal_path_for
+from autopsy.core.pdf_batch_planner import format_page_ranges, plan_batches
+from autopsy.core.pdf_batch_watch import BatchWatcher, DEFAULT_DEBOUNCE
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m autopsy.batch",
+        description="Merge the batches of one or more Autopsy config.json files.",
+    )
+    parser.add_argument("configs", nargs="+", metavar="CONFIG", help="batch config JSON file(s)")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of batches merged in parallel (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true",
+        help="resolve patterns and page ranges and estimate each output without writing anything",
+    )
+    parser.add_argument("-f", "--force", action="store_true", help="rebuild outputs even if they are up to date")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="write outputs page by page to keep memory flat for very large batches",
+    )
+    parser.add_argument(
+        "--backend", choices=sorted(MERGE_BACKENDS), default=None,
+        help=f"merge backend for batches that do not set one (default: {DEFAULT_BACKEND})",
+    )
+    parser.add_argument(
+        "--no-links", dest="links", action="store_false",
+        help="with the fitz backend, do not copy link annotations; copying links dominates its run time, "
+             "so fitz is only faster than pypdf2 with this flag",
+    )
+    parser.add_argument(
+        "--dedupe", action="store_true",
+        help="store byte-identical fonts, images and other resources of each output once",
+    )
+    parser.add_argument(
+        "--fan-out", action="append", metavar="DIRS", default=[],
+        help="treat each config as a template and run it for every directory (a path, a glob such as "
+             "'/jobs/A04*', or @file with one per line); output names are derived with the config's "
+             "slice_start/slice_end/release_pattern. Repeatable.",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue an interrupted run: skip batches the checkpoint journal lists as completed",
+    )
+    parser.add_argument(
+        "--journal", metavar="PATH",
+        help="checkpoint journal file (default: CONFIG.journal next to each config)",
+    )
+    parser.add_argument(
+        "-w", "--watch", action="store_true",
+        help="after the first run, keep watching the working directories and rebuild affected batches",
+    )
+    parser.add_argument(
+        "--poll", action="store_true",
+        help="with --watch, poll the directories instead of using file system events",
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=DEFAULT_DEBOUNCE,
+        help=f"with --watch, seconds without changes before rebuilding (default: {DEFAULT_DEBOUNCE})",
+    )
+    parser.add_argument("--json", action="store_true", help="print progress as JSON lines")
+    parser.add_argument(
+        "--page-events", action="store_true",
+        help="also report every page added (one record per page in --json mode)",
+    )
+    return parser
+
+
+class Reporter:
+    """Prints run progress either as plain text or as JSON lines on stdout."""
+
+    def __init__(self, json_lines, stream=None):
+        self.json_lines = json_lines
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()  # watchers report from their own threads
+
+    def emit(self, event, text=None, **fields):
+        with self._lock:
+            if self.json_lines:
+                record = {"event": event, "time": round(time.time(), 3)}
+                record.update(fields)
+                self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            elif text is not None:
+                self.stream.write(text + "\n")
+            self.stream.flush()
+
+
+def load_config(path):
+    with open(path, "r") as f:
+        config_data = json.load(f)
+    if not isinstance(config_data, list):
+        raise ValueError("config must be a JSON list of batches")
+    return config_data
+
+
+def dry_run(config_path, config_data, reporter, force=False, backend=None, streaming=False, links=True, dedupe=False):
+    """
+    Report what each batch would do without writing anything; returns False if a real
+    run would fail or miss pages: a batch that cannot be planned, an unreadable input
+    or a pattern that matches nothing.
+    """
+    ok = True
+    for plan in plan_batches(config_data, force, backend, streaming, links, dedupe):
+        if plan.error:
+            ok = False
+            reporter.emit(
+                "batch_planned", f"❌ Batch {plan.batch_number}: {plan.error}",
+                config=config_path, **plan.to_dict()
+            )
+            continue
+        status = "up to date" if plan.up_to_date else "would build"
+        lines = [
+            f"Batch {plan.batch_number} -> {plan.output_path} ({status}): {plan.total_pages} page(s), "
+            f"~{plan.estimated_bytes / (1024 * 1024):.1f} MB, ~{plan.estimated_seconds:.1f}s with {plan.backend} "
+            f"(rough estimate)"
+        ]
+        for planned in plan.files:
+            if planned.error:
+                ok = False
+                lines.append(f"  ❌ {planned.path}: {planned.error}")
+            else:
+                lines.append(
+                    f"  {planned.path} [{planned.pattern!r}]: pages {format_page_ranges(planned.pages) or 'none'}"
+                    f" of {planned.page_count}"
+                )
+        lines.extend(f"  ❌ No PDF files found for pattern {pattern!r}" for pattern in plan.empty_patterns)
+        if plan.empty_patterns:
+            ok = False
+        reporter.emit("batch_planned", "\n".join(lines), config=config_path, **plan.to_dict())
+    return ok
+
+
+def run_config(config_path, config_data, reporter, jobs, force=False, page_events=False, streaming=False,
+               backend=None, links=True, dedupe=False, journal_path=None, resume=False, finished=None,
+               reset_journals=None):
+    """
+    Run one config with checkpointing; returns False if anything failed.
+
+    reset_journals is the set of journal paths already reset in this invocation:
+    a journal shared by several configs (--journal) is reset once, so later configs
+    do not erase the checkpoints of earlier ones.
+    """
+    ok = True
+    journal_path = os.path.abspath(journal_path or journal_path_for(config_path))
+    reset = reset_journals is None or journal_path not in reset_journals
+    if reset_journals is not None and not resume:
+        reset_journals.add(journal_path)
+    for event in iter_checkpointed_events(
+        config_data, journal_path, resume, reset,
+        max_workers=jobs or None, force=force, streaming=streaming, backend=backend, links=links, dedupe=dedupe
+    ):
+        ok = report_event(reporter, config_path, event, page_events) and ok
+        if finished is not None and event.kind == BATCH_FINISHED:
+            finished.append(event)
+    return ok
+
+
+def report_fan_out(config_path, config_data, finished, reporter):
+    """Emit one aggregated line per fanned-out directory."""
+    for directory, totals in summarize_by_directory(config_data, finished).items():
+        counts = {status: totals.get(status, 0) for status in (
+            STATUS_WRITTEN, STATUS_UP_TO_DATE, STATUS_CANCELLED, STATUS_FAILED
+        )}
+        reporter.emit(
+            "directory_finished",
+            f"{'❌' if counts[STATUS_FAILED] else '✅'} {directory}: {counts[STATUS_WRITTEN]} written, "
+            f"{counts[STATUS_UP_TO_DATE]} up to date, {counts[STATUS_FAILED]} failed, {totals['pages']} page(s)",
+            config=config_path, directory=directory, pages=totals["pages"], bytes=totals["bytes"], **counts,
+        )
+
+
+def report_event(reporter, config_path, event, page_events=False):
+    """
+    Emit one BatchEvent; returns False if it marks a failed or incomplete batch.
+
+    Besides a failed batch, any ERROR and any input file that was skipped because it
+    was missing or unreadable counts, since the output then lacks pages.
+    """
+    if event.kind == PAGE_ADDED and not page_events:
+        return True
+    if event.kind == BATCH_FINISHED:
+        text = "-" * 50
+    else:
+        text = event.message or None
+    fields = event.to_dict()
+    fields.pop("kind")
+    fields["elapsed"] = round(fields["elapsed"], 4)
+    reporter.emit(event.kind, text, config=config_path, **fields)
+    if event.kind == ERROR or (event.kind == FILE_SKIPPED and event.path):
+        return False
+    return not (event.kind == BATCH_FINISHED and event.status == STATUS_FAILED)
+
+
+def watch_configs(configs, reporter, args):
+    """Watch every loaded config until interrupted (Ctrl+C)."""
+    watchers = []
+    for config_path, config_data in configs:
+        watcher = BatchWatcher(
+            config_data,
+            on_event=lambda event, path=config_path: report_event(reporter, path, event, args.page_events),
+            debounce=args.debounce, polling=args.poll,
+            max_workers=args.jobs or None, streaming=args.stream, backend=args.backend, links=args.links,
+            dedupe=args.dedupe,
+        )
+        watchers.append(watcher)
+        reporter.emit(
+            "watch_started", f"👀 Watching {len(watcher.directories)} directories of {config_path} ({watcher.mode})",
+            config=config_path, directories=sorted(watcher.directories.values()), mode=watcher.mode,
+        )
+        watcher.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for watcher in watchers:
+            watcher.stop()
+        reporter.emit("watch_stopped", "Stopped watching.")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.stream and args.backend and not backend_class(args.backend).supports_streaming:
+        parser.error(f"--stream is not supported by the {args.backend} backend")
+    reporter = Reporter(args.json)
+    ok = True
+    start = time.perf_counter()
+    loaded = []
+    reset_journals = set()
+    for config_path in args.configs:
+        try:
+            config_data = load_config(config_path)
+        except (OSError, ValueError) as e:
+            reporter.emit("config_error", f"❌ Error loading config {config_path}: {e}", config=config_path, error=str(e))
+            ok = False
+            continue
+        if args.fan_out:
+            try:
+                directories = expand_directories(args.fan_out)
+                config_data = fan_out(config_data, directories)
+            except (OSError, ValueError) as e:
+                reporter.emit("config_error", f"❌ Error fanning out {config_path}: {e}", config=config_path, error=str(e))
+                ok = False
+                continue
+            reporter.emit(
+                "fan_out", f"Fanning {config_path} out to {len(directories)} directories",
+                config=config_path, directories=directories,
+            )
+        loaded.append((config_path, config_data))
+        reporter.emit(
+            "config_started", f"Running {config_path} ({len(config_data)} batches)",
+            config=config_path, batches=len(config_data), dry_run=args.dry_run,
+        )
+        if args.dry_run:
+            config_ok = dry_run(
+                config_path, config_data, reporter, args.force, args.backend, args.stream, args.links, args.dedupe
+            )
+        else:
+            finished = []
+            config_ok = run_config(
+                config_path, config_data, reporter, args.jobs, args.force, args.page_events, args.stream, args.backend,
+                args.links, args.dedupe, args.journal, args.resume, finished, reset_journals
+            )
+            if args.fan_out:
+                report_fan_out(config_path, config_data, finished, reporter)
+        ok = ok and config_ok
+    elapsed = time.perf_counter() - start
+    reporter.emit("run_finished", f"Done in {elapsed:.2f}s", ok=ok, elapsed=round(elapsed, 3))
+    if args.watch and not args.dry_run and loaded:
+        watch_configs(loaded, reporter, args)
+    return 0 if ok else 1
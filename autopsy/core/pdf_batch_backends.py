@@ -0,0 +1,224 @@
+import os
+from PyPDF2 import PdfReader, PdfWriter
+from autopsy.core.pdf_batch_cache import PdfReaderCache, DEFAULT_CACHE_BYTES
+from autopsy.core.pdf_dedupe import dedupe_writer_objects
+from autopsy.core.pdf_fitz_utils import dedupe_fitz_objects
+from autopsy.core.pdf_io_utils import coalesce_page_runs, write_atomically
+from autopsy.core.pdf_stream_writer import StreamingPdfWriter
+
+DEFAULT_BACKEND = "pypdf2"
+
+
+class BufferedPdfOutput:
+    """Collects pages in a PdfWriter and writes the output in one go when committed."""
+    release_sources = False
+
+    def __init__(self, output_path, dedupe=False):
+        self.output_path = output_path
+        self.dedupe = dedupe
+        self.saved_bytes = 0
+        self.writer = PdfWriter()
+
+    def add_page(self, page):
+        self.writer.add_page(page)
+
+    def add_pages(self, reader, start, stop):
+        for page_num in range(start, stop):
+            self.add_page(reader.pages[page_num])
+
+    def commit(self):
+        if self.dedupe:
+            self.saved_bytes = dedupe_writer_objects(self.writer)
+        write_atomically(self.output_path, self.writer.write)
+
+    def abort(self):
+        self.writer = None
+
+
+class StreamingPdfOutput(StreamingPdfWriter):
+    """
+    StreamingPdfWriter with the page-run interface used by the merge backends.
+
+    release_sources tells the batch to drop each source from the reader cache once
+    its pages are written: a PdfReader holds the whole file and every object it has
+    resolved, so keeping them cached would let memory grow with the inputs again.
+    """
+    release_sources = True
+
+    def add_pages(self, reader, start, stop):
+        for page_num in range(start, stop):
+            self.add_page(reader.pages[page_num])
+
+
+class FitzPdfOutput:
+    """Assembles the output with PyMuPDF, copying whole page runs per call."""
+    release_sources = False
+
+    def __init__(self, output_path, links=True, dedupe=False):
+        import fitz  # PyMuPDF; imported lazily to keep headless startup fast
+        self.output_path = output_path
+        self.links = links
+        self.dedupe = dedupe
+        self.saved_bytes = 0
+        self.doc = fitz.open()
+
+    def add_pages(self, src_doc, start, stop):
+        # final=False keeps the graft map, so fonts and images shared by several
+        # runs of the same source are copied only once. Re-targeting links is done
+        # page by page in Python and dominates the copy time on large drawing sets.
+        self.doc.insert_pdf(src_doc, from_page=start, to_page=stop - 1, final=False, links=self.links)
+
+    def commit(self):
+        tmp_path = self.output_path + ".tmp"
+        try:
+            if self.dedupe:
+                self.saved_bytes = dedupe_fitz_objects(self.doc)
+            self.doc.save(tmp_path, garbage=1, deflate=True)
+            self.doc.close()
+            with open(tmp_path, "rb+") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.output_path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        if not self.doc.is_closed:
+            self.doc.close()
+        tmp_path = self.output_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class MergeBackend:
+    """
+    How a batch opens its source PDFs and copies pages into the output.
+
+    Each backend keeps a run-scoped cache of opened source documents. Backends with
+    coalesce set copy runs of consecutive pages in a single call; the others are fed
+    one page at a time so errors and cancellation stay per page.
+    """
+    name = None
+    coalesce = False
+    supports_streaming = False
+
+    def __init__(self, cache_bytes=DEFAULT_CACHE_BYTES):
+        self.sources = PdfReaderCache(max_bytes=cache_bytes, opener=self.open_document)
+
+    def open_document(self, path):
+        raise NotImplementedError
+
+    def page_count(self, doc):
+        raise NotImplementedError
+
+    def open_output(self, output_path, streaming=False, links=True, dedupe=False):
+        raise NotImplementedError
+
+    @classmethod
+    def output_options(cls, streaming=False, links=True, dedupe=False):
+        """The merge options that change this backend's output bytes, as recorded in build manifests."""
+        return {"backend": cls.name, "dedupe": bool(dedupe)}
+
+    def open(self, path):
+        return self.sources.get(path)
+
+    def release(self, path):
+        """Forget the cached source document of path; it is parsed again if needed later."""
+        self.sources.discard(path)
+
+    def page_runs(self, pages):
+        if self.coalesce:
+            return coalesce_page_runs(pages)
+        return [(page, page + 1) for page in pages]
+
+    def close(self):
+        self.sources.clear()
+
+
+class PyPDF2Backend(MergeBackend):
+    """Pure-Python backend; the only one that supports the streaming writer."""
+    name = "pypdf2"
+    supports_streaming = True
+
+    def open_document(self, path):
+        return PdfReader(path)
+
+    def page_count(self, doc):
+        return len(doc.pages)
+
+    @classmethod
+    def output_options(cls, streaming=False, links=True, dedupe=False):
+        options = super().output_options(streaming, links, dedupe)
+        options["streaming"] = bool(streaming)
+        return options
+
+    def open_output(self, output_path, streaming=False, links=True, dedupe=False):
+        if streaming:
+            return StreamingPdfOutput(output_path, dedupe)
+        return BufferedPdfOutput(output_path, dedupe)
+
+
+class FitzBackend(MergeBackend):
+    """
+    PyMuPDF backend: pages are copied by insert_pdf page ranges in C.
+
+    The output is assembled in memory by MuPDF, so streaming is not available here.
+    Copying link annotations dominates the copy time: with links this backend is no
+    faster than pypdf2, without them (links=False on the output) it is several times
+    faster.
+    """
+    name = "fitz"
+    coalesce = True
+
+    def open_document(self, path):
+        import fitz
+        return fitz.open(path)
+
+    def page_count(self, doc):
+        return doc.page_count
+
+    @classmethod
+    def output_options(cls, streaming=False, links=True, dedupe=False):
+        options = super().output_options(streaming, links, dedupe)
+        options["links"] = bool(links)
+        return options
+
+    def open_output(self, output_path, streaming=False, links=True, dedupe=False):
+        return FitzPdfOutput(output_path, links, dedupe)
+
+
+MERGE_BACKENDS = {
+    PyPDF2Backend.name: PyPDF2Backend,
+    FitzBackend.name: FitzBackend,
+    "pymupdf": FitzBackend,
+}
+
+
+def backend_class(name=None):
+    """Return the MergeBackend class registered as name (the default backend for None)."""
+    name = (name or DEFAULT_BACKEND).lower()
+    if name not in MERGE_BACKENDS:
+        raise ValueError(f"Unknown merge backend '{name}'. Choose from: {', '.join(sorted(MERGE_BACKENDS))}")
+    return MERGE_BACKENDS[name]
+
+
+class BackendPool:
+    """Run-scoped merge backends, created on first use and each with its own source cache."""
+
+    def __init__(self, cache_bytes=DEFAULT_CACHE_BYTES, default=DEFAULT_BACKEND):
+        self.cache_bytes = cache_bytes
+        self.default = default
+        self._backends = {}
+
+    def get(self, name=None):
+        backend_cls = backend_class(name or self.default)
+        backend = self._backends.get(backend_cls.name)
+        if backend is None:
+            backend = backend_cls(self.cache_bytes)
+            self._backends[backend_cls.name] = backend
+        return backend
+
+    def close(self):
+        for backend in self._backends.values():
+            backend.close()
+        self._backends.clear()
@@ -0,0 +1,123 @@
+import os
+from collections import OrderedDict
+from PyPDF2 import PdfReader
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024  # 512 MB of source PDFs kept open per run
+
+
+class PdfReaderCache:
+    """
+    Run-scoped LRU cache of parsed PDF readers.
+
+    Readers are keyed by (path, size, mtime) so a file that changes on disk during a
+    run is parsed again instead of serving stale pages. The memory bound is expressed
+    in bytes of source file size, which is a reasonable proxy for the size of the
+    parsed object tables; the least recently used readers are dropped first.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, opener=PdfReader):
+        self.max_bytes = max_bytes
+        self.opener = opener
+        self._readers = OrderedDict()  # key -> (reader, size)
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(path):
+        stat = os.stat(path)
+        return (os.path.normcase(os.path.abspath(path)), stat.st_size, stat.st_mtime_ns)
+
+    def get(self, path):
+        """Return a reader for path, opening and parsing the file only on a cache miss."""
+        key = self.make_key(path)
+        entry = self._readers.get(key)
+        if entry is not None:
+            self._readers.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        reader = self.opener(path)
+        size = key[1]
+        self._readers[key] = (reader, size)
+        self._total_bytes += size
+        self._evict()
+        return reader
+
+    def _evict(self):
+        # Always keep the most recently opened reader, even if it alone exceeds the bound.
+        while self._total_bytes > self.max_bytes and len(self._readers) > 1:
+            _, (reader, size) = self._readers.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            close = getattr(reader, "close", None)
+            if close:
+                close()
+
+    def discard(self, path):
+        """Drop the reader of path, if cached, so its parsed objects can be freed."""
+        try:
+            key = self.make_key(path)
+        except OSError:
+            return
+        entry = self._readers.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+            close = getattr(entry[0], "close", None)
+            if close:
+                close()
+
+    def clear(self):
+        while self._readers:
+            _, (reader, _) = self._readers.popitem(last=False)
+            close = getattr(reader, "close", None)
+            if close:
+                close()
+        self._total_bytes = 0
+
+    def __len__(self):
+        return len(self._readers)
+
+
+class DirectoryIndex:
+    """
+    Snapshot of the PDF files in one directory, taken with a single os.scandir.
+
+    Names are sorted once and their lowercased form is cached so pattern matching
+    does not rebuild strings for every pattern.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        entries = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                lower_name = entry.name.lower()
+                if lower_name.endswith(".pdf") and entry.is_file():
+                    entries.append((entry.name, lower_name))
+        entries.sort()
+        self.entries = entries
+
+    def match(self, matcher):
+        """Return sorted absolute paths of the files accepted by matcher(name, lower_name)."""
+        return [os.path.join(self.directory, name) for name, lower_name in self.entries if matcher(name, lower_name)]
+
+
+class DirectoryIndexCache:
+    """Per-run cache of DirectoryIndex objects keyed by directory."""
+
+    def __init__(self):
+        self._indexes = {}
+
+    def get(self, directory):
+        key = os.path.normcase(os.path.abspath(directory))
+        index = self._indexes.get(key)
+        if index is None:
+            index = DirectoryIndex(directory)
+            self._indexes[key] = index
+        return index
+
+    def invalidate(self, directory):
+        self._indexes.pop(os.path.normcase(os.path.abspath(directory)), None)
@@ -1,7 +1,18 @@
 import os
 import glob
 import re
+import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PyPDF2 import PdfReader, PdfWriter
+from autopsy.core.pdf_batch_backends import BackendPool, backend_class
+from autopsy.core.pdf_batch_events import (
+    BatchEvent, BATCH_STARTED, FILE_MATCHED, PAGE_ADDED, FILE_SKIPPED, WARNING, ERROR, BATCH_WRITTEN,
+    BATCH_UP_TO_DATE, BATCH_CANCELLED, BATCH_FINISHED,
+    STATUS_WRITTEN, STATUS_UP_TO_DATE, STATUS_CANCELLED, STATUS_FAILED
+)
+from autopsy.core.pdf_batch_manifest import build_fingerprint, is_up_to_date, load_manifest, write_manifest
+from autopsy.core.pdf_batch_cache import DirectoryIndex, DirectoryIndexCache, DEFAULT_CACHE_BYTES
 
 def parse_page_ranges(page_range_str, total_pages):
     pages = set()
@@ -32,10 +43,11 @@ def parse_page_ranges(page_range_str, total_pages):
     return pages
 
 
-def get_matching_files(directory, pattern):
+@lru_cache(maxsize=None)
+def compile_pattern(pattern):
     """
-    Returns a sorted list of absolute paths for files in `directory` that match the given pattern.
-    
+    Compile a file pattern into a matcher(name, lower_name) -> bool.
+
     Matching rules:
     - If pattern starts with "=": Exact match (case-insensitive).
     - If pattern starts with "^": File name starts with the given string (case-insensitive).
@@ -43,27 +55,40 @@ def get_matching_files(directory, pattern):
     - If pattern starts with "~": Treat the rest as a regex pattern (case-insensitive).
     - If pattern starts and ends with "*": Contains match (same as default, but asterisks are stripped).
     - Otherwise, default to contains match (case-insensitive).
-    Only files ending with ".pdf" are returned.
+    Compiled matchers are cached, so each distinct pattern of a config is compiled once.
     """
-    files = sorted(os.listdir(directory))
     pattern = pattern.strip()
-    
+
     if pattern.startswith("="):
-        match_func = lambda f: f.lower() == pattern[1:].lower()
+        needle = pattern[1:].lower()
+        return lambda f, lf: lf == needle
     elif pattern.startswith("^"):
-        match_func = lambda f: f.lower().startswith(pattern[1:].lower())
+        needle = pattern[1:].lower()
+        return lambda f, lf: lf.startswith(needle)
     elif pattern.startswith("$"):
-        match_func = lambda f: f.lower().endswith(pattern[1:].lower())
+        needle = pattern[1:].lower()
+        return lambda f, lf: lf.endswith(needle)
     elif pattern.startswith("~"):
         regex = re.compile(pattern[1:], re.IGNORECASE)
-        match_func = lambda f: bool(regex.search(f))
+        return lambda f, lf: bool(regex.search(f))
     elif pattern.startswith("*") and pattern.endswith("*"):
-        core = pattern.strip("*")
-        match_func = lambda f: core.lower() in f.lower()
+        needle = pattern.strip("*").lower()
+        return lambda f, lf: needle in lf
     else:
-        match_func = lambda f: pattern.lower() in f.lower()
-    
-    return sorted([os.path.join(directory, f) for f in files if match_func(f) and f.lower().endswith(".pdf")])
+        needle = pattern.lower()
+        return lambda f, lf: needle in lf
+
+
+def get_matching_files(directory, pattern, dir_indexes=None):
+    """
+    Returns a sorted list of absolute paths for files in `directory` that match the given pattern.
+
+    See compile_pattern for the matching rules. Only files ending with ".pdf" are returned.
+    When a DirectoryIndexCache is given, the directory is listed once per run instead of
+    once per pattern.
+    """
+    index = dir_indexes.get(directory) if dir_indexes is not None else DirectoryIndex(directory)
+    return index.match(compile_pattern(pattern))
 
 def parse_page_selection(page_input):
     pages = set()
@@ -90,74 +115,377 @@ def process_pages(reader, include_pages, exclude_pages):
             writer.add_page(reader.pages[i])
     return writer
 
-def merge_batches(config_data):
-    results = []
-    for batch in config_data:
-        working_dir = batch["working_directory"]
-        output_name = batch["output_name"]
-        output_path = os.path.join(working_dir, f"{output_name}.pdf")
-        pdf_writer = PdfWriter()
-        for file_config in sorted(batch["files"], key=lambda x: x["sequence"]):
+def select_pages(file_config, total_pages):
+    """Return the sorted 0-based pages a file config's include/exclude ranges select."""
+    include = file_config["include"]
+    exclude = file_config["exclude"]
+    include_pages = parse_page_ranges(include, total_pages) if include else set(range(total_pages))
+    exclude_pages = parse_page_ranges(exclude, total_pages) if exclude else set()
+    return sorted(include_pages - exclude_pages)
+
+
+def get_output_path(batch):
+    """Return the absolute output path a batch writes its merged PDF to."""
+    return os.path.abspath(os.path.join(batch["working_directory"], f"{batch['output_name']}.pdf"))
+
+
+def batch_output_options(batch, streaming=False, backend=None, links=True, dedupe=False):
+    """
+    Return the output-affecting merge options of a batch, as stored in its fingerprint.
+
+    The batch's own "backend", "streaming", "links" and "dedupe" keys override the
+    run-wide values. Raises ValueError for an unknown backend.
+    """
+    return backend_class(batch.get("backend", backend)).output_options(
+        batch.get("streaming", streaming), batch.get("links", links), batch.get("dedupe", dedupe)
+    )
+
+
+def resolve_batch_files(batch, dir_indexes=None):
+    """
+    Resolve the file patterns of a batch in merge order.
+
+    Returns a list of (file_config, pdf_files) sorted by sequence. The batch's own
+    output file is never treated as one of its inputs.
+    """
+    working_dir = batch["working_directory"]
+    output_key = os.path.normcase(get_output_path(batch))
+    resolved = []
+    for file_config in sorted(batch["files"], key=lambda x: x["sequence"]):
+        pdf_files = [
+            f for f in get_matching_files(working_dir, file_config["pattern"], dir_indexes)
+            if os.path.normcase(os.path.abspath(f)) != output_key
+        ]
+        resolved.append((file_config, pdf_files))
+    return resolved
+
+
+def iter_batch_events(batch, backends=None, dir_indexes=None, force=False, cancel_event=None,
+                      streaming=False, backend=None, links=True, dedupe=False):
+    """
+    Merge the files of a single batch into its output PDF, yielding BatchEvent records.
+
+    backends is the run's BackendPool; its backends cache opened source documents, so
+    a file pulled in by several patterns or batches is only parsed once. dir_indexes is
+    the run's DirectoryIndexCache, so each working directory is listed once.
+    backend names the merge backend ("pypdf2" or "fitz"); a "backend" key in the batch
+    overrides it. links=False (or "links": false) lets the fitz backend skip copying
+    link annotations. dedupe (or "dedupe": true) stores byte-identical fonts, images
+    and other resources of the output once; the bytes saved are reported on
+    BATCH_WRITTEN and BATCH_FINISHED.
+    A build manifest is kept next to the output; unless force is set, the batch is
+    skipped when its spec, input files and output-affecting options (backend, dedupe,
+    and per backend streaming or links) are unchanged since the last build.
+    Setting cancel_event (a threading.Event) stops the batch between pages; the output
+    file is then left untouched. The last event is always BATCH_FINISHED.
+
+    With streaming (or "streaming": true in the batch) pages are written to a temp
+    file as they are added, and each source is dropped from the reader cache once its
+    pages are written, so memory stays flat for very large outputs; otherwise the
+    whole output is assembled in a PdfWriter first. Only the pypdf2 backend streams;
+    asking another backend to stream yields a WARNING and builds the output in memory.
+    """
+    if backends is None:
+        backends = BackendPool()
+    if dir_indexes is None:
+        dir_indexes = DirectoryIndexCache()
+    batch_number = batch["batch_number"]
+    working_dir = batch["working_directory"]
+    output_path = get_output_path(batch)
+    start = time.perf_counter()
+
+    def event(kind, message="", **fields):
+        return BatchEvent(kind, batch_number, message, elapsed=time.perf_counter() - start, **fields)
+
+    yield event(BATCH_STARTED, path=output_path)
+    try:
+        merge_backend = backends.get(batch.get("backend", backend))
+    except ValueError as e:
+        yield event(ERROR, f"❌ Error merging batch {batch_number}: {str(e)}", path=output_path)
+        yield event(BATCH_FINISHED, path=output_path, status=STATUS_FAILED)
+        return
+    streaming = batch.get("streaming", streaming)
+    links = batch.get("links", links)
+    dedupe = batch.get("dedupe", dedupe)
+    if streaming and not merge_backend.supports_streaming:
+        yield event(
+            WARNING, f"⚠️ Batch {batch_number}: the {merge_backend.name} backend cannot stream; "
+                     f"the output is assembled in memory.", path=output_path
+        )
+    resolved = resolve_batch_files(batch, dir_indexes)
+
+    try:
+        manifest = load_manifest(output_path)
+        fingerprint = build_fingerprint(
+            batch, [f for _, pdf_files in resolved for f in pdf_files], manifest,
+            merge_backend.output_options(streaming, links, dedupe)
+        )
+    except Exception as e:
+        # Without a fingerprint the batch is simply always rebuilt.
+        yield event(ERROR, f"❌ Could not fingerprint batch {batch_number}: {str(e)}")
+        fingerprint = manifest = None
+    if not force and fingerprint and is_up_to_date(output_path, fingerprint, manifest):
+        yield event(
+            BATCH_UP_TO_DATE, f"⏭️ Batch {batch_number} is up to date: {output_path}",
+            path=output_path, bytes=os.path.getsize(output_path)
+        )
+        yield event(BATCH_FINISHED, path=output_path, status=STATUS_UP_TO_DATE)
+        return
+
+    try:
+        output = merge_backend.open_output(output_path, streaming, links, dedupe)
+    except (OSError, ValueError) as e:
+        yield event(ERROR, f"❌ Error merging batch {batch_number}: {str(e)}", path=output_path)
+        yield event(BATCH_FINISHED, path=output_path, status=STATUS_FAILED)
+        return
+
+    had_errors = False
+    cancelled = False
+    committed = False
+    total_pages = 0
+    try:
+        for file_config, pdf_files in resolved:
+            if cancelled:
+                break
             pattern = file_config["pattern"]
-            include = file_config["include"]
-            exclude = file_config["exclude"]
-            pdf_files = get_matching_files(working_dir, pattern)
-            
+
             # Log if no files found for this pattern:
             if not pdf_files:
-                msg = f"❌ No PDF files found for pattern '{pattern}' in {working_dir}. Skipped."
-                print(msg)
-                results.append(msg)
+                yield event(
+                    FILE_SKIPPED, f"❌ No PDF files found for pattern '{pattern}' in {working_dir}. Skipped.",
+                    pattern=pattern
+                )
                 continue
 
             for pdf_file in pdf_files:
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+                    break
+
                 # Ensure only PDF files are processed:
                 if not pdf_file.lower().endswith(".pdf"):
-                    msg = f"❌ Skipping non-PDF file: {pdf_file}"
-                    print(msg)
-                    results.append(msg)
+                    yield event(FILE_SKIPPED, f"❌ Skipping non-PDF file: {pdf_file}", path=pdf_file, pattern=pattern)
                     continue
 
                 # Check if the file exists and is a file:
                 if not os.path.isfile(pdf_file):
-                    msg = f"❌ File not found: {pdf_file}. Skipped."
-                    print(msg)
-                    results.append(msg)
+                    had_errors = True
+                    yield event(FILE_SKIPPED, f"❌ File not found: {pdf_file}. Skipped.", path=pdf_file, pattern=pattern)
                     continue
 
                 try:
-                    reader = PdfReader(pdf_file)
+                    source = merge_backend.open(pdf_file)
+                    file_pages = merge_backend.page_count(source)
                 except Exception as e:
-                    msg = f"❌ Error reading {pdf_file}: {str(e)}. Skipped."
-                    print(msg)
-                    results.append(msg)
+                    had_errors = True
+                    yield event(
+                        FILE_SKIPPED, f"❌ Error reading {pdf_file}: {str(e)}. Skipped.", path=pdf_file, pattern=pattern
+                    )
                     continue
 
-                total_pages = len(reader.pages)
-                include_pages = parse_page_ranges(include, total_pages) if include else set(range(total_pages))
-                exclude_pages = parse_page_ranges(exclude, total_pages) if exclude else set()
-                pages_to_merge = sorted(include_pages - exclude_pages)
-                for page_num in pages_to_merge:
+                pages_to_merge = select_pages(file_config, file_pages)
+                yield event(
+                    FILE_MATCHED, f"📄 Batch {batch_number}: adding {len(pages_to_merge)} page(s) from {pdf_file}",
+                    path=pdf_file, pattern=pattern, pages=len(pages_to_merge), bytes=os.path.getsize(pdf_file)
+                )
+                for start_page, stop_page in merge_backend.page_runs(pages_to_merge):
+                    if cancel_event is not None and cancel_event.is_set():
+                        cancelled = True
+                        break
                     try:
-                        pdf_writer.add_page(reader.pages[page_num])
+                        output.add_pages(source, start_page, stop_page)
+                    except OSError:
+                        # Writing a streamed output failed; every further page would fail too.
+                        raise
                     except Exception as e:
-                        msg = f"❌ Error adding page {page_num+1} of {pdf_file}: {str(e)}"
-                        print(msg)
-                        results.append(msg)
+                        had_errors = True
+                        pages_label = (
+                            f"page {start_page+1}" if stop_page - start_page == 1 else f"pages {start_page+1}-{stop_page}"
+                        )
+                        yield event(ERROR, f"❌ Error adding {pages_label} of {pdf_file}: {str(e)}", path=pdf_file, page=start_page)
+                        continue
+                    for page_num in range(start_page, stop_page):
+                        total_pages += 1
+                        yield event(PAGE_ADDED, path=pdf_file, page=page_num, pages=1)
+                if output.release_sources:
+                    # Streamed pages are on disk already; keeping the parsed source would
+                    # make memory grow with the number of inputs.
+                    merge_backend.release(pdf_file)
+
+        if cancelled:
+            yield event(BATCH_CANCELLED, f"⛔ Batch {batch_number} cancelled. Output not written.", path=output_path)
+            yield event(BATCH_FINISHED, path=output_path, pages=total_pages, status=STATUS_CANCELLED)
+            return
+
+        output.commit()
+        committed = True
+    except Exception as e:
+        yield event(ERROR, f"❌ Error merging batch {batch_number}: {str(e)}", path=output_path)
+        yield event(BATCH_FINISHED, path=output_path, pages=total_pages, status=STATUS_FAILED)
+        return
+    finally:
+        # Covers cancellation, failures and a consumer that stops iterating early.
+        if not committed:
+            output.abort()
+
+    # The new output is part of the directory now; relist it if a later batch needs it.
+    dir_indexes.invalidate(working_dir)
+    output_bytes = os.path.getsize(output_path)
+    saved_bytes = output.saved_bytes
+    message = f"✅ Merged PDF saved: {output_path}"
+    if saved_bytes:
+        message += f" (de-duplication saved {saved_bytes / 1024:.1f} KB)"
+    yield event(
+        BATCH_WRITTEN, message, path=output_path, pages=total_pages, bytes=output_bytes, saved_bytes=saved_bytes
+    )
+    # An incomplete output must be rebuilt next time, so only clean builds get a manifest.
+    if fingerprint and not had_errors:
         try:
-            with open(output_path, "wb") as output_pdf:
-                pdf_writer.write(output_pdf)
-            msg = f"✅ Merged PDF saved: {output_path}"
-            print(msg)
-            results.append(msg)
+            write_manifest(output_path, fingerprint)
         except Exception as e:
-            msg = f"❌ Error merging batch {batch['batch_number']}: {str(e)}"
-            print(msg)
-            results.append(msg)
-        
-        # Append a divider after processing each batch:
-        divider = "-" * 50
-        print(divider)
-        results.append(divider)
-    return results
+            yield event(ERROR, f"❌ Could not write build manifest for batch {batch_number}: {str(e)}", path=output_path)
+
+    yield event(
+        BATCH_FINISHED, path=output_path, pages=total_pages, bytes=output_bytes, status=STATUS_WRITTEN,
+        saved_bytes=saved_bytes
+    )
+
+
+def _reads_output(batch, other):
+    """True if one of batch's file patterns matches the output file other writes."""
+    output_path = get_output_path(other)
+    if os.path.normcase(os.path.abspath(batch["working_directory"])) != os.path.normcase(os.path.dirname(output_path)):
+        return False
+    name = os.path.basename(output_path)
+    return any(compile_pattern(file_config["pattern"])(name, name.lower()) for file_config in batch["files"])
+
+
+def group_batches_by_output(config_data):
+    """
+    Group batches that write to the same output file or read another batch's output.
+
+    Batches inside a group keep their config order and must run one after another,
+    so a batch that merges an earlier batch's output sees it just as in a sequential
+    run; separate groups are independent and can run in parallel.
+    """
+    groups = []
+    for position, batch in enumerate(config_data):
+        output_key = os.path.normcase(get_output_path(batch))
+        linked = [
+            group for group in groups
+            if any(
+                os.path.normcase(get_output_path(other)) == output_key
+                or _reads_output(batch, other) or _reads_output(other, batch)
+                for _, other in group
+            )
+        ]
+        merged = [(position, batch)]
+        for group in linked:
+            merged.extend(group)
+            groups.remove(group)
+        groups.append(sorted(merged, key=lambda item: item[0]))
+    groups.sort(key=lambda group: group[0][0])
+    return [[batch for _, batch in group] for group in groups]
+
+
+_worker_backends = None
+
+
+def _init_worker(cache_bytes):
+    """Process pool initializer: give each worker its own run-scoped reader cache."""
+    global _worker_backends
+    _worker_backends = BackendPool(cache_bytes)
+
+
+def _merge_batch_group(batches, force=False, streaming=False, backend=None, links=True, dedupe=False):
+    """
+    Worker entry point: merge a group of batches sequentially and return their events.
 
+    Directories are listed afresh for every group: other workers may have written
+    into them since this worker's previous group.
+    """
+    dir_indexes = DirectoryIndexCache()
+    events = []
+    for batch in batches:
+        events.extend(iter_batch_events(batch, _worker_backends, dir_indexes, force,
+                                        streaming=streaming, backend=backend, links=links, dedupe=dedupe))
+    return events
+
+
+def iter_merge_events(config_data, max_workers=1, cache_bytes=DEFAULT_CACHE_BYTES, force=False,
+                      cancel_event=None, streaming=False, backend=None, links=True, dedupe=False):
+    """
+    Run the batches of a config and yield their BatchEvent records.
+
+    With max_workers > 1 (or None for one worker per CPU) independent batches are
+    merged in a process pool. Batches sharing an output path, and batches that read
+    another batch's output, are always serialized in config order.
+    Parsed source PDFs are cached for the whole run (per worker process), bounded by
+    cache_bytes of source file size. Batches whose inputs are unchanged since their
+    last build are skipped unless force is set. streaming selects the memory-bounded
+    writer for every batch, backend picks the merge backend, links=False drops link
+    annotations with the fitz backend and dedupe merges identical resources in each
+    output (see iter_batch_events).
+
+    Sequential runs stream events as they happen and can be cancelled between pages
+    through cancel_event. In a process pool the events of a batch group arrive when
+    the group finishes, and cancelling stops groups that have not started yet.
+    """
+    groups = group_batches_by_output(config_data)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(groups)))
+
+    if max_workers == 1:
+        backends = BackendPool(cache_bytes)
+        dir_indexes = DirectoryIndexCache()
+        try:
+            for batch in config_data:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                yield from iter_batch_events(
+                    batch, backends, dir_indexes, force, cancel_event, streaming, backend, links, dedupe
+                )
+        finally:
+            backends.close()
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(cache_bytes,)) as executor:
+        futures = {executor.submit(_merge_batch_group, group, force, streaming, backend, links, dedupe): group for group in groups}
+        for future in as_completed(futures):
+            try:
+                events = future.result()
+            except Exception as e:
+                events = []
+                for batch in futures[future]:
+                    events.append(BatchEvent(ERROR, batch["batch_number"], f"❌ Error merging batch {batch['batch_number']}: {str(e)}"))
+                    events.append(BatchEvent(BATCH_FINISHED, batch["batch_number"], status=STATUS_FAILED))
+            yield from events
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                break
+
+
+def merge_batches(config_data, max_workers=1, cache_bytes=DEFAULT_CACHE_BYTES, force=False, streaming=False,
+                  backend=None, links=True, dedupe=False):
+    """
+    Run the batches of a config and return their log messages.
+
+    Convenience wrapper around iter_merge_events for callers that only want the
+    printable summary; each batch's messages end with a divider line.
+    """
+    results = []
+    for event in iter_merge_events(
+        config_data, max_workers=max_workers, cache_bytes=cache_bytes, force=force, streaming=streaming,
+        backend=backend, links=links, dedupe=dedupe
+    ):
+        if event.kind == BATCH_FINISHED:
+            msg = "-" * 50
+        elif event.message:
+            msg = event.message
+        else:
+            continue
+        print(msg)
+        results.append(msg)
+    return results
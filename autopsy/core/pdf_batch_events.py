@@ -0,0 +1,47 @@
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+# Event kinds yielded by iter_merge_events, in the order they occur within a batch.
+BATCH_STARTED = "batch_started"
+FILE_MATCHED = "file_matched"
+PAGE_ADDED = "page_added"
+FILE_SKIPPED = "file_skipped"
+WARNING = "warning"
+ERROR = "error"
+BATCH_WRITTEN = "batch_written"
+BATCH_UP_TO_DATE = "batch_up_to_date"
+BATCH_CANCELLED = "batch_cancelled"
+BATCH_FINISHED = "batch_finished"  # always the last event of a batch
+
+# Values of BatchEvent.status on BATCH_FINISHED.
+STATUS_WRITTEN = "written"
+STATUS_UP_TO_DATE = "up_to_date"
+STATUS_CANCELLED = "cancelled"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class BatchEvent:
+    """
+    One step of a batch merge.
+
+    message is the human readable log line (empty for high-volume events such as
+    PAGE_ADDED), elapsed is seconds since the batch started, pages and bytes are
+    the page count and byte size the event refers to. saved_bytes is what resource
+    de-duplication removed from a written output. batch_number is None for events
+    about the run as a whole (such as a checkpoint journal that cannot be written).
+    """
+    kind: str
+    batch_number: Optional[int]
+    message: str = ""
+    path: Optional[str] = None
+    pattern: Optional[str] = None
+    page: Optional[int] = None
+    pages: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    status: Optional[str] = None
+    saved_bytes: int = 0
+
+    def to_dict(self):
+        return asdict(self)
@@ -0,0 +1,158 @@
+import os
+import re
+import copy
+import glob
+from autopsy.core.pdf_batch_core import get_output_path
+
+DEFAULT_SLICE_START = "-7"
+DEFAULT_SLICE_END = "-1"
+DEFAULT_RELEASE_PATTERN = "(REL_)(\\d+)(_.+)"
+
+
+def parse_slice_indices(text):
+    """Parse semicolon separated slice indices such as "-7;4". Raises ValueError on bad input."""
+    return [int(x.strip()) for x in text.split(';') if x.strip() != '']
+
+
+def split_folder_name(directory):
+    """Split a customer folder such as "A031111-2" into its code and release number (or None)."""
+    folder_name = os.path.basename(os.path.normpath(directory))
+    folder_parts = folder_name.split('-')
+    folder_code = folder_parts[0]
+    release_number = folder_parts[1] if len(folder_parts) > 1 else None
+    return folder_code, release_number
+
+
+def _slice_bounds(name, start_idx, end_idx):
+    adjusted_start = len(name) + start_idx if start_idx < 0 else start_idx
+    adjusted_end = len(name) + end_idx + 1 if end_idx < 0 else end_idx + 1
+    adjusted_start = max(0, min(len(name), adjusted_start))
+    adjusted_end = max(adjusted_start, min(len(name), adjusted_end))
+    return adjusted_start, adjusted_end
+
+
+def derive_output_name(current_name, directory, start_ranges, end_ranges, release_pattern):
+    """
+    Derive a batch output name for a working directory.
+
+    Three steps are performed:
+      1. The first slicing range replaces a substring with the folder code.
+      2. If a release pattern is given and the folder name contains a release number
+         (e.g., "A031111-2"), the matching portion is replaced with the new release number.
+      3. A second slicing range, if given, is cut out of the name.
+
+    Raises ValueError if release_pattern is not a valid regular expression.
+    """
+    folder_code, release_number = split_folder_name(directory)
+    if release_pattern:
+        try:
+            release_regex = re.compile(release_pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid release pattern {release_pattern!r}: {e}") from e
+
+    # First range set: update the folder code
+    if len(start_ranges) >= 1 and len(end_ranges) >= 1:
+        adjusted_start, adjusted_end = _slice_bounds(current_name, start_ranges[0], end_ranges[0])
+        current_name = current_name[:adjusted_start] + folder_code + current_name[adjusted_end:]
+
+    # Now, update the release number using the provided release pattern
+    if release_pattern and release_number:
+        def replace_release(match):
+            # Expecting at least three groups: prefix, current release, and suffix.
+            if (match.lastindex or 0) >= 3:
+                return f"{match.group(1)}{release_number}{match.group(3)}"
+            return release_number
+        current_name = release_regex.sub(replace_release, current_name)
+
+    # If additional slicing ranges are provided, apply them (optional)
+    if len(start_ranges) >= 2 and len(end_ranges) >= 2:
+        adjusted_start, adjusted_end = _slice_bounds(current_name, start_ranges[1], end_ranges[1])
+        current_name = current_name[:adjusted_start] + current_name[adjusted_end:]
+
+    return current_name
+
+
+def instantiate_config(template, directory):
+    """
+    Return a copy of a template config retargeted at directory.
+
+    Every batch gets directory as its working directory and an output name derived
+    with derive_output_name, using the slice_start/slice_end/release_pattern stored
+    in the config (the first batch's values are the defaults, as in the editor).
+    """
+    first = template[0] if template else {}
+    default_start = first.get("slice_start", DEFAULT_SLICE_START)
+    default_end = first.get("slice_end", DEFAULT_SLICE_END)
+    default_pattern = first.get("release_pattern", DEFAULT_RELEASE_PATTERN)
+    instance = []
+    for batch in template:
+        start_ranges = parse_slice_indices(batch.get("slice_start", default_start))
+        end_ranges = parse_slice_indices(batch.get("slice_end", default_end))
+        release_pattern = batch.get("release_pattern", default_pattern).strip()
+        batch = copy.deepcopy(batch)
+        batch["working_directory"] = directory
+        batch["output_name"] = derive_output_name(
+            batch["output_name"].strip(), directory, start_ranges, end_ranges, release_pattern
+        )
+        instance.append(batch)
+    return instance
+
+
+def expand_directories(specs):
+    """
+    Expand directory arguments into a sorted list of existing directories.
+
+    Each spec is a directory, a glob such as "/jobs/A04*", or "@file" naming a text
+    file with one directory (or glob) per line.
+    """
+    directories = set()
+    for spec in specs:
+        if spec.startswith("@"):
+            with open(spec[1:], "r") as f:
+                lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+            directories.update(expand_directories(lines))
+            continue
+        for path in glob.glob(spec) if glob.has_magic(spec) else [spec]:
+            if os.path.isdir(path):
+                directories.add(os.path.abspath(path))
+    return sorted(directories)
+
+
+def fan_out(template, directories):
+    """
+    Instantiate a template config for every directory.
+
+    Returns one flat config holding the batches of all instances, so they can share
+    a single iter_merge_events worker pool. Outputs that two directories would both
+    write (e.g. slicing that ignores the folder code) raise ValueError.
+    """
+    config_data = []
+    owners = {}
+    for directory in directories:
+        for batch in instantiate_config(template, directory):
+            key = os.path.normcase(get_output_path(batch))
+            if owners.setdefault(key, directory) != directory:
+                raise ValueError(f"{owners[key]} and {directory} would both write {get_output_path(batch)}")
+            config_data.append(batch)
+    return config_data
+
+
+def summarize_by_directory(config_data, finished_events):
+    """
+    Aggregate BATCH_FINISHED events per working directory.
+
+    Returns {directory: {status: count, "pages": n, "bytes": n}} in config order.
+    """
+    directory_of = {os.path.normcase(get_output_path(batch)): batch["working_directory"] for batch in config_data}
+    summary = {}
+    for batch in config_data:
+        summary.setdefault(batch["working_directory"], {"pages": 0, "bytes": 0})
+    for event in finished_events:
+        directory = directory_of.get(os.path.normcase(event.path or ""))
+        if directory is None:
+            continue
+        totals = summary[directory]
+        totals[event.status] = totals.get(event.status, 0) + 1
+        totals["pages"] += event.pages
+        totals["bytes"] += event.bytes
+    return summary
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import hashlib
+from autopsy.core.pdf_batch_core import batch_output_options, get_output_path, iter_merge_events
+from autopsy.core.pdf_batch_events import (
+    BatchEvent, ERROR, FILE_SKIPPED, BATCH_UP_TO_DATE, BATCH_FINISHED,
+    STATUS_WRITTEN, STATUS_UP_TO_DATE
+)
+from autopsy.core.pdf_batch_manifest import hash_file, normalize_batch_spec
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def journal_path_for(config_path):
+    """The checkpoint journal of a config lives next to the config file."""
+    return config_path + JOURNAL_SUFFIX
+
+
+def batch_key(batch_number, output_path):
+    return f"{batch_number}:{os.path.normcase(os.path.abspath(output_path))}"
+
+
+def spec_hash(batch, merge_options=None):
+    """Hash of the batch spec and its output-affecting options under merge_options."""
+    merge_options = merge_options or {}
+    try:
+        options = batch_output_options(
+            batch, merge_options.get("streaming", False), merge_options.get("backend"),
+            merge_options.get("links", True), merge_options.get("dedupe", False)
+        )
+    except ValueError:
+        options = None  # unknown backend: the batch fails and is never recorded
+    spec = json.dumps(normalize_batch_spec(batch, options), sort_keys=True)
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+
+class CheckpointJournal:
+    """
+    Append-only record of the batches a run has completed.
+
+    Each completed batch is one JSON line holding its output path, the output's
+    size and mtime (the same identity the build manifest uses, so recording never
+    reads the output back) and a hash of the batch spec. Lines are flushed and
+    fsynced as they are written, so after a crash the journal lists exactly the
+    outputs that were finished; a torn last line is ignored when loading.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def reset(self):
+        """Start a new run: forget the batches of the previous one."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"run_started": time.time()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Return {batch key: record} for the batches recorded as completed."""
+        records = {}
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn write from a crash
+                    if "batch" in record:
+                        records[record["batch"]] = record
+        except OSError:
+            pass
+        return records
+
+    def record(self, batch, output_path, merge_options=None):
+        stat = os.stat(output_path)
+        record = {
+            "batch": batch_key(batch["batch_number"], output_path),
+            "batch_number": batch["batch_number"],
+            "output": output_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "spec": spec_hash(batch, merge_options),
+            "time": time.time(),
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def verified_batches(self, config_data, merge_options=None):
+        """
+        Return the keys of batches whose recorded output is still intact.
+
+        A batch counts as completed only if its spec (including the output-affecting
+        options in merge_options) is unchanged and its output still has the recorded
+        size and mtime; anything else is rebuilt. Journals written before mtimes were
+        recorded hold a SHA-256 instead, which is checked by hashing the output.
+        """
+        records = self.load()
+        verified = set()
+        for batch in config_data:
+            output_path = get_output_path(batch)
+            key = batch_key(batch["batch_number"], output_path)
+            record = records.get(key)
+            if record is None or record["spec"] != spec_hash(batch, merge_options):
+                continue
+            try:
+                stat = os.stat(output_path)
+                if stat.st_size != record["size"]:
+                    continue
+                if "mtime_ns" in record:
+                    intact = stat.st_mtime_ns == record["mtime_ns"]
+                else:
+                    intact = hash_file(output_path) == record.get("sha256")
+                if intact:
+                    verified.add(key)
+            except OSError:
+                pass
+        return verified
+
+
+def remove_partial_outputs(config_data):
+    """Delete temp files left behind by outputs that were being written when a run died."""
+    removed = []
+    for batch in config_data:
+        tmp_path = get_output_path(batch) + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+            removed.append(tmp_path)
+    return removed
+
+
+def iter_checkpointed_events(config_data, journal_path, resume=False, reset=True, **merge_options):
+    """
+    Run iter_merge_events with a checkpoint journal.
+
+    Without resume the journal is reset (unless reset is False, for a journal shared
+    with configs run earlier in the same invocation) and every completed batch is
+    appended to it. If the journal cannot be written, an ERROR event (with no batch
+    number) says so and the batches run without checkpoints.
+    With resume, batches the journal lists as completed (and whose outputs verify)
+    are reported as up to date without being fingerprinted or merged, partial temp
+    outputs of the interrupted run are removed, and the remaining batches run as
+    usual. A batch that hit errors (unreadable or missing files, pages that could
+    not be added) is not recorded, so a resumed run retries it.
+    """
+    journal = CheckpointJournal(journal_path)
+    completed = set()
+    if resume:
+        completed = journal.verified_batches(config_data, merge_options)
+        remove_partial_outputs(config_data)
+    elif reset:
+        try:
+            journal.reset()
+        except OSError as e:
+            yield BatchEvent(
+                ERROR, None, f"❌ Could not write checkpoint journal {journal_path}: {str(e)}. "
+                             f"Continuing without checkpoints.", path=journal_path
+            )
+            journal = None
+
+    pending = []
+    for batch in config_data:
+        output_path = get_output_path(batch)
+        if batch_key(batch["batch_number"], output_path) in completed:
+            yield BatchEvent(
+                BATCH_UP_TO_DATE, batch["batch_number"],
+                f"⏭️ Batch {batch['batch_number']} already completed (checkpoint verified): {output_path}",
+                path=output_path, bytes=os.path.getsize(output_path)
+            )
+            yield BatchEvent(BATCH_FINISHED, batch["batch_number"], path=output_path, status=STATUS_UP_TO_DATE)
+        else:
+            pending.append(batch)
+
+    batches = {batch_key(batch["batch_number"], get_output_path(batch)): batch for batch in pending}
+    failed = set()
+    for event in iter_merge_events(pending, **merge_options):
+        if event.kind == ERROR or (event.kind == FILE_SKIPPED and event.path):
+            failed.add(event.batch_number)
+        elif event.kind == BATCH_FINISHED:
+            batch = batches.get(batch_key(event.batch_number, event.path or ""))
+            if (journal is not None and batch is not None and event.batch_number not in failed
+                    and event.status in (STATUS_WRITTEN, STATUS_UP_TO_DATE)):
+                try:
+                    journal.record(batch, event.path, merge_options)
+                except OSError as e:
+                    yield BatchEvent(
+                        ERROR, event.batch_number,
+                        f"❌ Could not record checkpoint for batch {event.batch_number}: {str(e)}",
+                        path=event.path
+                    )
+            failed.discard(event.batch_number)
+        yield event
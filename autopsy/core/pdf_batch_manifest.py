@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 2  # 2: the spec records the output-affecting merge options
+MANIFEST_SUFFIX = ".manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def manifest_path(output_path):
+    """The build manifest lives next to the output PDF it describes."""
+    return output_path + MANIFEST_SUFFIX
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def normalize_batch_spec(batch, options=None):
+    """
+    Return the parts of a batch definition that affect its output, in a canonical form.
+
+    Whitespace around patterns and page ranges and the case of FIRST/LAST macros do not
+    change the merge result, so they are normalized away. options are the merge options
+    that change the output bytes (see MergeBackend.output_options), so switching the
+    backend or e.g. dropping links rebuilds the output.
+    """
+    files = []
+    for file_config in sorted(batch["files"], key=lambda x: x["sequence"]):
+        files.append({
+            "pattern": file_config["pattern"].strip(),
+            "include": file_config["include"].replace(" ", "").upper(),
+            "exclude": file_config["exclude"].replace(" ", "").upper(),
+        })
+    return {"output_name": batch["output_name"], "files": files, "options": options or {}}
+
+
+def describe_file(path, previous=None):
+    """
+    Return the size, mtime and content hash of path.
+
+    If previous describes the same path with the same size and mtime, its hash is
+    reused instead of reading the file again.
+    """
+    stat = os.stat(path)
+    if (
+        previous
+        and previous.get("path") == path
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        sha256 = previous["sha256"]
+    else:
+        sha256 = hash_file(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+
+
+def load_manifest(output_path):
+    try:
+        with open(manifest_path(output_path), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def build_fingerprint(batch, input_files, previous_manifest=None, options=None):
+    """
+    Build the fingerprint of a batch: its normalized spec plus every resolved input file.
+
+    input_files is the ordered list of files the batch merges, options the batch's
+    output-affecting merge options.
+    """
+    previous_inputs = {}
+    if previous_manifest:
+        previous_inputs = {entry["path"]: entry for entry in previous_manifest.get("inputs", [])}
+    return {
+        "version": MANIFEST_VERSION,
+        "spec": normalize_batch_spec(batch, options),
+        "inputs": [describe_file(path, previous_inputs.get(path)) for path in input_files],
+    }
+
+
+def _content_key(fingerprint):
+    # Size and mtime only speed up hashing; a touched but unchanged file must not force a rebuild.
+    return fingerprint["spec"], [(entry["path"], entry["sha256"]) for entry in fingerprint["inputs"]]
+
+
+def is_up_to_date(output_path, fingerprint, manifest):
+    """True if the output exists, is the file the manifest recorded, and was built from the same fingerprint."""
+    if not manifest or not os.path.isfile(output_path):
+        return False
+    output = manifest.get("output") or {}
+    stat = os.stat(output_path)
+    if output.get("size") != stat.st_size or output.get("mtime_ns") != stat.st_mtime_ns:
+        return False
+    try:
+        return _content_key(manifest) == _content_key(fingerprint)
+    except (KeyError, TypeError):
+        return False
+
+
+def write_manifest(output_path, fingerprint):
+    """Record the fingerprint the output was just built from (written atomically)."""
+    stat = os.stat(output_path)
+    manifest = dict(fingerprint)
+    manifest["output"] = {"path": output_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    path = manifest_path(output_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, path)
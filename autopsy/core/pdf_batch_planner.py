@@ -0,0 +1,158 @@
+import os
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+from PyPDF2 import PdfReader
+from autopsy.core.pdf_batch_backends import backend_class
+from autopsy.core.pdf_io_utils import coalesce_page_runs
+from autopsy.core.pdf_batch_cache import DirectoryIndexCache
+from autopsy.core.pdf_batch_core import batch_output_options, get_output_path, resolve_batch_files, select_pages
+from autopsy.core.pdf_batch_manifest import build_fingerprint, is_up_to_date, load_manifest
+
+# Seconds per copied page for the runtime estimate, by backend ("fitz-nolinks" is fitz
+# with links=False). Measured on one core by merging a generated set of 20 files x 50
+# vector pages (300 lines, one line of text and one link per page) from a warm disk
+# cache: 0.85, 0.31 and 0.10 ms per page. Real drawing sets vary several-fold with
+# page complexity, so the plan only gives a rough estimate; READ_BYTES_PER_SECOND
+# adds a cold read of the sources on top.
+PAGE_SECONDS = {"pypdf2": 0.0009, "fitz": 0.0003, "fitz-nolinks": 0.0001}
+READ_BYTES_PER_SECOND = 200 * 1024 * 1024
+
+
+def read_page_count(path):
+    """
+    Return the page count of a PDF from its trailer, without loading the page tree.
+
+    Only the cross-reference table, the catalog and the root /Pages node are read;
+    the file is opened as a stream so it is never loaded into memory as a whole.
+    """
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        return int(reader.trailer["/Root"]["/Pages"]["/Count"])
+
+
+def page_ranges(pages):
+    """Collapse sorted 0-based page numbers into 1-based inclusive [start, end] ranges."""
+    return [[start + 1, stop] for start, stop in coalesce_page_runs(pages)]
+
+
+def format_page_ranges(ranges):
+    """Format [start, end] ranges as a page range string, e.g. "1-3,7"."""
+    return ",".join(f"{start}" if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+@dataclass
+class PlannedFile:
+    """One matched input file and the pages (1-based ranges, in merge order) it contributes."""
+    path: str
+    pattern: str
+    bytes: int = 0
+    page_count: int = 0
+    pages: List[List[int]] = field(default_factory=list)
+    selected_pages: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchPlan:
+    """
+    What a batch would build, with rough size and runtime estimates.
+
+    estimated_bytes assumes each source contributes its size in proportion to the
+    pages copied; estimated_seconds comes from PAGE_SECONDS and is only a rough guide.
+    """
+    batch_number: int
+    output_path: str
+    backend: str
+    up_to_date: bool = False
+    files: List[PlannedFile] = field(default_factory=list)
+    empty_patterns: List[str] = field(default_factory=list)
+    total_pages: int = 0
+    estimated_bytes: int = 0
+    estimated_seconds: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def plan_batch(batch, dir_indexes=None, page_counts=None, force=False, backend=None, streaming=False, links=True,
+               dedupe=False):
+    """
+    Resolve a batch without merging it.
+
+    Patterns are matched against the directory index and include/exclude ranges are
+    expanded (FIRST/LAST included) exactly as merge_batches does, giving the ordered
+    page list of the output. Page counts come from read_page_count only. The output
+    size is estimated from the share of each source file's pages that is copied, the
+    runtime (roughly) from PAGE_SECONDS and READ_BYTES_PER_SECOND. page_counts is an optional
+    {path: count} cache shared between batches of a run. streaming, links and dedupe
+    are the run's merge options; like backend they decide whether the output is
+    up to date.
+    """
+    if dir_indexes is None:
+        dir_indexes = DirectoryIndexCache()
+    if page_counts is None:
+        page_counts = {}
+    plan = BatchPlan(batch["batch_number"], get_output_path(batch), (batch.get("backend", backend) or "").lower())
+    try:
+        plan.backend = backend_class(plan.backend).name
+    except ValueError as e:
+        plan.error = str(e)
+        return plan
+    try:
+        resolved = resolve_batch_files(batch, dir_indexes)
+    except OSError as e:
+        plan.error = str(e)
+        return plan
+
+    read_bytes = 0
+    for file_config, pdf_files in resolved:
+        pattern = file_config["pattern"]
+        if not pdf_files:
+            plan.empty_patterns.append(pattern.strip())
+            continue
+        for pdf_file in pdf_files:
+            planned = PlannedFile(pdf_file, pattern.strip())
+            plan.files.append(planned)
+            try:
+                planned.bytes = os.path.getsize(pdf_file)
+                if pdf_file not in page_counts:
+                    page_counts[pdf_file] = read_page_count(pdf_file)
+                planned.page_count = page_counts[pdf_file]
+            except Exception as e:
+                planned.error = str(e)
+                continue
+            pages = select_pages(file_config, planned.page_count)
+            planned.pages = page_ranges(pages)
+            planned.selected_pages = len(pages)
+            plan.total_pages += len(pages)
+            read_bytes += planned.bytes
+            if planned.page_count:
+                plan.estimated_bytes += planned.bytes * len(pages) // planned.page_count
+
+    cost_key = plan.backend if batch.get("links", links) or plan.backend != "fitz" else "fitz-nolinks"
+    plan.estimated_seconds = round(
+        plan.total_pages * PAGE_SECONDS.get(cost_key, PAGE_SECONDS["pypdf2"])
+        + read_bytes / READ_BYTES_PER_SECOND, 3
+    )
+    manifest = None if force else load_manifest(plan.output_path)
+    if manifest is not None:
+        # Inputs whose size and mtime match the manifest are not re-hashed.
+        try:
+            input_files = [f for _, pdf_files in resolved for f in pdf_files]
+            options = batch_output_options(batch, streaming, backend, links, dedupe)
+            fingerprint = build_fingerprint(batch, input_files, manifest, options)
+            plan.up_to_date = is_up_to_date(plan.output_path, fingerprint, manifest)
+        except Exception:
+            plan.up_to_date = False
+    return plan
+
+
+def plan_batches(config_data, force=False, backend=None, streaming=False, links=True, dedupe=False):
+    """Plan every batch of a config, sharing the directory index and page counts."""
+    dir_indexes = DirectoryIndexCache()
+    page_counts = {}
+    return [
+        plan_batch(batch, dir_indexes, page_counts, force, backend, streaming, links, dedupe)
+        for batch in config_data
+    ]
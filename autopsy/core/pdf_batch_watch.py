@@ -0,0 +1,191 @@
+import os
+import time
+import threading
+from autopsy.core.pdf_batch_core import compile_pattern, get_output_path, iter_merge_events
+
+try:
+    # inotify on Linux, ReadDirectoryChangesW on Windows, FSEvents on macOS.
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog is optional; fall back to polling
+    FileSystemEventHandler = object
+    Observer = None
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def snapshot_directory(directory):
+    """Return {name: (size, mtime_ns)} for the PDF files directly inside directory."""
+    snapshot = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(".pdf") and entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        pass
+    return snapshot
+
+
+def diff_snapshots(old, new):
+    """Return the names that were added, removed or modified between two snapshots."""
+    return {name for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
+
+
+def affected_batches(config_data, changes):
+    """
+    Return the batches (in config order) whose patterns match any changed file.
+
+    changes maps a normalized directory path to a set of file names. A batch's own
+    output is never a trigger for that batch; removed files count, since the output
+    must then be rebuilt without them.
+    """
+    affected = []
+    for batch in config_data:
+        directory = os.path.normcase(os.path.abspath(batch["working_directory"]))
+        names = changes.get(directory)
+        if not names:
+            continue
+        own_output = os.path.basename(get_output_path(batch)).lower()
+        matchers = [compile_pattern(file_config["pattern"]) for file_config in batch["files"]]
+        for name in names:
+            lower_name = name.lower()
+            if lower_name != own_output and any(match(name, lower_name) for match in matchers):
+                affected.append(batch)
+                break
+    return affected
+
+
+# Event types that mean a file's content or presence changed. Open/close-without-write
+# events are ignored, otherwise the merges reading their inputs would retrigger them.
+_CHANGE_EVENTS = ("created", "modified", "deleted", "moved", "closed")
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in _CHANGE_EVENTS:
+            return
+        self.watcher.notify(event.src_path)
+        dest_path = getattr(event, "dest_path", "")
+        if dest_path:
+            self.watcher.notify(dest_path)
+
+
+class BatchWatcher:
+    """
+    Watch the working directories of a batch config and re-merge affected batches.
+
+    File events are collected from watchdog (inotify and friends) or, if it is not
+    installed or polling is requested, from periodic directory snapshots. Once no
+    event has arrived for debounce seconds, the changed files are matched against
+    each batch's patterns and only those batches are rebuilt through
+    iter_merge_events; their build manifests skip anything that turns out unchanged.
+    Events arriving during a rebuild are kept for the next round.
+
+    on_event is called with every BatchEvent of a rebuild. run() blocks until stop()
+    is called; start() runs the same loop in a daemon thread.
+    """
+
+    def __init__(self, config_data, on_event=None, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL,
+                 polling=False, **merge_options):
+        self.config_data = config_data
+        self.on_event = on_event
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.polling = polling or Observer is None
+        self.merge_options = merge_options
+        self.directories = {
+            os.path.normcase(os.path.abspath(batch["working_directory"])): batch["working_directory"]
+            for batch in config_data
+        }
+        self._changes = {}
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def mode(self):
+        return "polling" if self.polling else "events"
+
+    def notify(self, path):
+        """Record a changed file; paths outside the watched directories or not PDFs are ignored."""
+        directory, name = os.path.split(os.path.abspath(path))
+        directory = os.path.normcase(directory)
+        if directory not in self.directories or not name.lower().endswith(".pdf"):
+            return
+        with self._lock:
+            self._changes.setdefault(directory, set()).add(name)
+            self._last_change = time.monotonic()
+        self._changed.set()
+
+    def _poll(self):
+        snapshots = {key: snapshot_directory(path) for key, path in self.directories.items()}
+        while not self._stop.wait(self.poll_interval):
+            for key, path in self.directories.items():
+                snapshot = snapshot_directory(path)
+                for name in diff_snapshots(snapshots[key], snapshot):
+                    self.notify(os.path.join(path, name))
+                snapshots[key] = snapshot
+
+    def _start_source(self):
+        if self.polling:
+            poller = threading.Thread(target=self._poll, name="batch-watch-poll", daemon=True)
+            poller.start()
+            return None
+        observer = Observer()
+        handler = _ChangeHandler(self)
+        for path in self.directories.values():
+            if os.path.isdir(path):
+                observer.schedule(handler, path, recursive=False)
+        observer.start()
+        return observer
+
+    def _take_changes(self):
+        """Wait for a burst of changes to settle and return them, or None when stopped."""
+        while not self._stop.is_set():
+            if not self._changed.wait(0.5):
+                continue
+            with self._lock:
+                quiet_for = time.monotonic() - self._last_change
+                if quiet_for >= self.debounce:
+                    changes, self._changes = self._changes, {}
+                    self._changed.clear()
+                    return changes
+            self._stop.wait(self.debounce - quiet_for)
+        return None
+
+    def run(self):
+        observer = self._start_source()
+        try:
+            while True:
+                changes = self._take_changes()
+                if changes is None:
+                    break
+                batches = affected_batches(self.config_data, changes)
+                if not batches:
+                    continue
+                for event in iter_merge_events(batches, cancel_event=self._stop, **self.merge_options):
+                    if self.on_event is not None:
+                        self.on_event(event)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="batch-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._changed.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
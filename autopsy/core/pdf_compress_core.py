@@ -1,7 +1,160 @@
 import os
+import multiprocessing
 import fitz  # PyMuPDF
 from PIL import Image
 import io
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from autopsy.core.pdf_fitz_utils import dedupe_fitz_objects
+from autopsy.core.pdf_io_utils import content_key
+from autopsy.core.pdf_page_analysis import analyze_document
+
+# Page classification thresholds for rasterize mode.
+# Text is counted without whitespace (PageFeatures.text_chars), about 85% of the
+# extracted text length of typical prose, so these are 85% of the former 200 and 100.
+TEXT_THRESHOLD = 170       # minimum characters to consider page text-rich
+TEXT_FACTOR = 85           # text length should exceed image_count * TEXT_FACTOR
+LARGE_IMAGE_THRESHOLD = 500000  # e.g., an image with area >= 500,000 pixels is "large"
+
+MAX_CHUNK_ITEMS = 8  # pages or images per worker task in parallel mode
+
+# A re-encoded image replaces the original only if it is at least this much smaller.
+MIN_SAVINGS_RATIO = 0.05
+
+# Target-size search: quality is lowered to KEEP_QUALITY before images are
+# downscaled, and below it only once they are at MIN_SCALE.
+MAX_QUALITY = 90
+KEEP_QUALITY = 50
+MIN_QUALITY = 20
+MIN_SCALE = 0.25
+SCALE_STEP = 0.05            # downscale factor precision of the bisection
+TARGET_SAMPLE_IMAGES = 12    # images encoded per trial in preserve mode
+TARGET_SAMPLE_PAGES = 6      # pages encoded per trial in rasterize mode
+PAGE_OVERHEAD_BYTES = 1024   # page object and content stream of a rasterized page
+XREF_ENTRY_BYTES = 20        # one line of the cross-reference table
+
+# Source document opened by a worker process: (path, fitz.Document)
+_worker_document = None
+
+
+@dataclass
+class ImageSavings:
+    """
+    What preserve mode did with one distinct image.
+
+    status is "saved" (replaced by its re-encode), "grown" (the re-encode was not
+    smaller, so the original was kept), "skipped" (kept because it is not a JPEG
+    or PNG or the saving was below the threshold) or "failed" (kept because
+    decoding, encoding or writing it raised; error says why). new_bytes is the
+    size of the re-encode, or None if there was none; only "saved" images were
+    written with it.
+    """
+    xref: int
+    pages: list
+    original_bytes: int
+    new_bytes: int = None
+    status: str = "skipped"
+    error: str = None
+
+    @property
+    def saved_bytes(self):
+        return self.original_bytes - self.new_bytes if self.status == "saved" else 0
+
+    @property
+    def grown_bytes(self):
+        return self.new_bytes - self.original_bytes if self.status == "grown" else 0
+
+    @property
+    def skipped_bytes(self):
+        return self.original_bytes if self.status == "skipped" else 0
+
+    @property
+    def failed_bytes(self):
+        return self.original_bytes if self.status == "failed" else 0
+
+
+@dataclass
+class PageSavings:
+    """Image savings of one page (0-based); an image shown on several pages counts on each."""
+    page: int
+    saved_bytes: int = 0
+    skipped_bytes: int = 0
+    grown_bytes: int = 0
+    failed_bytes: int = 0
+    images_saved: int = 0
+    images_skipped: int = 0
+    images_grown: int = 0
+    images_failed: int = 0
+
+
+@dataclass
+class CompressionReport:
+    """
+    Outcome of compress_pdf_report.
+
+    In preserve mode images lists every distinct image and pages the per-page
+    totals; saved_bytes, skipped_bytes, grown_bytes and failed_bytes add up the
+    images. Grown bytes are what the rejected re-encodes would have added. Rasterize
+    mode only fills in the sizes.
+
+    quality and scale are the JPEG settings used. With a target size, target_bytes
+    is that target and estimated_bytes the output size the chosen settings were
+    expected to give. In rasterize mode kept_pages lists the pages (0-based) copied
+    as they were and messages holds the verdict on every page, in page order.
+    """
+    output_path: str
+    mode: str
+    input_bytes: int = 0
+    output_bytes: int = 0
+    images: list = field(default_factory=list)
+    pages: list = field(default_factory=list)
+    quality: int = None
+    scale: float = 1.0
+    target_bytes: int = None
+    estimated_bytes: int = None
+    kept_pages: list = field(default_factory=list)
+    messages: list = field(default_factory=list)
+
+    @property
+    def output_mb(self):
+        return self.output_bytes / (1024 * 1024)
+
+    @property
+    def saved_bytes(self):
+        return sum(image.saved_bytes for image in self.images)
+
+    @property
+    def skipped_bytes(self):
+        return sum(image.skipped_bytes for image in self.images)
+
+    @property
+    def grown_bytes(self):
+        return sum(image.grown_bytes for image in self.images)
+
+    @property
+    def failed_bytes(self):
+        return sum(image.failed_bytes for image in self.images)
+
+    def count(self, status):
+        return sum(1 for image in self.images if image.status == status)
+
+    def target_summary(self):
+        """Describe the settings chosen for the target size, or "" without one."""
+        if not self.target_bytes:
+            return ""
+        return (
+            f"Target {self.target_bytes / (1024 * 1024):.2f} MB: JPEG quality {self.quality}, "
+            f"scale {self.scale:.2f} (estimated {self.estimated_bytes / (1024 * 1024):.2f} MB)."
+        )
+
+    def summary(self):
+        return (
+            f"{self.count('saved')} images recompressed ({self.saved_bytes / 1024:.0f} KB saved), "
+            f"{self.count('skipped')} skipped ({self.skipped_bytes / 1024:.0f} KB), "
+            f"{self.count('grown')} kept because they grew ({self.grown_bytes / 1024:.0f} KB avoided), "
+            f"{self.count('failed')} failed ({self.failed_bytes / 1024:.0f} KB kept)."
+        )
+
 
 def compress_pdf_advanced(
     input_path: str,
@@ -15,10 +168,63 @@ def compress_pdf_advanced(
     convert_cmyk: bool = True,
     skip_text_rich: bool = False,
     skip_vector_only: bool = False,
-    progress_callback=None
+    progress_callback=None,
+    workers: int = 1,
+    target_size_mb: float = None,
+    min_savings: float = MIN_SAVINGS_RATIO
 ) -> float:
+    """Compress input_path into output_path and return the new size in MB (see compress_pdf_report)."""
+    return compress_pdf_report(
+        input_path, output_path, mode=mode, quality=quality, max_width=max_width,
+        max_height=max_height, dpi=dpi, remove_metadata=remove_metadata,
+        convert_cmyk=convert_cmyk, skip_text_rich=skip_text_rich,
+        skip_vector_only=skip_vector_only, progress_callback=progress_callback,
+        workers=workers, target_size_mb=target_size_mb, min_savings=min_savings
+    ).output_mb
+
+
+def compress_pdf_report(
+    input_path: str,
+    output_path: str,
+    mode: str = "preserve",
+    quality: int = 60,
+    max_width: int = None,
+    max_height: int = None,
+    dpi: int = 150,
+    remove_metadata: bool = False,
+    convert_cmyk: bool = True,
+    skip_text_rich: bool = False,
+    skip_vector_only: bool = False,
+    progress_callback=None,
+    workers: int = 1,
+    target_size_mb: float = None,
+    min_savings: float = MIN_SAVINGS_RATIO
+) -> CompressionReport:
+    """
+    Compress input_path into output_path and return a CompressionReport.
+
+    In preserve mode an image is replaced only when its re-encode is smaller than
+    the original stream by at least min_savings (a fraction, 0.05 = 5%); otherwise
+    the original is kept and the report says whether it was skipped or would have
+    grown.
+
+    With target_size_mb the quality argument is ignored: a few representative
+    images (or pages, in rasterize mode) are encoded at trial settings to find
+    the best JPEG quality and downscale factor whose estimated output fits the
+    target, and the document is then compressed once with those settings. The
+    estimate is not exact, so the result can land slightly off the target; if
+    even the smallest settings do not fit, they are used anyway.
+
+    With workers > 1 the per-page work (page analysis, rendering, image decoding,
+    resizing and JPEG encoding) is spread over that many processes; 0 or None uses
+    every core. Pages are still assembled in order in this process, and
+    progress_callback receives the percentage of pages done either way.
+    """
     if mode not in ["preserve", "rasterize"]:
         raise ValueError("mode must be either 'preserve' or 'rasterize'")
+    if target_size_mb is not None and target_size_mb <= 0:
+        raise ValueError("target_size_mb must be positive")
+    target_bytes = int(target_size_mb * 1024 * 1024) if target_size_mb else None
     
     if mode == "rasterize":
         return _rasterize_pdf(
@@ -30,7 +236,9 @@ def compress_pdf_advanced(
             max_height=max_height,
             skip_text_rich=skip_text_rich,
             skip_vector_only=skip_vector_only,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            workers=workers,
+            target_bytes=target_bytes
         )
     else:
         return _clone_and_compress_images(
@@ -41,10 +249,346 @@ def compress_pdf_advanced(
             max_height=max_height,
             remove_metadata=remove_metadata,
             convert_cmyk=convert_cmyk,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            workers=workers,
+            target_bytes=target_bytes,
+            min_savings=min_savings
         )
 
 
+def _chunks(items, workers):
+    size = max(1, min(MAX_CHUNK_ITEMS, len(items) // (workers * 4)))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _source_document(input_path):
+    """Open input_path once per worker process and reuse it for every chunk."""
+    global _worker_document
+    if _worker_document is None or _worker_document[0] != input_path:
+        if _worker_document is not None:
+            _worker_document[1].close()
+        _worker_document = (input_path, fitz.open(input_path))
+    return _worker_document[1]
+
+
+def _run_tasks(task, input_path, items, options):
+    doc = _source_document(input_path)
+    return [(item, task(doc, item, **options)) for item in items]
+
+
+def _iter_task_results(task, items, options, src_doc, input_path, workers):
+    """
+    Yield (item, task(doc, item, **options)) for every item (a page number or an
+    image xref of the source document), in the order of items.
+
+    With workers <= 1 the task runs here on src_doc. Otherwise chunks of items are
+    handed to a process pool; results that finish early are held back until every
+    item before them has been yielded. Workers are spawned rather than forked, so
+    they start clean even when called from a GUI or worker thread.
+    """
+    items = list(items)
+    if not workers:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield item, task(src_doc, item, **options)
+        return
+
+    chunks = _chunks(items, workers)
+    ready = {}
+    position = 0
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)), mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [executor.submit(_run_tasks, task, input_path, chunk, options) for chunk in chunks]
+        for future in as_completed(futures):
+            ready.update(future.result())
+            while position < len(items) and items[position] in ready:
+                yield items[position], ready.pop(items[position])
+                position += 1
+
+
+def _prepare_image(original_data: bytes, remove_metadata: bool, convert_cmyk: bool):
+    """Decode an extracted image into an RGB or greyscale PIL image ready for JPEG."""
+    pil_img = Image.open(io.BytesIO(original_data))
+    if convert_cmyk and pil_img.mode == "CMYK":
+        pil_img = pil_img.convert("RGB")
+    elif pil_img.mode not in ("RGB", "L"):
+        pil_img = pil_img.convert("RGB")
+
+    if remove_metadata:
+        new_img = Image.new(pil_img.mode, pil_img.size)
+        new_img.paste(pil_img)
+        pil_img = new_img
+    return pil_img
+
+
+def _encode_jpeg(pil_img, quality, max_width, max_height, scale=1.0) -> bytes:
+    """Fit pil_img into max_width x max_height, shrink it by scale and encode it as JPEG."""
+    if max_width and max_height:
+        if pil_img.width > max_width or pil_img.height > max_height:
+            pil_img = pil_img.copy()
+            pil_img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+    if scale < 1.0:
+        size = (max(1, round(pil_img.width * scale)), max(1, round(pil_img.height * scale)))
+        pil_img = pil_img.resize(size, Image.Resampling.LANCZOS)
+
+    buf = io.BytesIO()
+    pil_img.save(buf, format="JPEG", quality=quality, optimize=True)
+    data = buf.getvalue()
+    buf.close()
+    return data
+
+
+def _recompress_image(
+    original_data: bytes,
+    quality: int,
+    max_width: int,
+    max_height: int,
+    remove_metadata: bool,
+    convert_cmyk: bool,
+    scale: float = 1.0
+) -> bytes:
+    """Re-encode one extracted image as JPEG with the preserve-mode settings."""
+    pil_img = _prepare_image(original_data, remove_metadata, convert_cmyk)
+    return _encode_jpeg(pil_img, quality, max_width, max_height, scale)
+
+
+def _image_digest(doc, img_info):
+    """Identify an image by its raw stream and pixel size; copying a document keeps both."""
+    # img_info: (xref, smask, width, height, ...)
+    return content_key(doc.xref_stream_raw(img_info[0]) or b""), img_info[2], img_info[3]
+
+
+def _image_table(src_doc, dst_doc):
+    """
+    List every distinct image of dst_doc once, with where to find it in src_doc.
+
+    dst_doc is a de-duplicated copy of src_doc, so pages that show the same image
+    point at one xref and may list their images in another order or number than
+    the source page. Images are therefore matched by _image_digest, on the same
+    page first and then anywhere in src_doc. Returns [(dst xref, src xref or None,
+    page number)] in order of first use; None means no source image matched.
+    """
+    table = []
+    seen = set()
+    anywhere = {}
+    for page_num in range(len(src_doc)):
+        for img_info in src_doc[page_num].get_images(full=True):
+            anywhere.setdefault(_image_digest(src_doc, img_info), img_info[0])
+    for page_num in range(len(src_doc)):
+        on_page = {}
+        for img_info in src_doc[page_num].get_images(full=True):
+            on_page.setdefault(_image_digest(src_doc, img_info), img_info[0])
+        for img_info in dst_doc[page_num].get_images(full=True):
+            if img_info[0] in seen:
+                continue
+            seen.add(img_info[0])
+            digest = _image_digest(dst_doc, img_info)
+            table.append((img_info[0], on_page.get(digest, anywhere.get(digest)), page_num))
+    return table
+
+
+def _extract_recompressible(doc, xref):
+    """
+    Return the raw bytes of a JPEG or PNG image of doc, or None for other images.
+
+    Stencil masks, colour-key masks and /Decode arrays only make sense for the
+    exact original samples, so those images are left alone as well.
+    """
+    if doc.xref_get_key(xref, "ImageMask")[1] == "true":
+        return None
+    if doc.xref_get_key(xref, "Mask")[0] == "array" or doc.xref_get_key(xref, "Decode")[0] != "null":
+        return None
+    base_img = doc.extract_image(xref)
+    if not base_img or "image" not in base_img:
+        return None
+    ext = base_img.get("ext", "").lower()
+    if ext not in ["jpg", "jpeg", "png"]:
+        return None
+    return base_img["image"]
+
+
+def _recompress_xref(doc, xref, **settings):
+    """
+    Re-encode one image of doc; returns (JPEG bytes, error message).
+
+    Both are None for images that are not JPEG or PNG, which are left alone.
+    """
+    try:
+        original_data = _extract_recompressible(doc, xref)
+        if original_data is None:
+            return None, None
+        return _recompress_image(original_data, **settings), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _color_components(doc, xref):
+    """Number of colour components of the /ColorSpace of image xref, or None if it is not a plain one."""
+    kind, value = doc.xref_get_key(xref, "ColorSpace")
+    if kind == "xref":
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    value = value.strip()
+    if value in ("/DeviceGray", "/G") or value.startswith("[/CalGray"):
+        return 1
+    if value in ("/DeviceRGB", "/RGB") or value.startswith("[/CalRGB"):
+        return 3
+    if value.startswith("[/ICCBased"):
+        profile = int(value[len("[/ICCBased"):].split()[0])
+        return int(doc.xref_get_key(profile, "N")[1])
+    return None
+
+
+def _write_jpeg_in_place(doc, xref, data):
+    """
+    Replace the samples of image xref with JPEG data, keeping the object itself.
+
+    Every page that uses the image keeps pointing at the same xref, and its
+    /SMask stays attached, so transparency survives the re-encode.
+    """
+    with Image.open(io.BytesIO(data)) as jpeg:
+        components = len(jpeg.getbands())
+        width, height = jpeg.size
+    doc.update_stream(xref, data, compress=False)
+    doc.xref_set_key(xref, "Filter", "/DCTDecode")
+    if doc.xref_get_key(xref, "DecodeParms")[0] != "null":
+        doc.xref_set_key(xref, "DecodeParms", "null")
+    doc.xref_set_key(xref, "BitsPerComponent", "8")
+    doc.xref_set_key(xref, "Width", str(width))
+    doc.xref_set_key(xref, "Height", str(height))
+    # An ICC profile with the right number of components still describes the
+    # decoded samples; anything else (CMYK, Indexed, ...) was converted.
+    if _color_components(doc, xref) != components:
+        doc.xref_set_key(xref, "ColorSpace", "/DeviceGray" if components == 1 else "/DeviceRGB")
+
+
+def _stream_bytes(doc, xref):
+    """Length of the raw (still encoded) stream of xref."""
+    try:
+        return len(doc.xref_stream_raw(xref) or b"")
+    except Exception:
+        return 0
+
+
+def _keeps_saving(original_bytes, new_bytes, min_savings):
+    return new_bytes < original_bytes * (1 - min_savings)
+
+
+def _stored_bytes(doc, xref):
+    """Approximate bytes object xref takes up in a saved file: dictionary plus raw stream."""
+    try:
+        size = len(doc.xref_object(xref, compressed=True)) + XREF_ENTRY_BYTES
+        if doc.xref_is_stream(xref):
+            size += len(doc.xref_stream_raw(xref) or b"")
+        return size
+    except Exception:
+        return 0
+
+
+def _evenly_spaced(items, count):
+    """Pick up to count items spread evenly over items, keeping their order."""
+    if len(items) <= count:
+        return list(items)
+    step = len(items) / count
+    return [items[int(i * step + step / 2)] for i in range(count)]
+
+
+def _choose_jpeg_settings(estimate, target_bytes):
+    """
+    Return the (quality, scale) whose estimate(quality, scale) fits target_bytes.
+
+    Searched by bisection in three stages: quality between KEEP_QUALITY and
+    MAX_QUALITY at full size; then, if that is not enough, the downscale factor
+    at KEEP_QUALITY; and only at MIN_SCALE quality down to MIN_QUALITY. When
+    nothing fits, the smallest settings are returned.
+    """
+    estimates = {}
+
+    def fits(quality, scale):
+        key = (quality, round(scale, 4))
+        if key not in estimates:
+            estimates[key] = estimate(quality, scale)
+        return estimates[key] <= target_bytes
+
+    if fits(MAX_QUALITY, 1.0):
+        return MAX_QUALITY, 1.0
+    if fits(KEEP_QUALITY, 1.0):
+        fit, miss = KEEP_QUALITY, MAX_QUALITY
+        while miss - fit > 1:
+            mid = (fit + miss) // 2
+            if fits(mid, 1.0):
+                fit = mid
+            else:
+                miss = mid
+        return fit, 1.0
+    if fits(KEEP_QUALITY, MIN_SCALE):
+        fit, miss = MIN_SCALE, 1.0
+        while miss - fit > SCALE_STEP:
+            mid = (fit + miss) / 2
+            if fits(KEEP_QUALITY, mid):
+                fit = mid
+            else:
+                miss = mid
+        return KEEP_QUALITY, round(fit, 2)
+    if not fits(MIN_QUALITY, MIN_SCALE):
+        return MIN_QUALITY, MIN_SCALE
+    fit, miss = MIN_QUALITY, KEEP_QUALITY
+    while miss - fit > 1:
+        mid = (fit + miss) // 2
+        if fits(mid, MIN_SCALE):
+            fit = mid
+        else:
+            miss = mid
+    return fit, MIN_SCALE
+
+
+def _preserve_size_estimator(src_doc, dst_doc, targets, settings, min_savings=MIN_SAVINGS_RATIO):
+    """
+    Return estimate(quality, scale) -> expected output bytes for preserve mode.
+
+    Everything in dst_doc except the images to recompress is counted as is. A
+    sample of those images, spread over the range of stored sizes, is decoded
+    once; each estimate re-encodes only the sample and scales its total by the
+    share of stored image bytes it stands for. Images that are not JPEG or PNG,
+    or whose re-encode would not save min_savings, are kept by the full pass, so
+    they count at their stored size.
+    """
+    target_dst = {dst_xref for dst_xref, _ in targets.values()}
+    fixed = sum(_stored_bytes(dst_doc, xref) for xref in range(1, dst_doc.xref_length()) if xref not in target_dst)
+    stored = {src_xref: _stored_bytes(src_doc, src_xref) for src_xref in targets}
+    total_stored = sum(stored.values())
+
+    samples = []  # (PIL image or None, stored bytes, stream bytes)
+    for src_xref in _evenly_spaced(sorted(stored, key=stored.get), TARGET_SAMPLE_IMAGES):
+        try:
+            original_data = _extract_recompressible(src_doc, src_xref)
+            pil_img = None
+            if original_data is not None:
+                pil_img = _prepare_image(original_data, settings["remove_metadata"], settings["convert_cmyk"])
+                pil_img.load()
+        except Exception:
+            pil_img = None
+        samples.append((pil_img, stored[src_xref], _stream_bytes(src_doc, src_xref)))
+    sample_stored = sum(size for _, size, _ in samples)
+
+    def sample_bytes(pil_img, size, stream_size, quality, scale):
+        if pil_img is None:
+            return size
+        encoded = len(_encode_jpeg(pil_img, quality, settings["max_width"], settings["max_height"], scale))
+        if not _keeps_saving(stream_size, encoded, min_savings):
+            return size
+        return size - stream_size + encoded
+
+    def estimate(quality, scale):
+        if not sample_stored:
+            return fixed
+        new_bytes = sum(sample_bytes(*sample, quality, scale) for sample in samples)
+        return fixed + new_bytes * total_stored / sample_stored
+
+    return estimate
+
+
 def _clone_and_compress_images(
     input_path: str,
     output_path: str,
@@ -53,61 +597,172 @@ def _clone_and_compress_images(
     max_height: int,
     remove_metadata: bool,
     convert_cmyk: bool,
-    progress_callback
-) -> float:
+    progress_callback,
+    workers: int = 1,
+    target_bytes: int = None,
+    min_savings: float = MIN_SAVINGS_RATIO
+) -> CompressionReport:
+    """
+    Copy the document and recompress its JPEG and PNG images.
+
+    Images are collected document-wide first, so each distinct image is decoded,
+    resized and encoded once however many pages use it, and every page then
+    points at that one result. With target_bytes the quality and downscale
+    factor are chosen from a sample of those images before the full pass. An
+    image keeps its original stream unless the re-encode saves min_savings.
+    """
     src_doc = fitz.open(input_path)
     dst_doc = fitz.open()
-    total_pages = len(src_doc)
-    
-    for i in range(total_pages):
-        dst_doc.insert_pdf(src_doc, from_page=i, to_page=i)
-        page = dst_doc[-1]
-        processed_xrefs = set()
-        for img_info in page.get_images(full=True):
-            xref = img_info[0]
-            if xref in processed_xrefs:
-                continue
-            processed_xrefs.add(xref)
-            
-            try:
-                base_img = page.extract_image(xref)
-                if not base_img or "image" not in base_img:
-                    continue
-                original_data = base_img["image"]
-                ext = base_img.get("ext", "").lower()
-                if ext not in ["jpg", "jpeg", "png"]:
-                    continue
-
-                pil_img = Image.open(io.BytesIO(original_data))
-                if convert_cmyk and pil_img.mode == "CMYK":
-                    pil_img = pil_img.convert("RGB")
-                elif pil_img.mode not in ("RGB", "L"):
-                    pil_img = pil_img.convert("RGB")
-                
-                if remove_metadata:
-                    new_img = Image.new(pil_img.mode, pil_img.size)
-                    new_img.paste(pil_img)
-                    pil_img = new_img
-                
-                if max_width and max_height:
-                    if pil_img.width > max_width or pil_img.height > max_height:
-                        pil_img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                
-                buf = io.BytesIO()
-                pil_img.save(buf, format="JPEG", quality=quality, optimize=True)
-                new_data = buf.getvalue()
-                buf.close()
-                page.replace_image(xref, new_data)
-            except Exception:
-                continue
-        
+    settings = {
+        "quality": quality,
+        "max_width": max_width,
+        "max_height": max_height,
+        "remove_metadata": remove_metadata,
+        "convert_cmyk": convert_cmyk,
+    }
+
+    # One insert_pdf call keeps images that pages share as a single object, and
+    # de-duplication folds separate copies of the same image (and their colour
+    # profiles) into one, so every page refers to the same image.
+    dst_doc.insert_pdf(src_doc)
+    dedupe_fitz_objects(dst_doc)
+    table = _image_table(src_doc, dst_doc)
+
+    # The source xrefs are recompressed, so worker processes can read them from input_path.
+    targets = {src_xref: (dst_xref, page_num) for dst_xref, src_xref, page_num in table if src_xref is not None}
+    report = CompressionReport(
+        output_path, "preserve", input_bytes=os.path.getsize(input_path), target_bytes=target_bytes
+    )
+    if target_bytes:
+        estimate = _preserve_size_estimator(src_doc, dst_doc, targets, settings, min_savings)
+        settings["quality"], settings["scale"] = _choose_jpeg_settings(estimate, target_bytes)
+        report.estimated_bytes = int(estimate(settings["quality"], settings["scale"]))
+    report.quality, report.scale = settings["quality"], settings.get("scale", 1.0)
+    image_pages = {}
+    for page in dst_doc:
+        for img in page.get_images(full=True):
+            image_pages.setdefault(img[0], []).append(page.number)
+
+    for dst_xref, src_xref, page_num in table:
+        if src_xref is None:
+            report.images.append(ImageSavings(
+                dst_xref, image_pages.get(dst_xref, [page_num]), _stream_bytes(dst_doc, dst_xref),
+                status="failed", error="no matching image in the source document"
+            ))
+    for n, (src_xref, (new_data, error)) in enumerate(
+        _iter_task_results(_recompress_xref, list(targets), settings, src_doc, input_path, workers), 1
+    ):
+        dst_xref, page_num = targets[src_xref]
+        image = ImageSavings(src_xref, image_pages.get(dst_xref, [page_num]), _stream_bytes(src_doc, src_xref))
+        if error is not None:
+            image.status, image.error = "failed", error
+        elif new_data is not None:
+            image.new_bytes = len(new_data)
+            if image.new_bytes >= image.original_bytes:
+                image.status = "grown"
+            elif _keeps_saving(image.original_bytes, image.new_bytes, min_savings):
+                try:
+                    _write_jpeg_in_place(dst_doc, dst_xref, new_data)
+                    image.status = "saved"
+                except Exception as e:
+                    image.status, image.error = "failed", str(e)
+        report.images.append(image)
         if progress_callback:
-            progress_callback(int(((i + 1) / total_pages) * 100))
-    
+            progress_callback(int((n / len(targets)) * 100))
+
+    if progress_callback and not targets:
+        progress_callback(100)
+
     src_doc.close()
     dst_doc.save(output_path, incremental=False, deflate=True, garbage=4)
     dst_doc.close()
-    return os.path.getsize(output_path) / (1024 * 1024)
+    report.output_bytes = os.path.getsize(output_path)
+    report.pages = _page_savings(report.images)
+    return report
+
+
+def _page_savings(images):
+    """Add up ImageSavings per page, in page order."""
+    pages = {}
+    for image in images:
+        for page_num in image.pages:
+            page = pages.setdefault(page_num, PageSavings(page_num))
+            page.saved_bytes += image.saved_bytes
+            page.skipped_bytes += image.skipped_bytes
+            page.grown_bytes += image.grown_bytes
+            page.failed_bytes += image.failed_bytes
+            setattr(page, f"images_{image.status}", getattr(page, f"images_{image.status}") + 1)
+    return [pages[page_num] for page_num in sorted(pages)]
+
+
+def _classify_page(page_num, features, skip_text_rich, skip_vector_only):
+    """
+    Decide from a page's PageFeatures whether rasterize mode should keep it as it is.
+
+    Returns (skip, message). A page with a large image is always rasterized.
+    """
+    img_count = features.image_count
+    text_length = features.text_chars if features.has_text else 0
+
+    # Check if any image is "large"
+    large_image_found = features.max_image_area >= LARGE_IMAGE_THRESHOLD
+
+    # Force rasterization if a large image is found.
+    # Otherwise, if skip conditions are met, skip rasterizing.
+    if not large_image_found:
+        if skip_vector_only:
+            # If vector paths outnumber images, skip rasterization.
+            if features.paths > img_count:
+                return True, f"Page {page_num + 1}: Skipping rasterization because vector count ({features.paths}) > image count ({img_count})."
+        if skip_text_rich:
+            if text_length >= TEXT_THRESHOLD and (img_count == 0 or text_length > img_count * TEXT_FACTOR):
+                return True, f"Page {page_num + 1}: Skipping rasterization because text length ({text_length}) is high relative to image count ({img_count})."
+    return False, f"Page {page_num + 1}: Rasterizing page (large_image_found={large_image_found})."
+
+
+def _render_page_image(page, dpi):
+    """Render page at dpi as an RGB PIL image."""
+    zoom = dpi / 72.0
+    mat = fitz.Matrix(zoom, zoom)
+    pix = page.get_pixmap(matrix=mat, alpha=False)
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+
+def _rasterize_page(doc, page_num, dpi, quality, max_width, max_height, skip_pages=(), scale=1.0):
+    """Return JPEG bytes for one page, or None if the page is kept as is."""
+    if page_num in skip_pages:
+        return None
+    pil_img = _render_page_image(doc[page_num], dpi)
+    return _encode_jpeg(pil_img, quality, max_width, max_height, scale)
+
+
+def _raster_size_estimator(src_doc, input_path, options, skip_pages):
+    """
+    Return estimate(quality, scale) -> expected output bytes for rasterize mode.
+
+    Pages in skip_pages are counted as their share of the input file;
+    a few of the pages to rasterize are rendered once and re-encoded per estimate,
+    and their average stands for every rasterized page.
+    """
+    total_pages = len(src_doc)
+    raster_pages = [page_num for page_num in range(total_pages) if page_num not in skip_pages]
+    kept_pages = total_pages - len(raster_pages)
+    fixed = os.path.getsize(input_path) * kept_pages / max(1, total_pages) + PAGE_OVERHEAD_BYTES * len(raster_pages)
+    samples = [
+        _render_page_image(src_doc[page_num], options["dpi"])
+        for page_num in _evenly_spaced(raster_pages, TARGET_SAMPLE_PAGES)
+    ]
+
+    def estimate(quality, scale):
+        if not samples:
+            return fixed
+        new_bytes = sum(
+            len(_encode_jpeg(pil_img, quality, options["max_width"], options["max_height"], scale))
+            for pil_img in samples
+        )
+        return fixed + new_bytes * len(raster_pages) / len(samples)
+
+    return estimate
 
 
 def _rasterize_pdf(
@@ -119,8 +774,10 @@ def _rasterize_pdf(
     max_height: int,
     progress_callback,
     skip_text_rich: bool = False,
-    skip_vector_only: bool = False
-) -> float:
+    skip_vector_only: bool = False,
+    workers: int = 1,
+    target_bytes: int = None
+) -> CompressionReport:
     """
     Rasterizes each page unless either:
       - skip_text_rich is True and text is dominant relative to images, or
@@ -129,80 +786,55 @@ def _rasterize_pdf(
     Additionally, if any image on the page is large (area exceeds threshold),
     the page is forced to rasterize.
     
-    The new page size is kept the same as the original.
+    The new page size is kept the same as the original. With target_bytes the
+    JPEG quality and downscale factor are chosen from a few sample pages first.
+
+    Pages are classified from content-stream operator counts, image sizes and
+    text strings (see pdf_page_analysis), cached by document digest, so running
+    the same file again with other settings skips the analysis.
     """
     src_doc = fitz.open(input_path)
     dst_doc = fitz.open()
     total_pages = len(src_doc)
-    
-    # Define thresholds.
-    TEXT_THRESHOLD = 200       # minimum characters to consider page text-rich
-    TEXT_FACTOR = 100          # text length should exceed image_count * TEXT_FACTOR
-    LARGE_IMAGE_THRESHOLD = 500000  # e.g., an image with area >= 500,000 pixels is "large"
-    
-    for i in range(total_pages):
-        page = src_doc[i]
-        page_rect = page.rect  # original page size in points
-        
-        # Retrieve images, vector drawings, and text.
-        img_list = page.get_images(full=True)
-        img_count = len(img_list)
-        drawings = page.get_drawings()
-        text = page.get_text("text").strip()
-        text_length = len(text)
-        
-        # Check if any image is "large"
-        large_image_found = False
-        for img_info in img_list:
-            # img_info: (xref, smask, width, height, bpc, colorspace, ...)
-            w = img_info[2]
-            h = img_info[3]
-            if w * h >= LARGE_IMAGE_THRESHOLD:
-                large_image_found = True
-                break
-        
-        # Decide whether to skip rasterizing this page:
-        # Force rasterization if a large image is found.
-        # Otherwise, if skip conditions are met, skip rasterizing.
-        skip_this_page = False
-        
-        if not large_image_found:
-            if skip_vector_only:
-                # If vector drawings outnumber images, skip rasterization.
-                if len(drawings) > img_count:
-                    skip_this_page = True
-                    print(f"Page {i+1}: Skipping rasterization because vector count ({len(drawings)}) > image count ({img_count}).")
-            if not skip_this_page and skip_text_rich:
-                if text_length >= TEXT_THRESHOLD and (img_count == 0 or text_length > img_count * TEXT_FACTOR):
-                    skip_this_page = True
-                    print(f"Page {i+1}: Skipping rasterization because text length ({text_length}) is high relative to image count ({img_count}).")
-        
-        # If skip_this_page is True, insert original page; else, rasterize.
-        if skip_this_page:
+    if skip_text_rich or skip_vector_only:
+        verdicts = [
+            _classify_page(page_num, features, skip_text_rich, skip_vector_only)
+            for page_num, features in enumerate(analyze_document(src_doc, input_path))
+        ]
+    else:
+        verdicts = [(False, f"Page {page_num + 1}: Rasterizing page.") for page_num in range(total_pages)]
+    skip_pages = frozenset(page_num for page_num, (skip, _) in enumerate(verdicts) if skip)
+    options = {
+        "dpi": dpi,
+        "quality": quality,
+        "max_width": max_width,
+        "max_height": max_height,
+        "skip_pages": skip_pages,
+    }
+    report = CompressionReport(
+        output_path, "rasterize", input_bytes=os.path.getsize(input_path), target_bytes=target_bytes,
+        kept_pages=sorted(skip_pages), messages=[message for _, message in verdicts]
+    )
+    if target_bytes:
+        estimate = _raster_size_estimator(src_doc, input_path, options, skip_pages)
+        options["quality"], options["scale"] = _choose_jpeg_settings(estimate, target_bytes)
+        report.estimated_bytes = int(estimate(options["quality"], options["scale"]))
+    report.quality, report.scale = options["quality"], options.get("scale", 1.0)
+
+    for i, img_data in _iter_task_results(_rasterize_page, range(total_pages), options, src_doc, input_path, workers):
+        # Pages that were not rendered are copied as they are.
+        if img_data is None:
             dst_doc.insert_pdf(src_doc, from_page=i, to_page=i)
         else:
-            print(f"Page {i+1}: Rasterizing page (large_image_found={large_image_found}).")
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            pil_img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            if max_width and max_height:
-                if pil_img.width > max_width or pil_img.height > max_height:
-                    pil_img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-            
-            buf = io.BytesIO()
-            pil_img.save(buf, format="JPEG", quality=quality, optimize=True)
-            img_data = buf.getvalue()
-            buf.close()
-            
+            page_rect = src_doc[i].rect  # original page size in points
             new_page = dst_doc.new_page(width=page_rect.width, height=page_rect.height)
             new_page.insert_image(page_rect, stream=img_data)
-        
+
         if progress_callback:
             progress_callback(int(((i + 1) / total_pages) * 100))
-    
+
     src_doc.close()
     dst_doc.save(output_path, deflate=True, garbage=4)
     dst_doc.close()
-    return os.path.getsize(output_path) / (1024 * 1024)
+    report.output_bytes = os.path.getsize(output_path)
+    return report
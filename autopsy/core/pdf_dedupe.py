@@ -0,0 +1,90 @@
+from io import BytesIO
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NullObject, StreamObject
+from autopsy.core.pdf_io_utils import ANNOTATION_TYPE, STRUCTURAL_TYPES, content_key
+
+
+def serialize_object(obj):
+    """Return the PDF serialization of a PyPDF2 object (references stay as 'N 0 R')."""
+    buffer = BytesIO()
+    obj.write_to_stream(buffer, None)
+    return buffer.getvalue()
+
+
+def is_annotation_dict(obj):
+    """True for annotation and form field dictionaries, which must never be shared."""
+    return (
+        obj.get("/Type") == ANNOTATION_TYPE
+        or "/FT" in obj
+        or ("/Subtype" in obj and "/Rect" in obj)
+    )
+
+
+def _keeps_identity(obj):
+    return isinstance(obj, DictionaryObject) and (
+        obj.get("/Type") in STRUCTURAL_TYPES or is_annotation_dict(obj)
+    )
+
+
+def _remap_references(obj, remap, writer):
+    """Point references to duplicate objects at their kept copy, in place."""
+    if isinstance(obj, DictionaryObject):
+        items = obj.items()
+    elif isinstance(obj, ArrayObject):
+        items = enumerate(obj)
+    else:
+        return
+    for key, value in list(items):
+        if isinstance(value, IndirectObject):
+            if value.idnum in remap:
+                obj[key] = IndirectObject(remap[value.idnum], 0, writer)
+        else:
+            _remap_references(value, remap, writer)
+
+
+def dedupe_writer_objects(writer):
+    """
+    Merge byte-identical objects of a PyPDF2 PdfWriter before it is written.
+    (pdf_fitz_utils.dedupe_fitz_objects does the same for PyMuPDF documents.)
+
+    Every indirect object (streams such as fonts, images and ICC profiles, and the
+    dictionaries that describe them) is hashed by its serialized content; duplicates
+    are replaced by null objects and all references are pointed at the first copy.
+    This repeats until nothing changes, so a font dictionary becomes a duplicate once
+    its font file has been merged. Page tree nodes, annotations and form fields keep
+    their identity. Returns the number of bytes saved.
+    """
+    objects = writer._objects
+    data_keys = {}  # object number -> hash of its stream data, which never changes
+    saved = 0
+    while True:
+        seen = {}
+        remap = {}
+        for index, obj in enumerate(objects):
+            if not isinstance(obj, (DictionaryObject, ArrayObject)):
+                continue
+            if _keeps_identity(obj):
+                continue
+            number = index + 1
+            if isinstance(obj, StreamObject):
+                # Only the stream dictionary can change between passes; hash the data once.
+                buffer = BytesIO()
+                DictionaryObject.write_to_stream(obj, buffer, None)
+                if number not in data_keys:
+                    data_keys[number] = content_key(obj._data)
+                key = content_key(buffer.getvalue() + data_keys[number])
+                size = buffer.tell() + len(obj._data)
+            else:
+                data = serialize_object(obj)
+                key = content_key(data)
+                size = len(data)
+            kept = seen.setdefault(key, number)
+            if kept != number:
+                remap[number] = kept
+                saved += size
+        if not remap:
+            return saved
+        for number in remap:
+            # PdfWriter 3.x cannot write None entries; a null keeps the xref aligned.
+            objects[number - 1] = NullObject()
+        for obj in objects:
+            _remap_references(obj, remap, writer)
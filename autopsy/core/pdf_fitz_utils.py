@@ -0,0 +1,72 @@
+import re
+from autopsy.core.pdf_io_utils import ANNOTATION_TYPE, STRUCTURAL_TYPES, content_key
+
+_REFERENCE = re.compile(r"\b(\d+) 0 R\b")
+
+
+def _remap_text(text, remap):
+    return _REFERENCE.sub(
+        lambda m: f"{remap[int(m.group(1))]} 0 R" if int(m.group(1)) in remap else m.group(0), text
+    )
+
+
+def _fitz_keeps_identity(doc, xref):
+    if doc.xref_get_key(xref, "Type")[1] in STRUCTURAL_TYPES + (ANNOTATION_TYPE,):
+        return True
+    if doc.xref_get_key(xref, "FT")[0] != "null":
+        return True
+    return doc.xref_get_key(xref, "Subtype")[0] != "null" and doc.xref_get_key(xref, "Rect")[0] != "null"
+
+
+def dedupe_fitz_objects(doc):
+    """
+    Merge byte-identical objects of a PyMuPDF document before it is saved.
+
+    References to duplicates are rewritten to the first copy; the duplicates become
+    unreferenced and are dropped by save(garbage=1). This is much faster than MuPDF's
+    own garbage=3/4 comparison on large outputs. Page tree nodes, annotations and
+    form fields keep their identity. Returns the number of bytes saved,
+    counted on the objects as they are before save() deflates them.
+    """
+    data_keys = {}
+    removed = set()  # duplicates already folded away; unreferenced until saved
+    saved = 0
+    while True:
+        seen = {}
+        remap = {}
+        for xref in range(1, doc.xref_length()):
+            if xref in removed or _fitz_keeps_identity(doc, xref):
+                continue
+            text = doc.xref_object(xref, compressed=True)
+            size = len(text)
+            key = text.encode()
+            if doc.xref_is_stream(xref):
+                if xref not in data_keys:
+                    data = doc.xref_stream_raw(xref)
+                    data_keys[xref] = (content_key(data), len(data))
+                key += data_keys[xref][0]
+                size += data_keys[xref][1]
+            kept = seen.setdefault(content_key(key), xref)
+            if kept != xref:
+                remap[xref] = kept
+                saved += size
+        if not remap:
+            return saved
+        removed.update(remap)
+        for xref in range(1, doc.xref_length()):
+            if xref in removed:
+                continue
+            text = doc.xref_object(xref, compressed=True)
+            if not _REFERENCE.search(text):
+                continue
+            if doc.xref_is_stream(xref):
+                # update_object would drop the stream data, so patch the dictionary keys.
+                for name in doc.xref_get_keys(xref):
+                    value = doc.xref_get_key(xref, name)[1]
+                    new_value = _remap_text(value, remap)
+                    if new_value != value:
+                        doc.xref_set_key(xref, name, new_value)
+            else:
+                new_text = _remap_text(text, remap)
+                if new_text != text:
+                    doc.update_object(xref, new_text)
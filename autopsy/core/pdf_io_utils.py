@@ -0,0 +1,43 @@
+import os
+import hashlib
+
+# Page tree nodes and the catalog are structural; two identical pages must stay two pages.
+STRUCTURAL_TYPES = ("/Page", "/Pages", "/Catalog")
+# Annotations (including form widgets) belong to one page, and a form field is one
+# field; /Type is optional on them, but /Subtype with /Rect or /FT marks them too.
+ANNOTATION_TYPE = "/Annot"
+
+
+def write_atomically(output_path, write_func):
+    """
+    Write a file through write_func(file_obj) into a temporary file next to output_path,
+    then rename it into place so readers never see a half-written output. The data is
+    fsynced before the rename, so a crash cannot leave a renamed but empty file.
+    """
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write_func(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def coalesce_page_runs(pages):
+    """Collapse sorted 0-based page numbers into (start, stop) runs of consecutive pages."""
+    runs = []
+    for page in pages:
+        if runs and runs[-1][1] == page:
+            runs[-1][1] = page + 1
+        else:
+            runs.append([page, page + 1])
+    return [(start, stop) for start, stop in runs]
+
+
+def content_key(data):
+    """Content hash used to recognise byte-identical objects."""
+    return hashlib.sha256(data).digest()
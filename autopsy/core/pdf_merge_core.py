@@ -1,15 +1,110 @@
 import os
-from PyPDF2 import PdfReader, PdfMerger
+import time
+from dataclasses import dataclass
+from PyPDF2 import PdfReader, PdfWriter
+from autopsy.core.pdf_io_utils import coalesce_page_runs, write_atomically
 
-def merge_selected_pdfs(files_to_merge, pages_to_include, save_path):
-    pdf_merger = PdfMerger()
+
+@dataclass
+class MergeResult:
+    """
+    Outcome of merge_pdf_ranges.
+
+    Timings are in seconds: open_seconds parsing the sources, copy_seconds copying
+    pages into the writer, write_seconds serializing the output.
+    """
+    output_path: str
+    pages: int = 0
+    files: int = 0
+    bytes: int = 0
+    open_seconds: float = 0.0
+    copy_seconds: float = 0.0
+    write_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+
+def normalize_page_ranges(ranges, total_pages):
+    """
+    Clamp and merge (start, stop) ranges (0-based, stop exclusive) for a file of total_pages.
+
+    None selects the whole file. Order is kept; touching ranges are joined.
+    """
+    if ranges is None:
+        return [(0, total_pages)] if total_pages else []
+    runs = []
+    for start, stop in ranges:
+        start, stop = max(0, start), min(stop, total_pages)
+        if start >= stop:
+            continue
+        if runs and runs[-1][1] == start:
+            runs[-1] = (runs[-1][0], stop)
+        else:
+            runs.append((start, stop))
+    return runs
+
+
+def merge_pdf_ranges(selections, save_path):
+    """
+    Merge page ranges of several PDFs, in order, into save_path.
+
+    selections is a plain ordered list of (path, ranges), where ranges is a list of
+    (start, stop) pairs (0-based, stop exclusive) or None for every page; a path may
+    appear more than once. Each source is parsed once and every range is copied with
+    a single PdfWriter.append call. The output is written to a temp file and renamed
+    into place. Only plain data goes in and out, so this is safe to call from worker
+    threads, process pools and the command line. Returns a MergeResult.
+    """
+    start = time.perf_counter()
+    result = MergeResult(save_path)
+    readers = {}
+    writer = PdfWriter()
+    for path, ranges in selections:
+        tick = time.perf_counter()
+        reader = readers.get(path)
+        if reader is None:
+            reader = readers[path] = PdfReader(path)
+        result.open_seconds += time.perf_counter() - tick
+
+        tick = time.perf_counter()
+        for run_start, run_stop in normalize_page_ranges(ranges, len(reader.pages)):
+            writer.append(reader, pages=(run_start, run_stop))
+            result.pages += run_stop - run_start
+        result.copy_seconds += time.perf_counter() - tick
+
+    tick = time.perf_counter()
+    write_atomically(save_path, writer.write)
+    writer.close()
+    result.write_seconds = time.perf_counter() - tick
+    result.files = len(readers)
+    result.bytes = os.path.getsize(save_path)
+    result.total_seconds = time.perf_counter() - start
+    return result
+
+
+def selections_from_pages(files_to_merge, selected_pages):
+    """
+    Build merge_pdf_ranges selections from {path: iterable of 0-based page numbers}.
+
+    Consecutive pages are collapsed into ranges; files without selected pages are left out.
+    """
+    selections = []
     for pdf_file in files_to_merge:
-        pdf_reader = PdfReader(pdf_file)
-        # For each page, check if its checkbox is selected
-        for page_num in range(len(pdf_reader.pages)):
-            checkbox = pages_to_include.get((pdf_file, page_num))
-            if checkbox and checkbox.isChecked():
-                pdf_merger.append(pdf_file, pages=(page_num, page_num + 1))
-    with open(save_path, "wb") as f:
-        pdf_merger.write(f)
-    pdf_merger.close()
+        runs = coalesce_page_runs(sorted(selected_pages.get(pdf_file, ())))
+        if runs:
+            selections.append((pdf_file, runs))
+    return selections
+
+
+
+def merge_selected_pdfs(files_to_merge, pages_to_include, save_path):
+    """
+    Merge the checked pages of files_to_merge, in order, into save_path.
+
+    pages_to_include maps (pdf_file, page_num) to a checkbox-like object with
+    isChecked(). The selection is read once up front and handed to merge_pdf_ranges.
+    """
+    selected_pages = {}
+    for (pdf_file, page_num), checkbox in pages_to_include.items():
+        if checkbox and checkbox.isChecked():
+            selected_pages.setdefault(pdf_file, []).append(page_num)
+    return merge_pdf_ranges(selections_from_pages(files_to_merge, selected_pages), save_path)
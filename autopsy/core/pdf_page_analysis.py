@@ -0,0 +1,307 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass, asdict
+from autopsy.utils import file_fingerprint, user_data_dir
+
+ANALYSIS_VERSION = 2  # bump when PageFeatures or the way they are counted changes
+CACHE_FILE_NAME = "page_analysis.db"
+MAX_CACHED_DOCUMENTS = 1000
+DIGEST_CHUNK_BYTES = 1024 * 1024
+
+# Content-stream operators that paint a path (one vector drawing each) and that show text.
+PAINT_OPERATORS = {b"S", b"s", b"f", b"F", b"f*", b"B", b"B*", b"b", b"b*", b"sh"}
+TEXT_OPERATORS = {b"Tj", b"TJ", b"'", b'"'}
+MAX_FORM_DEPTH = 12  # nesting of form XObjects followed before giving up
+
+# The content-stream tokens the scanner acts on. Numbers, arrays, dictionaries and
+# all other operators (most of a drawing: m, l, c, re, cm) are skipped by the regex;
+# the leading lookahead lets it reject every other byte without trying each branch.
+_TOKEN = re.compile(
+    rb"(?=[B(</SsFfbTq'\"QD])"
+    rb"(?:(?P<inline>\bBI\b.*?\bID\s.*?\bEI\b)"
+    rb"|(?P<literal>\((?:\\.|[^\\()])*\))"
+    rb"|(?P<hex><(?!<)[0-9A-Fa-f\s]*>)"
+    rb"|(?P<name>/[^\s/\[\]()<>{}%]*)"
+    rb"|(?P<operator>(?<![A-Za-z0-9*'\"])(?:[SsFfBb]\*?|sh|T[jJf]|['\"]|[qQ]|Do)(?![A-Za-z0-9*'\"])))",
+    re.DOTALL
+)
+_ESCAPE = re.compile(rb"\\([0-7]{1,3}|\r\n|[\s\S])")
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+_RESOURCE_ENTRY = re.compile(r"/([^\s/\[\]()<>{}%]+)\s*(\d+)\s+0\s+R")
+_WHITESPACE = b" \t\r\n\x0c\x00"
+
+# Documents already hashed in this process: file fingerprint -> content digest
+_digests = {}
+_default_cache = None
+
+
+@dataclass
+class PageFeatures:
+    """
+    Cheap description of one page, taken from its content streams and image list.
+
+    paths counts painted paths and shadings and text_ops the text-showing operators,
+    including those of form XObjects, once per time a form is drawn. text_chars
+    counts the shown characters except whitespace: a byte per character for simple
+    fonts and two for Type0 (CID) fonts, so it tracks the length of the page's
+    extracted text without spaces and line breaks. Images are counted from
+    get_images plus inline images.
+    """
+    paths: int = 0
+    text_ops: int = 0
+    text_chars: int = 0
+    image_count: int = 0
+    max_image_area: int = 0
+
+    @property
+    def has_text(self):
+        return self.text_ops > 0
+
+
+def document_digest(path):
+    """SHA-256 of the file's contents; remembered per (path, size, mtime) for this process."""
+    fingerprint = file_fingerprint(path)
+    digest = _digests.get(fingerprint)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(DIGEST_CHUNK_BYTES), b""):
+                sha.update(chunk)
+        digest = _digests[fingerprint] = sha.hexdigest()
+    return digest
+
+
+def _literal_bytes(token):
+    """Decode a literal string token, escapes included, to the bytes it shows."""
+    def unescape(match):
+        escaped = match.group(1)
+        if escaped[:1].isdigit():
+            return bytes([int(escaped, 8) & 0xFF])
+        if escaped in (b"\r\n", b"\n", b"\r"):
+            return b""  # line continuation
+        return _ESCAPES.get(escaped, escaped)
+    return _ESCAPE.sub(unescape, token[1:-1])
+
+
+def _hex_bytes(token):
+    digits = re.sub(rb"\s", b"", token[1:-1])
+    if len(digits) % 2:
+        digits += b"0"
+    return bytes.fromhex(digits.decode("ascii"))
+
+
+def _shown_chars(data, bytes_per_char):
+    if bytes_per_char == 1:
+        return len(data.translate(None, _WHITESPACE))
+    return len(data) // bytes_per_char
+
+
+def _resources(doc, xref, kind):
+    """Return {resource name: xref} of a page's or form's /Resources/<kind>, following /Parent for pages."""
+    for _ in range(MAX_FORM_DEPTH):
+        value_type, value = doc.xref_get_key(xref, f"Resources/{kind}")
+        if value_type == "xref":
+            value = doc.xref_object(int(value.split()[0]), compressed=True)
+        elif value_type != "dict":
+            parent_type, parent = doc.xref_get_key(xref, "Parent")
+            if doc.xref_get_key(xref, "Resources")[0] == "null" and parent_type == "xref":
+                xref = int(parent.split()[0])  # inherited from the page tree
+                continue
+            return {}
+        return {name.encode(): int(number) for name, number in _RESOURCE_ENTRY.findall(value)}
+    return {}
+
+
+class _StreamScanner:
+    """
+    Counts the operators of a page's content streams in one pass per stream.
+
+    The current font is tracked (through q/Q) to know how many bytes a shown
+    character takes, and form XObjects are followed where they are drawn with Do.
+    The counts of a form are kept, so a form drawn many times is scanned once.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._forms = {}  # (form xref, bytes per char on entry) -> PageFeatures of one drawing
+        self._font_widths = {}  # font xref -> bytes per char
+
+    def _font_width(self, xref):
+        width = self._font_widths.get(xref)
+        if width is None:
+            width = self._font_widths[xref] = 2 if self.doc.xref_get_key(xref, "Subtype")[1] == "/Type0" else 1
+        return width
+
+    def scan(self, stream, owner, features, bytes_per_char=1, active=()):
+        """Add the counts of stream, whose resources belong to object owner, to features."""
+        fonts = _resources(self.doc, owner, "Font")
+        xobjects = None
+        saved = []
+        strings = []
+        last_name = None
+        for match in _TOKEN.finditer(stream):
+            kind = match.lastgroup
+            token = match.group()
+            if kind == "literal":
+                strings.append(_literal_bytes(token))
+                continue
+            if kind == "hex":
+                strings.append(_hex_bytes(token))
+                continue
+            if kind == "name":
+                last_name = token[1:]
+                continue
+            if kind == "inline":
+                features.image_count += 1
+            elif token in PAINT_OPERATORS:
+                features.paths += 1
+            elif token in TEXT_OPERATORS:
+                features.text_ops += 1
+                features.text_chars += sum(_shown_chars(data, bytes_per_char) for data in strings)
+            elif token == b"Tf" and last_name in fonts:
+                bytes_per_char = self._font_width(fonts[last_name])
+            elif token == b"q":
+                saved.append(bytes_per_char)
+            elif token == b"Q" and saved:
+                bytes_per_char = saved.pop()
+            elif token == b"Do" and last_name is not None:
+                if xobjects is None:
+                    xobjects = _resources(self.doc, owner, "XObject")
+                xref = xobjects.get(last_name)
+                if xref is not None and xref not in active and len(active) < MAX_FORM_DEPTH:
+                    self._add_form(xref, features, bytes_per_char, active + (owner,))
+            strings = []
+            last_name = None
+
+    def _add_form(self, xref, features, bytes_per_char, active):
+        key = (xref, bytes_per_char)
+        form = self._forms.get(key)
+        if form is None:
+            form = PageFeatures()
+            if self.doc.xref_get_key(xref, "Subtype")[1] == "/Form":  # images are counted by get_images
+                try:
+                    self.scan(self.doc.xref_stream(xref) or b"", xref, form, bytes_per_char, active)
+                except Exception:
+                    pass
+            self._forms[key] = form
+        features.paths += form.paths
+        features.text_ops += form.text_ops
+        features.text_chars += form.text_chars
+        features.image_count += form.image_count
+
+
+def analyze_page(page):
+    """Describe page by its own content streams and the form XObjects they draw."""
+    features = PageFeatures()
+    _StreamScanner(page.parent).scan(page.read_contents(), page.xref, features)
+    for img_info in page.get_images(full=True):
+        # img_info: (xref, smask, width, height, bpc, colorspace, ...)
+        features.image_count += 1
+        features.max_image_area = max(features.max_image_area, img_info[2] * img_info[3])
+    return features
+
+
+def default_cache_path():
+    return os.path.join(user_data_dir(), "cache", CACHE_FILE_NAME)
+
+
+class PageAnalysisCache:
+    """
+    Persistent store of PageFeatures lists, keyed by document content digest.
+
+    One row per document holds the features of every page as JSON. Entries from
+    another ANALYSIS_VERSION are ignored, and beyond MAX_CACHED_DOCUMENTS the least
+    recently used documents are dropped.
+    """
+
+    def __init__(self, path=None, max_documents=MAX_CACHED_DOCUMENTS):
+        self.path = path or default_cache_path()
+        self.max_documents = max_documents
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                digest TEXT PRIMARY KEY,
+                version INTEGER,
+                pages TEXT,
+                last_used REAL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, digest):
+        """Return the cached [PageFeatures] of a document, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages FROM documents WHERE digest = ? AND version = ?", (digest, ANALYSIS_VERSION)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE documents SET last_used = ? WHERE digest = ?", (time.time(), digest))
+            self._conn.commit()
+        return [PageFeatures(**page) for page in json.loads(row[0])]
+
+    def put(self, digest, pages):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (digest, version, pages, last_used) VALUES (?, ?, ?, ?)",
+                (digest, ANALYSIS_VERSION, json.dumps([asdict(page) for page in pages]), time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM documents WHERE digest NOT IN "
+                "(SELECT digest FROM documents ORDER BY last_used DESC LIMIT ?)",
+                (self.max_documents,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def page_analysis_cache():
+    """The shared PageAnalysisCache, or None if it cannot be opened."""
+    global _default_cache
+    if _default_cache is None:
+        try:
+            _default_cache = PageAnalysisCache()
+        except Exception as e:
+            print(f"Page analysis cache unavailable, pages will be analyzed on every run: {e}")
+            _default_cache = False
+    return _default_cache or None
+
+
+def analyze_document(doc, path, cache=None):
+    """
+    Return [PageFeatures] for every page of doc, which was opened from path.
+
+    The result is looked up by the file's content digest first, so compressing
+    the same file again (with other settings, or after copying it) skips the
+    analysis. cache defaults to page_analysis_cache().
+    """
+    cache = cache or page_analysis_cache()
+    digest = None
+    if cache is not None:
+        try:
+            digest = document_digest(path)
+            pages = cache.get(digest)
+            if pages is not None and len(pages) == len(doc):
+                return pages
+        except Exception as e:
+            print(f"Page analysis cache read failed: {e}")
+
+    pages = [analyze_page(page) for page in doc]
+    if cache is not None and digest is not None:
+        try:
+            cache.put(digest, pages)
+        except Exception as e:
+            print(f"Page analysis cache write failed: {e}")
+    return pages
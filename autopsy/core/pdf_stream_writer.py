@@ -0,0 +1,221 @@
+import os
+import weakref
+from collections import deque
+from io import BytesIO
+from PyPDF2.generic import (
+    ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject, NumberObject, StreamObject
+)
+from autopsy.core.pdf_dedupe import is_annotation_dict
+from autopsy.core.pdf_io_utils import content_key
+
+
+class StreamingPdfWriter:
+    """
+    Memory-bounded PDF writer that streams pages to disk as they are added.
+
+    PyPDF2's PdfWriter keeps every copied page object in memory until write() is
+    called. This writer instead serializes each page and the objects it references
+    (contents, fonts, images, annotations) to a temporary file immediately, keeping
+    only the xref offsets and a source-to-output object number map. commit() writes
+    the page tree, xref table and trailer and renames the file into place; abort()
+    discards it.
+
+    Objects shared between pages of the same source reader (fonts, logos) are
+    written once. With dedupe, objects that are byte-identical across different
+    readers are written once as well (saved_bytes counts what was skipped), except
+    annotations and form fields, which stay one per page. Like
+    PdfWriter.add_page, document-level structures such as outlines and form fields
+    are not copied.
+    """
+    MAX_DEDUPE_DEPTH = 64
+
+    def __init__(self, output_path, dedupe=False):
+        self.output_path = output_path
+        self.dedupe = dedupe
+        self.saved_bytes = 0
+        self._content_numbers = {}  # content hash -> output object number
+        self._hashing = set()
+        self.tmp_path = output_path + ".tmp"
+        self._file = open(self.tmp_path, "wb")
+        self._file.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        self._offsets = {}  # output object number -> byte offset
+        self._next_number = 1
+        # source reader -> {(idnum, generation): output object number}
+        self._translated = weakref.WeakKeyDictionary()
+        # Pages referenced (e.g. by link annotations) before being added themselves.
+        self._deferred_pages = {}  # (reader ref, idnum, generation) -> output object number
+        self._page_refs = []
+        self._written_pages = set()
+        self._pending = deque()
+        self._catalog_number = self._reserve()
+        self._pages_number = self._reserve()
+
+    @property
+    def page_count(self):
+        return len(self._page_refs)
+
+    def _reserve(self):
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def _output_number(self, ref, enqueue=True):
+        table = self._translated.setdefault(ref.pdf, {})
+        key = (ref.idnum, ref.generation)
+        number = table.get(key)
+        if number is None and enqueue and self.dedupe:
+            number = self._write_once(ref, table, key)
+        if number is None:
+            number = self._reserve()
+            table[key] = number
+            if enqueue:
+                self._pending.append((ref, number))
+        return number
+
+    def _copy(self, obj):
+        """Copy a direct object, translating indirect references to output object numbers."""
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(self._output_number(obj), 0, self)
+        if isinstance(obj, StreamObject):
+            copy = StreamObject()
+            for key, value in obj.items():
+                if key != "/Length":  # recomputed when the stream is written
+                    copy[NameObject(key)] = self._copy(value)
+            copy._data = obj._data
+            return copy
+        if isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+            for key, value in obj.items():
+                copy[NameObject(key)] = self._copy(value)
+            return copy
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(value) for value in obj)
+        return obj
+
+    def _write_once(self, ref, table, key):
+        """
+        Write the object behind ref right away unless an identical one was written already.
+
+        Objects are copied depth first, so their references are translated before they
+        are hashed and identical fonts or images that point at identical descriptors or
+        colour spaces are recognised. Returns the output object number, or None when
+        ref should be queued as usual (page tree nodes, reference cycles, deep nesting).
+        """
+        obj = ref.get_object()
+        hashing_key = (id(ref.pdf), key)
+        if (
+            obj is None
+            or (isinstance(obj, DictionaryObject) and (obj.get("/Type") in ("/Page", "/Pages") or is_annotation_dict(obj)))
+            or hashing_key in self._hashing
+            or len(self._hashing) >= self.MAX_DEDUPE_DEPTH
+        ):
+            return None
+        self._hashing.add(hashing_key)
+        try:
+            copy = self._copy(obj)
+        finally:
+            self._hashing.discard(hashing_key)
+        if key in table:
+            # A reference cycle already gave this object a number and queued it.
+            return table[key]
+        buffer = BytesIO()
+        copy.write_to_stream(buffer, None)
+        data = buffer.getvalue()
+        content_hash = content_key(data)
+        number = self._content_numbers.get(content_hash)
+        if number is not None:
+            self.saved_bytes += len(data)
+        else:
+            number = self._reserve()
+            self._content_numbers[content_hash] = number
+            self._write_serialized(number, data)
+        table[key] = number
+        return number
+
+    def _write_serialized(self, number, data):
+        self._offsets[number] = self._file.tell()
+        self._file.write(b"%d 0 obj\n" % number)
+        self._file.write(data)
+        self._file.write(b"\nendobj\n")
+
+    def _write_object(self, number, obj):
+        self._offsets[number] = self._file.tell()
+        self._file.write(b"%d 0 obj\n" % number)
+        obj.write_to_stream(self._file, None)
+        self._file.write(b"\nendobj\n")
+
+    def _drain(self):
+        while self._pending:
+            ref, number = self._pending.popleft()
+            obj = ref.get_object()
+            if isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages"):
+                # Never pull in page tree nodes through references; a page that is
+                # added later claims its reserved number, the rest become null.
+                self._deferred_pages[(weakref.ref(ref.pdf), ref.idnum, ref.generation)] = number
+                continue
+            self._write_object(number, self._copy(obj) if obj is not None else NullObject())
+
+    def add_page(self, page):
+        """Copy a PyPDF2 PageObject (and everything it references) into the output."""
+        source_ref = page.indirect_reference
+        number = None
+        if source_ref is not None:
+            number = self._output_number(source_ref, enqueue=False)
+            self._deferred_pages.pop((weakref.ref(source_ref.pdf), source_ref.idnum, source_ref.generation), None)
+        if number is None or number in self._written_pages:
+            # The same source page can be merged more than once; each copy needs its own object.
+            number = self._reserve()
+        self._written_pages.add(number)
+        copy = DictionaryObject()
+        for key, value in page.items():
+            if key != "/Parent":
+                copy[NameObject(key)] = self._copy(value)
+        copy[NameObject("/Parent")] = IndirectObject(self._pages_number, 0, self)
+        self._write_object(number, copy)
+        self._page_refs.append(IndirectObject(number, 0, self))
+        self._drain()
+
+    def commit(self):
+        """Finish the document and atomically move it to output_path."""
+        try:
+            for number in self._deferred_pages.values():
+                self._write_object(number, NullObject())
+            self._deferred_pages.clear()
+
+            pages = DictionaryObject()
+            pages[NameObject("/Type")] = NameObject("/Pages")
+            pages[NameObject("/Kids")] = ArrayObject(self._page_refs)
+            pages[NameObject("/Count")] = NumberObject(len(self._page_refs))
+            self._write_object(self._pages_number, pages)
+
+            catalog = DictionaryObject()
+            catalog[NameObject("/Type")] = NameObject("/Catalog")
+            catalog[NameObject("/Pages")] = IndirectObject(self._pages_number, 0, self)
+            self._write_object(self._catalog_number, catalog)
+
+            xref_offset = self._file.tell()
+            size = self._next_number
+            self._file.write(b"xref\n0 %d\n" % size)
+            self._file.write(b"0000000000 65535 f \n")
+            for number in range(1, size):
+                offset = self._offsets.get(number)
+                if offset is None:
+                    self._file.write(b"0000000000 00000 f \n")
+                else:
+                    self._file.write(b"%010d 00000 n \n" % offset)
+            self._file.write(b"trailer\n<< /Size %d /Root %d 0 R >>\n" % (size, self._catalog_number))
+            self._file.write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.tmp_path, self.output_path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        """Drop the partial output; the existing output file (if any) is left untouched."""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
@@ -0,0 +1,158 @@
+import os
+import time
+import sqlite3
+import threading
+from autopsy.utils import file_fingerprint, user_data_dir
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024  # 256 MB of thumbnails on disk
+CACHE_FILE_NAME = "thumbnails.db"
+# Cache hits whose last-used time is kept in memory before it is written back in one transaction.
+TOUCH_FLUSH_THRESHOLD = 64
+
+
+def default_cache_path():
+    """The thumbnail cache file; AUTOPSY_THUMBNAIL_CACHE_DIR overrides its directory."""
+    directory = os.environ.get("AUTOPSY_THUMBNAIL_CACHE_DIR") or os.path.join(user_data_dir(), "cache")
+    return os.path.join(directory, CACHE_FILE_NAME)
+
+
+def default_cache_bytes():
+    """The disk budget in bytes; AUTOPSY_THUMBNAIL_CACHE_MB overrides the 256 MB default."""
+    try:
+        return int(float(os.environ["AUTOPSY_THUMBNAIL_CACHE_MB"]) * 1024 * 1024)
+    except (KeyError, ValueError):
+        return DEFAULT_CACHE_BYTES
+
+
+class ThumbnailCache:
+    """
+    Persistent LRU cache of rendered page thumbnails.
+
+    Entries are PNG bytes stored in a single SQLite file, keyed by the source file's
+    fingerprint (path, size, mtime), the page index and the thumbnail width, so a
+    file that is edited simply stops matching its old entries. Each entry records
+    when it was last used; once the stored bytes exceed max_bytes the least recently
+    used entries are deleted until the cache is back under 90% of the budget.
+
+    PNG rather than JPEG or WebP: most pages are text and line art, where a 250 px
+    PNG is the smallest of the three (about 9 KB against 12 KB WebP and 16 KB JPEG
+    at quality 85) and stays sharp; photo pages are 3-6x larger as PNG, which the
+    byte budget absorbs. PNG also needs no optional Qt image plugin to display.
+
+    A hit only notes its last-used time in memory; the times are written back in
+    one transaction by flush(), which runs on every put(), on close() and once
+    TOUCH_FLUSH_THRESHOLD hits have piled up, so reads do not commit. Safe to share
+    between threads; the database runs in WAL mode without a sync per commit.
+    """
+
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path or default_cache_path()
+        self.max_bytes = default_cache_bytes() if max_bytes is None else max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS thumbnails (
+                fingerprint TEXT,
+                page INTEGER,
+                width INTEGER,
+                png BLOB,
+                size INTEGER,
+                last_used REAL,
+                PRIMARY KEY (fingerprint, page, width)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS thumbnails_last_used ON thumbnails (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM thumbnails").fetchone()[0]
+        self._touched = {}  # (fingerprint, page, width) -> last-used time not yet written
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, page_num, width):
+        """Return the cached PNG bytes for a page, or None."""
+        try:
+            fingerprint = file_fingerprint(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT png FROM thumbnails WHERE fingerprint = ? AND page = ? AND width = ?",
+                (fingerprint, page_num, width)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[(fingerprint, page_num, width)] = time.time()
+            if len(self._touched) >= TOUCH_FLUSH_THRESHOLD:
+                self._flush_touched()
+                self._conn.commit()
+            return bytes(row[0])
+
+    def put(self, path, page_num, width, png):
+        """Store a thumbnail and evict least recently used entries if over budget."""
+        try:
+            fingerprint = file_fingerprint(path)
+        except OSError:
+            return
+        with self._lock:
+            self._flush_touched()
+            old = self._conn.execute(
+                "SELECT size FROM thumbnails WHERE fingerprint = ? AND page = ? AND width = ?",
+                (fingerprint, page_num, width)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thumbnails (fingerprint, page, width, png, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (fingerprint, page_num, width, sqlite3.Binary(png), len(png), time.time())
+            )
+            self._total_bytes += len(png) - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+            self._conn.commit()
+
+    def flush(self):
+        """Write the last-used times of recent hits to disk."""
+        with self._lock:
+            if self._touched:
+                self._flush_touched()
+                self._conn.commit()
+
+    def _flush_touched(self):
+        self._conn.executemany(
+            "UPDATE thumbnails SET last_used = ? WHERE fingerprint = ? AND page = ? AND width = ?",
+            [(used, *key) for key, used in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def _evict(self, target_bytes):
+        rows = self._conn.execute("SELECT rowid, size FROM thumbnails ORDER BY last_used")
+        doomed = []
+        for rowid, size in rows:
+            if self._total_bytes <= target_bytes:
+                break
+            doomed.append((rowid,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM thumbnails WHERE rowid = ?", doomed)
+
+    def total_bytes(self):
+        return self._total_bytes
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM thumbnails")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            try:
+                if self._touched:
+                    self._flush_touched()
+                    self._conn.commit()
+            finally:
+                self._conn.close()
@@ -0,0 +1,47 @@
+import os
+from collections import OrderedDict
+import fitz  # PyMuPDF
+
+# Thumbnails are shown 250 px wide; rendering at exactly that width avoids
+# rasterizing at 300 DPI only to scale the result down again.
+THUMBNAIL_WIDTH = 250
+MAX_OPEN_DOCUMENTS = 4
+
+# Documents opened by render_thumbnail_png, per process: (path, size, mtime) -> fitz.Document
+_open_documents = OrderedDict()
+
+
+def thumbnail_matrix(page, width=THUMBNAIL_WIDTH):
+    """Return the zoom matrix that renders page at the given pixel width."""
+    zoom = width / page.rect.width if page.rect.width else 1.0
+    return fitz.Matrix(zoom, zoom)
+
+
+def render_thumbnail(doc, page_num, width=THUMBNAIL_WIDTH):
+    """Render one page of an open fitz document as an RGB Pixmap width pixels wide."""
+    page = doc.load_page(page_num)
+    return page.get_pixmap(matrix=thumbnail_matrix(page, width), alpha=False)
+
+
+def _document(path):
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    doc = _open_documents.get(key)
+    if doc is not None:
+        _open_documents.move_to_end(key)
+        return doc
+    doc = _open_documents[key] = fitz.open(path)
+    while len(_open_documents) > MAX_OPEN_DOCUMENTS:
+        _open_documents.popitem(last=False)[1].close()
+    return doc
+
+
+def render_thumbnail_png(path, page_num, width=THUMBNAIL_WIDTH):
+    """
+    Render one page of the PDF at path and return it as PNG bytes.
+
+    Meant to run in a worker process: the last few documents are kept open between
+    calls (and reopened if the file changes), so consecutive pages of one file do not
+    re-parse it. Only bytes are returned, so results pickle cheaply.
+    """
+    return render_thumbnail(_document(path), page_num, width).tobytes("png")
@@ -1,14 +1,19 @@
 import os
 import json
 import glob
-import re
+import threading
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QTextEdit, QLineEdit,
-    QFormLayout, QSpinBox, QGroupBox, QHBoxLayout, QScrollArea, QDialog, QSpacerItem, QSizePolicy
+    QFormLayout, QSpinBox, QGroupBox, QHBoxLayout, QScrollArea, QDialog, QSpacerItem, QSizePolicy,
+    QProgressBar, QMessageBox
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QIcon
-from autopsy.core.pdf_batch_core import merge_batches  # Core merging function
+from autopsy.core.pdf_batch_core import iter_merge_events  # Core merging function
+from autopsy.core.pdf_batch_events import BATCH_FINISHED, PAGE_ADDED
+from autopsy.core.pdf_batch_fanout import (
+    DEFAULT_SLICE_START, DEFAULT_SLICE_END, DEFAULT_RELEASE_PATTERN, derive_output_name, parse_slice_indices
+)
 from autopsy.utils import resource_path
 
 ASSETS_PATH = resource_path("autopsy/assets")
@@ -36,9 +41,9 @@ class EditConfigDialog(QDialog):
 
         # --- ADD SYNC CONTROLS AT THE TOP ---
         # Retrieve saved slice values from the first batch (if available)
-        default_slice_start = self.config_data[0].get("slice_start", "-7")
-        default_slice_end = self.config_data[0].get("slice_end", "-1")
-        default_release_pattern = self.config_data[0].get("release_pattern", "(REL_)(\\d+)(_.+)")
+        default_slice_start = self.config_data[0].get("slice_start", DEFAULT_SLICE_START)
+        default_slice_end = self.config_data[0].get("slice_end", DEFAULT_SLICE_END)
+        default_release_pattern = self.config_data[0].get("release_pattern", DEFAULT_RELEASE_PATTERN)
 
         # Create a header layout for sync and save controls
         sync_header_layout = QHBoxLayout()
@@ -128,7 +133,7 @@ class EditConfigDialog(QDialog):
     def sync_batches(self):
         """
         Sync the working directory across batches and update the output file names.
-        Two steps are performed:
+        The names are derived with derive_output_name (shared with the fan-out runner):
           1. The first slicing range (from slice_start_input and slice_end_input) is applied to update a substring with the folder code.
           2. If a release pattern is provided and the folder name contains a release number (e.g., "A031111-2"),
              the output file name is updated by replacing the matching portion with the new release number.
@@ -143,54 +148,30 @@ class EditConfigDialog(QDialog):
             return
 
         folder_name = os.path.basename(os.path.normpath(first_wd))
-        folder_parts = folder_name.split('-')
-        folder_code = folder_parts[0]
-        release_number = folder_parts[1] if len(folder_parts) > 1 else None
 
         # Parse slicing indices (supporting multiple ranges separated by semicolons)
         try:
-            start_ranges = [int(x.strip()) for x in self.slice_start_input.text().split(';') if x.strip() != '']
-            end_ranges = [int(x.strip()) for x in self.slice_end_input.text().split(';') if x.strip() != '']
+            start_ranges = parse_slice_indices(self.slice_start_input.text())
+            end_ranges = parse_slice_indices(self.slice_end_input.text())
         except ValueError:
-            print("Invalid slice indices. Please enter valid integers separated by semicolons.")
+            QMessageBox.warning(
+                self, "Sync Batches", "Invalid slice indices. Please enter valid integers separated by semicolons."
+            )
             return
 
-        for (batch, wd_input, output_name_input, _) in self.batch_inputs:
+        release_pattern = self.release_pattern_input.text().strip()
+        # Derive every name first, so a bad release pattern leaves all batches untouched.
+        try:
+            new_names = [
+                derive_output_name(output_name_input.text().strip(), first_wd, start_ranges, end_ranges, release_pattern)
+                for (_, _, output_name_input, _) in self.batch_inputs
+            ]
+        except ValueError as e:
+            QMessageBox.warning(self, "Sync Batches", str(e))
+            return
+        for (batch, wd_input, output_name_input, _), new_name in zip(self.batch_inputs, new_names):
             wd_input.setText(first_wd)
-            current_name = output_name_input.text().strip()
-
-            # First range set: update the folder code
-            if len(start_ranges) >= 1 and len(end_ranges) >= 1:
-                start_idx = start_ranges[0]
-                end_idx = end_ranges[0]
-                adjusted_start = len(current_name) + start_idx if start_idx < 0 else start_idx
-                adjusted_end = len(current_name) + end_idx + 1 if end_idx < 0 else end_idx + 1
-                adjusted_start = max(0, min(len(current_name), adjusted_start))
-                adjusted_end = max(adjusted_start, min(len(current_name), adjusted_end))
-                current_name = current_name[:adjusted_start] + folder_code + current_name[adjusted_end:]
-
-            # Now, update the release number using the provided release pattern
-            release_pattern = self.release_pattern_input.text().strip()
-            if release_pattern and release_number:
-                try:
-                    def replace_release(match):
-                        # Expecting at least three groups: prefix, current release, and suffix.
-                        return f"{match.group(1)}{release_number}{match.group(3)}" if match.lastindex >= 3 else release_number
-                    current_name = re.sub(release_pattern, replace_release, current_name)
-                except Exception as e:
-                    print(f"Error applying release pattern: {e}")
-
-            # If additional slicing ranges are provided, apply them (optional)
-            if len(start_ranges) >= 2 and len(end_ranges) >= 2:
-                start_idx = start_ranges[1]
-                end_idx = end_ranges[1]
-                adjusted_start = len(current_name) + start_idx if start_idx < 0 else start_idx
-                adjusted_end = len(current_name) + end_idx + 1 if end_idx < 0 else end_idx + 1
-                adjusted_start = max(0, min(len(current_name), adjusted_start))
-                adjusted_end = max(adjusted_start, min(len(current_name), adjusted_end))
-                current_name = current_name[:adjusted_start] + current_name[adjusted_end:]
-
-            output_name_input.setText(current_name)
+            output_name_input.setText(new_name)
 
         print(f"Synced batches with working directory: {first_wd}. Updated filenames based on folder '{folder_name}'.")
 
@@ -279,12 +260,49 @@ class ConfigEditor(QDialog):
         print(message)
 
 
+class BatchMergeWorker(QThread):
+    """Runs the batches of a config off the GUI thread and reports progress through signals."""
+    message = Signal(str)
+    pages_added = Signal(int)  # pages added to the current batch so far
+    batch_finished = Signal(int, int)  # batches done, total batches
+
+    def __init__(self, config_data, parent=None):
+        super().__init__(parent)
+        self.config_data = config_data
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        total = len(self.config_data)
+        done = 0
+        try:
+            pages = 0
+            for event in iter_merge_events(self.config_data, cancel_event=self.cancel_event):
+                if event.kind == PAGE_ADDED:
+                    pages += 1
+                    self.pages_added.emit(pages)
+                elif event.kind == BATCH_FINISHED:
+                    self.message.emit("-" * 50)
+                    pages = 0
+                    done += 1
+                    self.batch_finished.emit(done, total)
+                elif event.message:
+                    self.message.emit(event.message)
+        except Exception as e:
+            self.message.emit(f"❌ Error: {str(e)}")
+        if self.cancel_event.is_set():
+            self.message.emit(f"⛔ Merge cancelled after {done} of {total} batches.")
+
+
 class PDFBatchTool(QWidget):
     def __init__(self):
         super().__init__()
         self.batch_list = []
         self.batch_counter = 1
         self.config_path = None
+        self.merge_worker = None
         self.initUI()
 
     def initUI(self):
@@ -323,6 +341,15 @@ class PDFBatchTool(QWidget):
         self.btn_merge.clicked.connect(self.start_merging)
         layout.addWidget(self.btn_merge)
 
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_merging)
+        layout.addWidget(self.btn_cancel)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
         self.log_output = QTextEdit()
         self.log_output.setReadOnly(True)
         layout.addWidget(self.log_output)
@@ -451,11 +478,45 @@ class PDFBatchTool(QWidget):
         if not self.config_path:
             self.log("❌ No config file selected.")
             return
+        if self.merge_worker is not None:
+            return
         try:
             with open(self.config_path, 'r') as f:
                 config_data = json.load(f)
-            results = merge_batches(config_data)
-            for result in results:
-                self.log(result)
         except Exception as e:
             self.log(f"❌ Error: {str(e)}")
+            return
+
+        self.progress_bar.setRange(0, max(1, len(config_data)))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%v/%m batches")
+        self.btn_merge.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+
+        self.merge_worker = BatchMergeWorker(config_data, self)
+        self.merge_worker.message.connect(self.log)
+        self.merge_worker.pages_added.connect(
+            lambda pages: self.progress_bar.setFormat(f"%v/%m batches - {pages} pages added")
+        )
+        self.merge_worker.batch_finished.connect(lambda done, total: self.progress_bar.setValue(done))
+        self.merge_worker.finished.connect(self.merging_finished)
+        self.merge_worker.start()
+
+    def cancel_merging(self):
+        if self.merge_worker is not None:
+            self.btn_cancel.setEnabled(False)
+            self.log("⏳ Cancelling after the current page...")
+            self.merge_worker.cancel()
+
+    def merging_finished(self):
+        self.merge_worker.deleteLater()
+        self.merge_worker = None
+        self.btn_merge.setEnabled(bool(self.config_path))
+        self.btn_cancel.setEnabled(False)
+
+    def closeEvent(self, event):
+        # Let a running merge stop cleanly instead of killing the thread mid-write.
+        if self.merge_worker is not None:
+            self.merge_worker.cancel()
+            self.merge_worker.wait()
+        super().closeEvent(event)
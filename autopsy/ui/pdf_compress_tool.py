@@ -1,19 +1,42 @@
 import os
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog, QSlider,
-    QHBoxLayout, QMessageBox, QProgressBar, QSpinBox, QComboBox, QFrame, QCheckBox
+    QHBoxLayout, QMessageBox, QProgressBar, QSpinBox, QDoubleSpinBox, QComboBox, QFrame, QCheckBox
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QIcon
+from autopsy.core.pdf_compress_core import compress_pdf_report
 from autopsy.utils import resource_path
 
 ASSETS_PATH = resource_path("autopsy/assets")
 ICON_PATH = os.path.join(ASSETS_PATH, "autopsy.ico")
 
+
+class CompressWorker(QThread):
+    """Runs compress_pdf_report off the GUI thread and reports progress through signals."""
+    progress = Signal(int)  # percent done
+    succeeded = Signal(object)  # the CompressionReport
+    failed = Signal(str)
+
+    def __init__(self, options, parent=None):
+        super().__init__(parent)
+        self.options = options
+
+    def run(self):
+        try:
+            report = compress_pdf_report(progress_callback=self.progress.emit, **self.options)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.succeeded.emit(report)
+
+
 class PDFCompressTool(QWidget):
     def __init__(self):
         super().__init__()
         self.selected_pdf = None
+        self.compress_worker = None
+        self.target_mb = None
         self.initUI()
 
     def initUI(self):
@@ -47,6 +70,17 @@ class PDFCompressTool(QWidget):
         mode_layout.addWidget(self.mode_combo)
         layout.addLayout(mode_layout)
 
+        # Preserve mode: keep images whose re-encode does not shrink them enough
+        self.preserve_settings_frame = QFrame()
+        saving_layout = QHBoxLayout()
+        self.preserve_settings_frame.setLayout(saving_layout)
+        saving_layout.addWidget(QLabel("Keep images unless they shrink by (%):"))
+        self.min_saving_spin = QSpinBox()
+        self.min_saving_spin.setRange(0, 90)
+        self.min_saving_spin.setValue(5)
+        saving_layout.addWidget(self.min_saving_spin)
+        layout.addWidget(self.preserve_settings_frame)
+
         # Container frame for rasterize mode settings
         self.raster_settings_frame = QFrame()
         raster_layout = QVBoxLayout()
@@ -102,6 +136,24 @@ class PDFCompressTool(QWidget):
 
         layout.addWidget(self.raster_settings_frame)
 
+        # Target size: pick quality and downscaling automatically (0 = off)
+        target_layout = QHBoxLayout()
+        target_layout.addWidget(QLabel("Target Size (MB):"))
+        self.target_spin = QDoubleSpinBox()
+        self.target_spin.setRange(0, 10000)
+        self.target_spin.setDecimals(1)
+        self.target_spin.setSingleStep(0.5)
+        self.target_spin.setSpecialValueText("Off")
+        self.target_spin.setToolTip("Choose JPEG quality and downscaling to fit this size. Overrides JPEG Quality.")
+        self.target_spin.valueChanged.connect(lambda v: self.quality_slider.setEnabled(v == 0))
+        target_layout.addWidget(self.target_spin)
+        layout.addLayout(target_layout)
+
+        # Spread page work over a process pool
+        self.parallel_chk = QCheckBox("Use all CPU cores")
+        self.parallel_chk.setChecked(True)
+        layout.addWidget(self.parallel_chk)
+
         # Compress button
         self.btn_compress = QPushButton("Compress PDF")
         self.btn_compress.setEnabled(False)
@@ -123,6 +175,7 @@ class PDFCompressTool(QWidget):
         # Show raster settings only if "Rasterize All Pages" is selected.
         mode = self.mode_combo.currentData()  # "preserve" or "rasterize"
         self.raster_settings_frame.setVisible(mode == "rasterize")
+        self.preserve_settings_frame.setVisible(mode == "preserve")
 
     def select_pdf(self):
         file, _ = QFileDialog.getOpenFileName(self, "Select PDF File", "", "PDF Files (*.pdf)")
@@ -131,7 +184,7 @@ class PDFCompressTool(QWidget):
             orig_size = os.path.getsize(file) / (1024 * 1024)
             self.file_size_label.setText(f"Original Size: {orig_size:.2f} MB")
             self.lbl_selected_pdf.setText(f"Selected: {file}")
-            self.btn_compress.setEnabled(True)
+            self.btn_compress.setEnabled(self.compress_worker is None)
 
     def compress_pdf_action(self):
         if not self.selected_pdf:
@@ -149,26 +202,56 @@ class PDFCompressTool(QWidget):
         # Retrieve checkbox states
         skip_text = self.skip_text_chk.isChecked()
         skip_vector = self.skip_vector_chk.isChecked()
+        workers = 0 if self.parallel_chk.isChecked() else 1  # 0 means one worker per core
+        target_mb = self.target_spin.value() or None  # 0 means no target
+        min_savings = self.min_saving_spin.value() / 100
 
-        def progress_cb(pct):
-            self.progress_bar.setValue(pct)
+        self.target_mb = target_mb
+        self.btn_compress.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.result_label.setText("Compressing...")
 
-        try:
-            # Adjust this import call as needed
-            from autopsy.core.pdf_compress_core import compress_pdf_advanced
-            
-            final_size = compress_pdf_advanced(
-                input_path=self.selected_pdf,
-                output_path=save_path,
-                mode=mode,
-                quality=quality_val,
-                max_width=max_w,
-                max_height=max_h,
-                dpi=dpi_val,
-                skip_text_rich=skip_text,
-                skip_vector_only=skip_vector,
-                progress_callback=progress_cb
-            )
-            self.result_label.setText(f"Compressed Size: {final_size:.2f} MB")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Compression Failed:\n{str(e)}")
+        self.compress_worker = CompressWorker({
+            "input_path": self.selected_pdf,
+            "output_path": save_path,
+            "mode": mode,
+            "quality": quality_val,
+            "max_width": max_w,
+            "max_height": max_h,
+            "dpi": dpi_val,
+            "skip_text_rich": skip_text,
+            "skip_vector_only": skip_vector,
+            "workers": workers,
+            "target_size_mb": target_mb,
+            "min_savings": min_savings,
+        }, self)
+        self.compress_worker.progress.connect(self.progress_bar.setValue)
+        self.compress_worker.succeeded.connect(self.show_report)
+        self.compress_worker.failed.connect(self.show_error)
+        self.compress_worker.finished.connect(self.compression_finished)
+        self.compress_worker.start()
+
+    def show_report(self, report):
+        text = f"Compressed Size: {report.output_mb:.2f} MB"
+        if self.target_mb:
+            text += f" (target {self.target_mb:.1f} MB)\n" + report.target_summary()
+        if report.images:
+            text += "\n" + report.summary()
+        if report.kept_pages:
+            text += f"\n{len(report.kept_pages)} of {len(report.messages)} pages kept as they were"
+        self.result_label.setText(text)
+
+    def show_error(self, message):
+        self.result_label.setText("Compressed Size: N/A")
+        QMessageBox.critical(self, "Error", f"Compression Failed:\n{message}")
+
+    def compression_finished(self):
+        self.compress_worker.deleteLater()
+        self.compress_worker = None
+        self.btn_compress.setEnabled(bool(self.selected_pdf))
+
+    def closeEvent(self, event):
+        # The output is written in one go at the end; let a running compression finish it.
+        if self.compress_worker is not None:
+            self.compress_worker.wait()
+        super().closeEvent(event)
@@ -1,22 +1,24 @@
 import os
-import fitz  # PyMuPDF
-from PyPDF2 import PdfReader, PdfMerger
 from PySide6.QtWidgets import (
     QWidget, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QFileDialog,
-    QMessageBox, QScrollArea, QCheckBox, QLineEdit
+    QMessageBox, QScrollArea, QLineEdit
 )
-from PySide6.QtGui import QPixmap, QImage, QIcon, QDragEnterEvent, QDropEvent
-from PySide6.QtCore import Qt
+from PySide6.QtGui import QIcon, QDragEnterEvent, QDropEvent
+from PySide6.QtCore import Qt, QTimer
+from autopsy.core.pdf_merge_core import merge_pdf_ranges, selections_from_pages
+from autopsy.ui.pdf_thumbnails import PageThumbnailModel, PageThumbnailView
 from autopsy.utils import resource_path
 
 ASSETS_PATH = resource_path("autopsy/assets")
 ICON_PATH = os.path.join(ASSETS_PATH, "autopsy.ico")
+RANGE_EDIT_DELAY_MS = 300  # page-range edits are applied once typing pauses this long
 
 class PDFMergeTool(QWidget):
     def __init__(self):
         super().__init__()
         self.files_to_merge = []  # List of file paths
-        self.pages_to_include = {}  # (pdf_file, page_num) -> QCheckBox
+        self.page_models = {}  # pdf_file -> PageThumbnailModel (page checkboxes and thumbnails)
+        self.preview_rows = {}  # pdf_file -> preview section widget
         self.setAcceptDrops(True)  # Enable drag & drop support
         self.initUI()
 
@@ -86,154 +88,151 @@ class PDFMergeTool(QWidget):
                     dropped_files.append(file_path)
             if dropped_files:
                 self.files_to_merge.extend(dropped_files)
-                self.status_label.setText(f"{len(self.files_to_merge)} PDFs selected.")
-                self.btn_merge.setEnabled(True)
                 self.preview_pdfs()
+                self.update_selection_status()
 
     # ------------------ Selecting & Previewing PDFs ------------------ #
     def select_pdfs(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Select PDFs", "", "PDF Files (*.pdf)")
         if files:
             self.files_to_merge = files
-            self.status_label.setText(f"{len(self.files_to_merge)} PDFs selected.")
-            self.btn_merge.setEnabled(True)
             self.preview_pdfs()
+            self.update_selection_status()
 
     def preview_pdfs(self):
-        # Clear out old preview widgets
-        while self.preview_layout.count():
-            item = self.preview_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        self.pages_to_include.clear()
-
-        # Build a preview section for each PDF
-        for pdf_index, pdf_file in enumerate(self.files_to_merge):
-            container = QWidget()
-            container_layout = QHBoxLayout(container)
-            container_layout.setSpacing(10)
-
-            # Left side: up/down arrow buttons
-            btn_layout = QVBoxLayout()
-            btn_layout.setSpacing(10)
-
-            btn_move_up = QPushButton("↑")
-            btn_move_up.setFixedSize(30, 30)
-            btn_move_up.setToolTip("Move PDF Up")
-            btn_move_up.setStyleSheet("""
-                QPushButton {
-                    border-radius: 15px;
-                    background-color: #4CAF50;
-                    color: white;
-                    font-weight: bold;
-                }
-                QPushButton:hover { background-color: #45a049; }
-            """)
-            btn_move_up.clicked.connect(lambda _, idx=pdf_index: self.move_pdf(idx, "up"))
-            btn_layout.addWidget(btn_move_up)
-
-            btn_move_down = QPushButton("↓")
-            btn_move_down.setFixedSize(30, 30)
-            btn_move_down.setToolTip("Move PDF Down")
-            btn_move_down.setStyleSheet("""
-                QPushButton {
-                    border-radius: 15px;
-                    background-color: #4CAF50;
-                    color: white;
-                    font-weight: bold;
-                }
-                QPushButton:hover { background-color: #45a049; }
-            """)
-            btn_move_down.clicked.connect(lambda _, idx=pdf_index: self.move_pdf(idx, "down"))
-            btn_layout.addWidget(btn_move_down)
-
-            container_layout.addLayout(btn_layout)
-
-            # Right side: PDF title, page-range input, page previews
-            info_layout = QVBoxLayout()
-            pdf_title = QLabel(f"PDF: {os.path.basename(pdf_file)}")
-            info_layout.addWidget(pdf_title)
-
-            page_range_input = QLineEdit()
-            page_range_input.setPlaceholderText("Page range (e.g. 1-3,5). Leave empty for all pages.")
-            info_layout.addWidget(page_range_input)
-
-            # The pages preview area
-            pages_widget = QWidget()
-            pages_layout = QHBoxLayout(pages_widget)
-            pages_layout.setSpacing(10)
-            info_layout.addWidget(pages_widget)
-
-            # Connect the page-range input so it updates preview dynamically
-            page_range_input.textChanged.connect(
-                lambda txt, idx=pdf_index, f=pdf_file, w=pages_widget: self.update_pdf_preview(idx, f, txt, w)
-            )
+        """
+        Bring the preview sections in line with files_to_merge.
+
+        Sections of files that are still listed are kept as they are (thumbnails,
+        checkboxes and page range); removed files are dropped, new files get a
+        section, and the sections are put in list order.
+        """
+        listed = set(self.files_to_merge)
+        for pdf_file in [f for f in self.preview_rows if f not in listed]:
+            self.remove_preview_row(pdf_file)
+        for pdf_file in self.files_to_merge:
+            if pdf_file not in self.preview_rows:
+                self.preview_rows[pdf_file] = self.build_preview_row(pdf_file)
+        self.arrange_preview_rows()
+
+    def build_preview_row(self, pdf_file):
+        container = QWidget()
+        container_layout = QHBoxLayout(container)
+        container_layout.setSpacing(10)
+
+        # Left side: up/down arrow buttons
+        btn_layout = QVBoxLayout()
+        btn_layout.setSpacing(10)
+
+        btn_move_up = QPushButton("↑")
+        btn_move_up.setFixedSize(30, 30)
+        btn_move_up.setToolTip("Move PDF Up")
+        btn_move_up.setStyleSheet("""
+            QPushButton {
+                border-radius: 15px;
+                background-color: #4CAF50;
+                color: white;
+                font-weight: bold;
+            }
+            QPushButton:hover { background-color: #45a049; }
+        """)
+        btn_move_up.clicked.connect(lambda _, f=pdf_file: self.move_pdf(self.files_to_merge.index(f), "up"))
+        btn_layout.addWidget(btn_move_up)
+
+        btn_move_down = QPushButton("↓")
+        btn_move_down.setFixedSize(30, 30)
+        btn_move_down.setToolTip("Move PDF Down")
+        btn_move_down.setStyleSheet("""
+            QPushButton {
+                border-radius: 15px;
+                background-color: #4CAF50;
+                color: white;
+                font-weight: bold;
+            }
+            QPushButton:hover { background-color: #45a049; }
+        """)
+        btn_move_down.clicked.connect(lambda _, f=pdf_file: self.move_pdf(self.files_to_merge.index(f), "down"))
+        btn_layout.addWidget(btn_move_down)
+
+        container_layout.addLayout(btn_layout)
+
+        # Right side: PDF title, page-range input, page previews
+        info_layout = QVBoxLayout()
+        pdf_title = QLabel(f"PDF: {os.path.basename(pdf_file)}")
+        info_layout.addWidget(pdf_title)
+
+        page_range_input = QLineEdit()
+        page_range_input.setPlaceholderText("Page range (e.g. 1-3,5). Leave empty for all pages.")
+        info_layout.addWidget(page_range_input)
+        container_layout.addLayout(info_layout)
+
+        # The pages preview area: a virtualized strip that renders pages as they scroll into view
+        try:
+            model = PageThumbnailModel(pdf_file, self)
+        except Exception as e:
+            info_layout.addWidget(QLabel(f"Cannot preview {os.path.basename(pdf_file)}: {e}"))
+            return container
+        model.pageToggled.connect(self.toggle_page_inclusion)
+        self.page_models[pdf_file] = model
+        pages_view = PageThumbnailView()
+        pages_view.setModel(model)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(pages_view.report_viewport)
+        info_layout.addWidget(pages_view)
+
+        # Apply the page range once typing pauses, not on every keystroke
+        range_timer = QTimer(container)
+        range_timer.setSingleShot(True)
+        range_timer.setInterval(RANGE_EDIT_DELAY_MS)
+        range_timer.timeout.connect(
+            lambda f=pdf_file, w=page_range_input: self.update_pdf_preview(f, w.text())
+        )
+        page_range_input.textChanged.connect(range_timer.start)
+        return container
+
+    def remove_preview_row(self, pdf_file):
+        container = self.preview_rows.pop(pdf_file)
+        self.preview_layout.removeWidget(container)
+        container.deleteLater()
+        model = self.page_models.pop(pdf_file, None)
+        if model is not None:
+            model.close()
+            model.deleteLater()
+
+    def arrange_preview_rows(self):
+        """Order the preview sections like files_to_merge, moving the existing widgets."""
+        position = 0
+        for pdf_file in dict.fromkeys(self.files_to_merge):
+            container = self.preview_rows[pdf_file]
+            if self.preview_layout.indexOf(container) != position:
+                self.preview_layout.removeWidget(container)
+                self.preview_layout.insertWidget(position, container)
+            position += 1
+
+    def update_pdf_preview(self, pdf_file, range_text):
+        """
+        Show only the pages in range_text for pdf_file.
+
+        Only the rows of the page model change: thumbnails that were already rendered
+        are reused, and an incomplete range (e.g. "3-" while typing) is ignored.
+        """
+        model = self.page_models.get(pdf_file)
+        if model is None:
+            return
+        total_pages = model.page_count
+        try:
+            pages_to_show = self.parse_page_range(range_text, total_pages) if range_text.strip() else list(range(total_pages))
+        except ValueError:
+            return
+        model.set_visible_pages(pages_to_show)
+        self.update_selection_status()
 
-            # Initially show all pages
-            self.update_pdf_preview(pdf_index, pdf_file, "", pages_widget)
-
-            container_layout.addLayout(info_layout)
-            self.preview_layout.addWidget(container)
-
-    def update_pdf_preview(self, pdf_index, pdf_file, range_text, pages_widget):
-        """Render only the pages in range_text for pdf_file and show them in pages_widget."""
-        # Clear old previews
-        layout = pages_widget.layout()
-        while layout.count():
-            child = layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-
-        # Remove old checkboxes from self.pages_to_include for this PDF
-        old_keys = [k for k in self.pages_to_include if k[0] == pdf_file]
-        for k in old_keys:
-            del self.pages_to_include[k]
-
-        # Parse the page range
-        doc = fitz.open(pdf_file)
-        total_pages = len(doc)
-        pages_to_show = self.parse_page_range(range_text, total_pages) if range_text.strip() else list(range(total_pages))
-
-        for page_num in pages_to_show:
-            if 0 <= page_num < total_pages:
-                page = doc.load_page(page_num)
-
-                # Increase resolution for clarity, e.g. 300 DPI
-                mat = fitz.Matrix(300 / 72.0, 300 / 72.0)  # 300 dpi
-                pix = page.get_pixmap(matrix=mat)
-                # Convert to QPixmap
-                qimg = QImage.fromData(pix.tobytes("ppm"))
-                pixmap = QPixmap.fromImage(qimg)
-
-                # Scale it to a specific width (e.g. 250 px) for clarity
-                scaled_pixmap = pixmap.scaledToWidth(250, Qt.SmoothTransformation)
-
-                # Label to display the page
-                page_preview = QLabel()
-                page_preview.setPixmap(scaled_pixmap)
-                # Remove any border or background
-                page_preview.setStyleSheet("QLabel { border: none; background-color: transparent; }")
-
-                page_preview.setAlignment(Qt.AlignCenter)
-
-                # Checkbox
-                checkbox = QCheckBox(f"Page {page_num + 1}")
-                checkbox.setChecked(True)
-                checkbox.stateChanged.connect(self.toggle_page_inclusion)
-                self.pages_to_include[(pdf_file, page_num)] = checkbox
-
-                # Layout for this page
-                pg_layout = QVBoxLayout()
-                pg_layout.setSpacing(2)
-                pg_layout.addWidget(page_preview, alignment=Qt.AlignCenter)
-                pg_layout.addWidget(checkbox, alignment=Qt.AlignCenter)
-
-                # Add the page layout to the pages_layout
-                page_container = QWidget()
-                page_container.setLayout(pg_layout)
-                layout.addWidget(page_container)
-
-        doc.close()
+    def close_page_models(self):
+        for pdf_file in list(self.preview_rows):
+            self.remove_preview_row(pdf_file)
+
+    def closeEvent(self, event):
+        self.close_page_models()
+        super().closeEvent(event)
 
     def parse_page_range(self, text, total_pages):
         """
@@ -268,15 +267,20 @@ class PDFMergeTool(QWidget):
             self.files_to_merge[index], self.files_to_merge[index + 1] = (
                 self.files_to_merge[index + 1], self.files_to_merge[index]
             )
-        self.preview_pdfs()
+        self.arrange_preview_rows()
+
+    def toggle_page_inclusion(self, pdf_file, page_num, included):
+        self.update_selection_status()
+
+    def update_selection_status(self):
+        """Show how many pages the merge would take; Merge needs at least one."""
+        page_count = sum(len(pages) for pages in self.selected_pages().values())
+        self.status_label.setText(f"{len(self.files_to_merge)} PDFs selected, {page_count} pages checked.")
+        self.btn_merge.setEnabled(page_count > 0)
 
-    def toggle_page_inclusion(self):
-        # For debug: prints included/excluded pages
-        sender = self.sender()
-        for (pdf_file, page_num), checkbox in self.pages_to_include.items():
-            if sender == checkbox:
-                state = "Include" if checkbox.isChecked() else "Exclude"
-                print(f"{state} {pdf_file} page {page_num + 1}")
+    def selected_pages(self):
+        """Return {pdf_file: [0-based page numbers]} for the shown, checked pages."""
+        return {pdf_file: model.selected_pages() for pdf_file, model in self.page_models.items()}
 
     def merge_pdfs(self):
         if not self.files_to_merge:
@@ -286,16 +290,11 @@ class PDFMergeTool(QWidget):
         save_path, _ = QFileDialog.getSaveFileName(self, "Save Merged PDF", "", "PDF Files (*.pdf)")
         if save_path:
             try:
-                pdf_merger = PdfMerger()
-                for pdf_file in self.files_to_merge:
-                    pdf_reader = PdfReader(pdf_file)
-                    for page_num in range(len(pdf_reader.pages)):
-                        checkbox = self.pages_to_include.get((pdf_file, page_num))
-                        if checkbox and checkbox.isChecked():
-                            pdf_merger.append(pdf_file, pages=(page_num, page_num + 1))
-                pdf_merger.write(save_path)
-                pdf_merger.close()
-                self.status_label.setText(f"Merged PDF saved to: {save_path}")
+                selections = selections_from_pages(self.files_to_merge, self.selected_pages())
+                result = merge_pdf_ranges(selections, save_path)
+                self.status_label.setText(
+                    f"Merged PDF saved to: {save_path} ({result.pages} pages in {result.total_seconds:.2f}s)"
+                )
             except Exception as e:
                 self.status_label.setText(f"Error: {str(e)}")
                 QMessageBox.critical(self, "Error", f"An error occurred while merging PDFs: {str(e)}")
@@ -0,0 +1,385 @@
+import os
+import heapq
+import sqlite3
+import itertools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
+from PySide6.QtWidgets import QListView, QAbstractItemView
+from PySide6.QtGui import QPixmap
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QCoreApplication, QPoint, QSize, QTimer, Signal
+from autopsy.core.pdf_thumbnail_cache import ThumbnailCache
+from autopsy.core.pdf_thumbnail_core import THUMBNAIL_WIDTH, render_thumbnail_png
+
+# A4 portrait at THUMBNAIL_WIDTH; other page shapes are fitted into this box.
+THUMBNAIL_HEIGHT = int(THUMBNAIL_WIDTH * 297 / 210)
+MAX_CACHED_PIXMAPS = 120
+
+# Request priorities: lower renders first.
+PRIORITY_VISIBLE = 0
+PRIORITY_PREFETCH = 1
+PREFETCH_ROWS = 4
+POLL_INTERVAL_MS = 20
+# Stale heap entries (cancelled or re-prioritized) tolerated beyond the live ones before the heap is rebuilt.
+QUEUE_COMPACT_SLACK = 64
+
+
+def default_thumbnail_workers():
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+class ThumbnailService(QObject):
+    """
+    Renders page thumbnails in a pool of worker processes.
+
+    Requests wait in a priority queue (visible pages before prefetched ones) and
+    only a couple per worker are handed to the pool at a time, so requests for
+    pages that were scrolled away can still be cancelled. Finished renders are
+    collected by a timer on the GUI thread and delivered as PNG bytes through
+    thumbnailReady; the GUI thread itself never rasterizes. PyMuPDF is not
+    thread-safe, hence processes. With a ThumbnailCache, every render is stored on
+    disk and later requests for the same page of an unchanged file are answered
+    from it. All methods must be called from the GUI thread.
+    """
+    thumbnailReady = Signal(str, int, int, bytes)  # path, page_num, width, png
+    thumbnailFailed = Signal(str, int, int, str)  # path, page_num, width, error
+
+    def __init__(self, max_workers=None, cache=None, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers or default_thumbnail_workers()
+        self.cache = cache
+        self._executor = None
+        self._queue = []  # heap of (priority, seq, key)
+        self._pending = {}  # key -> its live heap entry
+        self._running = {}  # key -> Future
+        self._sequence = itertools.count()
+        self._closed = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(POLL_INTERVAL_MS)
+        self._timer.timeout.connect(self._collect)
+
+    def request(self, path, page_num, width=THUMBNAIL_WIDTH, priority=PRIORITY_VISIBLE):
+        """
+        Queue a render of (path, page_num, width); re-requesting raises its priority.
+
+        A thumbnail found in the disk cache is delivered right away, without a render.
+        """
+        key = (path, page_num, width)
+        if self._closed or key in self._running:
+            return
+        current = self._pending.get(key)
+        if current is not None and current[0] <= priority:
+            return
+        png = self._cached(key)
+        if png is not None:
+            self.thumbnailReady.emit(*key, png)
+            return
+        entry = (priority, next(self._sequence), key)
+        self._pending[key] = entry  # an older, lower priority entry is now stale
+        heapq.heappush(self._queue, entry)
+        self._compact_queue()
+        self._dispatch()
+
+    def cancel(self, path, keep=()):
+        """Drop queued requests for path, except for the pages in keep. Renders already running finish."""
+        keep = set(keep)
+        for key in [k for k in self._pending if k[0] == path and k[1] not in keep]:
+            del self._pending[key]
+        self._compact_queue()
+
+    def shutdown(self):
+        self._closed = True
+        self._timer.stop()
+        self._pending.clear()
+        self._queue.clear()
+        self._running.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def _cached(self, key):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(*key)
+        except sqlite3.Error as e:
+            print(f"Thumbnail cache read failed: {e}")
+            return None
+
+    def _compact_queue(self):
+        """
+        Rebuild the heap from the live entries once stale ones outnumber them.
+
+        Re-prioritizing and cancelling only forget an entry in _pending; without this,
+        scrolling back and forth through a long document would grow the heap without
+        bound. Rebuilding is linear and happens at most once per as many stale pushes,
+        so it stays amortized O(1) per request.
+        """
+        if len(self._queue) > 2 * len(self._pending) + QUEUE_COMPACT_SLACK:
+            self._queue = list(self._pending.values())
+            heapq.heapify(self._queue)
+
+    def _dispatch(self):
+        while self._queue and len(self._running) < 2 * self.max_workers:
+            entry = heapq.heappop(self._queue)
+            key = entry[2]
+            if self._pending.get(key) is not entry:
+                continue  # cancelled or superseded
+            del self._pending[key]
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            self._running[key] = self._executor.submit(render_thumbnail_png, *key)
+        if self._running and not self._timer.isActive():
+            self._timer.start()
+
+    def _collect(self):
+        for key, future in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[key]
+            try:
+                png = future.result()
+            except CancelledError:
+                continue
+            except BrokenProcessPool as e:
+                self._executor = None  # a worker died; start a fresh pool for the next request
+                self.thumbnailFailed.emit(*key, str(e))
+            except Exception as e:
+                self.thumbnailFailed.emit(*key, str(e))
+            else:
+                if self.cache is not None:
+                    try:
+                        self.cache.put(*key, png)
+                    except sqlite3.Error as e:
+                        print(f"Thumbnail cache write failed: {e}")
+                self.thumbnailReady.emit(*key, png)
+        self._dispatch()
+        if not self._running:
+            self._timer.stop()
+
+
+_service = None
+
+
+def thumbnail_service():
+    """Return the application-wide ThumbnailService, creating it on first use."""
+    global _service
+    if _service is None:
+        app = QCoreApplication.instance()
+        try:
+            cache = ThumbnailCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Thumbnail cache unavailable, thumbnails will not be kept between sessions: {e}")
+            cache = None
+        _service = ThumbnailService(cache=cache, parent=app)
+        if app is not None:
+            app.aboutToQuit.connect(_service.shutdown)
+    return _service
+
+
+class PageThumbnailModel(QAbstractListModel):
+    """
+    List model of the pages of one PDF, with a checkbox and a thumbnail per page.
+
+    Only the pages in the current page range are rows. A row shows a placeholder
+    until its thumbnail arrives from the ThumbnailService. Renders are requested
+    only for the rows the view reports as on screen (plus a few neighbours), so
+    pages that are never scrolled into view are never rasterized. The most recently
+    used pixmaps are kept (MAX_CACHED_PIXMAPS).
+    """
+    pageToggled = Signal(str, int, bool)  # pdf_file, page_num, included
+
+    def __init__(self, pdf_file, parent=None, service=None, width=THUMBNAIL_WIDTH):
+        super().__init__(parent)
+        self.pdf_file = pdf_file
+        self.width = width
+        with fitz.open(pdf_file) as doc:
+            self.page_count = doc.page_count
+        self.pages = list(range(self.page_count))
+        self._rows = {page_num: row for row, page_num in enumerate(self.pages)}
+        self.checked = set(self.pages)
+        self._pixmaps = OrderedDict()
+        self._failed = set()
+        self._placeholder = None
+        self.service = service or thumbnail_service()
+        self.service.thumbnailReady.connect(self.on_thumbnail_ready)
+        self.service.thumbnailFailed.connect(self.on_thumbnail_failed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.pages)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        page_num = self.pages[index.row()]
+        if role == Qt.DisplayRole:
+            return f"Page {page_num + 1}"
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if page_num in self.checked else Qt.Unchecked
+        if role == Qt.DecorationRole:
+            return self.thumbnail(page_num)
+        if role == Qt.UserRole:
+            return page_num
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid():
+            return False
+        page_num = self.pages[index.row()]
+        included = Qt.CheckState(value) == Qt.Checked
+        if included:
+            self.checked.add(page_num)
+        else:
+            self.checked.discard(page_num)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        self.pageToggled.emit(self.pdf_file, page_num, included)
+        return True
+
+    def thumbnail(self, page_num):
+        """Return the page's pixmap, or a placeholder until it has been rendered."""
+        pixmap = self._pixmaps.get(page_num)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(page_num)
+            return pixmap
+        return self.placeholder()
+
+    def placeholder(self):
+        if self._placeholder is None:
+            self._placeholder = QPixmap(self.width, int(self.width * 297 / 210))
+            self._placeholder.fill(Qt.lightGray)
+        return self._placeholder
+
+    def on_thumbnail_ready(self, path, page_num, width, png):
+        if path != self.pdf_file or width != self.width:
+            return
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(png, "PNG"):
+            self.on_thumbnail_failed(path, page_num, width, "invalid image data")
+            return
+        self._pixmaps[page_num] = pixmap
+        self._pixmaps.move_to_end(page_num)
+        if len(self._pixmaps) > MAX_CACHED_PIXMAPS:
+            self._pixmaps.popitem(last=False)
+        row = self._rows.get(page_num)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def on_thumbnail_failed(self, path, page_num, width, error):
+        if path != self.pdf_file or width != self.width:
+            return
+        self._failed.add(page_num)
+        print(f"Error rendering page {page_num + 1} of {self.pdf_file}: {error}")
+
+    def update_viewport(self, rows):
+        """
+        Called by the view with the (first, last) rows currently on screen, or None
+        when the view is scrolled out of sight.
+
+        On-screen pages are queued at visible priority and a few rows beyond either
+        edge at prefetch priority; queued requests for every other page of this file
+        are cancelled.
+        """
+        if rows is None or not self.pages:
+            self.service.cancel(self.pdf_file)
+            return
+        first_row, last_row = rows
+        start = max(0, first_row - PREFETCH_ROWS)
+        stop = min(len(self.pages), last_row + 1 + PREFETCH_ROWS)
+        self.service.cancel(self.pdf_file, keep=self.pages[start:stop])
+        for row in range(start, stop):
+            page_num = self.pages[row]
+            if page_num in self._pixmaps or page_num in self._failed:
+                continue
+            priority = PRIORITY_VISIBLE if first_row <= row <= last_row else PRIORITY_PREFETCH
+            self.service.request(self.pdf_file, page_num, self.width, priority)
+
+    def set_visible_pages(self, pages):
+        """
+        Show only the given 0-based pages (e.g. from the page-range field).
+
+        Rendered thumbnails and checkbox states are kept, so pages that come back
+        into the range are shown again without rendering.
+        """
+        pages = [p for p in pages if 0 <= p < self.page_count]
+        if pages == self.pages:
+            return
+        self.beginResetModel()
+        self.pages = pages
+        self._rows = {page_num: row for row, page_num in enumerate(self.pages)}
+        self.endResetModel()
+
+    def selected_pages(self):
+        """Return the shown pages that are checked, in page order."""
+        return [p for p in self.pages if p in self.checked]
+
+    def close(self):
+        self.service.cancel(self.pdf_file)
+        self.service.thumbnailReady.disconnect(self.on_thumbnail_ready)
+        self.service.thumbnailFailed.disconnect(self.on_thumbnail_failed)
+        self._pixmaps.clear()
+
+
+class PageThumbnailView(QListView):
+    """
+    Horizontal, virtualized strip of page thumbnails.
+
+    Uniform item sizes let Qt lay out thousands of rows without asking the model
+    for each one. Whenever the visible rows change the model is told, so it can
+    request those pages (and prefetch their neighbours) and cancel requests for
+    pages that scrolled away.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(False)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setUniformItemSizes(True)
+        self.setIconSize(QSize(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT))
+        self.setGridSize(QSize(THUMBNAIL_WIDTH + 20, THUMBNAIL_HEIGHT + 40))
+        self.setSpacing(5)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setFixedHeight(THUMBNAIL_HEIGHT + 70)
+        self.horizontalScrollBar().valueChanged.connect(self.report_viewport)
+
+    def setModel(self, model):
+        super().setModel(model)
+        model.modelReset.connect(self.report_viewport)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.report_viewport()
+
+    def visible_rows(self):
+        """Return (first, last) rows intersecting the viewport, or None when nothing is on screen."""
+        model = self.model()
+        if model is None or model.rowCount() == 0 or self.viewport().visibleRegion().isEmpty():
+            return None
+        rect = self.viewport().rect()
+        step = self.gridSize().width() or 1
+        middle = rect.center().y()
+        first = self.indexAt(QPoint(rect.left() + 1, middle))
+        last = self.indexAt(QPoint(rect.right() - 1, middle))
+        first_row = first.row() if first.isValid() else min(model.rowCount() - 1, self.horizontalScrollBar().value() // step)
+        last_row = last.row() if last.isValid() else min(model.rowCount() - 1, first_row + rect.width() // step)
+        return first_row, last_row
+
+    def report_viewport(self, *_):
+        """Tell the model which rows are on screen; call this when an enclosing scroll area moves too."""
+        if hasattr(self.model(), "update_viewport"):
+            self.model().update_viewport(self.visible_rows())
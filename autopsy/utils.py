@@ -1,4 +1,5 @@
 import sys, os
+import hashlib
 
 def resource_path(relative_path):
     """
@@ -15,3 +16,21 @@ def resource_path(relative_path):
     except Exception:
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
+
+
+def user_data_dir():
+    """Per-user data directory for Autopsy (LOCALAPPDATA on Windows, XDG data home elsewhere)."""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "Autopsy")
+
+
+def file_fingerprint(path):
+    """Identify a file version by (absolute path, size, mtime); any change gives a new fingerprint."""
+    stat = os.stat(path)
+    ident = f"{os.path.normcase(os.path.abspath(path))}\0{stat.st_size}\0{stat.st_mtime_ns}"
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from autopsy.ui.dashboard import Dashboard
 from autopsy.auth.login_screen import LoginScreen  # 🔐 Import LoginScreen
@@ -21,4 +22,5 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # thumbnail render workers in frozen builds
     main()
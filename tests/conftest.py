@@ -0,0 +1,13 @@
+import pytest
+
+from tests.pdf_fixtures import make_pdf
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    """A working directory with two 3-page input PDFs, a.pdf and b.pdf."""
+    directory = tmp_path / "work"
+    directory.mkdir()
+    make_pdf(str(directory / "a.pdf"))
+    make_pdf(str(directory / "b.pdf"))
+    return directory
@@ -0,0 +1,90 @@
+"""PDF builders and batch runners shared by the test modules."""
+import io
+import os
+import json
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from autopsy.core.pdf_batch_core import get_output_path, iter_batch_events
+from autopsy.core.pdf_batch_events import BATCH_FINISHED
+
+
+def jpeg_bytes(size=(200, 150), quality=90, seed=1):
+    """A noisy RGB JPEG, so re-encoding it at lower quality really shrinks it."""
+    img = Image.effect_noise(size, 40 + seed).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def png_bytes(size=(200, 150)):
+    """Black line art on white; as JPEG it only gets bigger."""
+    img = Image.new("1", size, 1)
+    for x in range(0, size[0], 10):
+        for y in range(size[1]):
+            img.putpixel((x, y), 0)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def make_pdf(path, pages=3, label=None, images=(), deflate=True):
+    """
+    Write a small PDF: each page shows "<label> page N" and every image in images.
+
+    Content streams are Flate-compressed when deflate is set, like real-world files.
+    """
+    label = label or os.path.splitext(os.path.basename(path))[0]
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page(width=300, height=400)
+        page.insert_text((40, 60), f"{label} page {n + 1}")
+        for i, data in enumerate(images):
+            page.insert_image(fitz.Rect(40, 100 + i * 120, 240, 210 + i * 120), stream=data)
+    doc.save(path, deflate=deflate)
+    doc.close()
+    return path
+
+
+def page_texts(path):
+    with fitz.open(path) as doc:
+        return [page.get_text().strip() for page in doc]
+
+
+def batch(working_directory, batch_number=1, output_name="out", patterns=(".pdf",)):
+    return {
+        "batch_number": batch_number,
+        "working_directory": str(working_directory),
+        "output_name": output_name,
+        "files": [
+            {"sequence": i + 1, "pattern": pattern, "include": "", "exclude": ""}
+            for i, pattern in enumerate(patterns)
+        ],
+    }
+
+
+def write_config(path, batches):
+    with open(path, "w") as f:
+        json.dump(batches, f)
+    return str(path)
+
+
+def run_batch(spec, **options):
+    """Run one batch spec to the end and return its events; the last one is BATCH_FINISHED."""
+    events = list(iter_batch_events(spec, **options))
+    assert events[-1].kind == BATCH_FINISHED
+    return events
+
+
+def kinds(events):
+    return [event.kind for event in events]
+
+
+def expected_texts(directory, *names):
+    """Page texts a merge of the named inputs of directory should contain, in order."""
+    return [text for name in names for text in page_texts(str(directory / name))]
+
+
+def output_texts(spec):
+    return page_texts(get_output_path(spec))
@@ -0,0 +1,78 @@
+import os
+import json
+from dataclasses import fields
+
+import pytest
+
+from autopsy.batch.cli import main
+from autopsy.core.pdf_batch_events import BATCH_FINISHED, ERROR, FILE_SKIPPED, BatchEvent
+from tests.pdf_fixtures import batch, write_config
+
+
+def test_dry_run_of_a_good_config_succeeds(workdir, tmp_path):
+    config = write_config(tmp_path / "c.json", [batch(workdir)])
+    assert main([config, "--dry-run"]) == 0
+    assert not os.path.exists(os.path.join(str(workdir), "out.pdf"))
+
+
+@pytest.mark.parametrize("problem", ["unknown backend", "unreadable input", "no match"])
+def test_dry_run_fails_on_problems_it_finds(workdir, tmp_path, problem):
+    spec = batch(workdir)
+    if problem == "unknown backend":
+        spec["backend"] = "nope"
+    elif problem == "unreadable input":
+        (workdir / "broken.pdf").write_bytes(b"not a pdf")
+    else:
+        spec = batch(workdir, patterns=(".pdf", "=missing.pdf"))
+    config = write_config(tmp_path / "c.json", [spec])
+    assert main([config, "--dry-run"]) == 1
+
+
+def json_records(capsys, argv):
+    code = main(argv + ["--json"])
+    return code, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_json_output_is_one_record_per_event(workdir, tmp_path, capsys):
+    config = write_config(tmp_path / "c.json", [batch(workdir)])
+    code, records = json_records(capsys, [config])
+    assert code == 0
+    assert records[0]["event"] == "config_started"
+    assert records[-1]["event"] == "run_finished" and records[-1]["ok"] is True
+    batch_records = records[1:-1]
+    assert batch_records[-1]["event"] == BATCH_FINISHED and batch_records[-1]["status"] == "written"
+    event_fields = {field.name for field in fields(BatchEvent)} - {"kind"}
+    for record in batch_records:
+        assert set(record) == event_fields | {"event", "time", "config"}
+        assert record["config"] == config and record["batch_number"] == 1
+
+
+@pytest.mark.parametrize("problem, code, kind", [
+    (None, 0, None),
+    ("no match", 0, FILE_SKIPPED),  # a pattern that matches nothing is only reported
+    ("unreadable input", 1, FILE_SKIPPED),
+    ("unknown backend", 1, ERROR),
+])
+def test_exit_code_follows_the_events(workdir, tmp_path, capsys, problem, code, kind):
+    spec = batch(workdir)
+    if problem == "no match":
+        spec = batch(workdir, patterns=(".pdf", "=missing.pdf"))
+    elif problem == "unreadable input":
+        (workdir / "broken.pdf").write_bytes(b"not a pdf")
+    elif problem == "unknown backend":
+        spec["backend"] = "nope"
+    config = write_config(tmp_path / "c.json", [spec])
+    exit_code, records = json_records(capsys, [config])
+    assert exit_code == code and records[-1]["ok"] is (code == 0)
+    problems = [record for record in records if record["event"] in (FILE_SKIPPED, ERROR)]
+    assert [record["event"] for record in problems] == ([kind] if kind else [])
+    if problem == "unreadable input":
+        assert problems[0]["path"] == str(workdir / "broken.pdf")
+    elif problem == "no match":
+        assert problems[0]["path"] is None and problems[0]["pattern"] == "=missing.pdf"
+
+
+def test_unloadable_config_fails(tmp_path, capsys):
+    (tmp_path / "c.json").write_text("{}")
+    code, records = json_records(capsys, [str(tmp_path / "c.json")])
+    assert code == 1 and records[0]["event"] == "config_error"
@@ -0,0 +1,81 @@
+import os
+
+from autopsy.core.pdf_batch_cache import DirectoryIndexCache, PdfReaderCache
+from autopsy.core.pdf_batch_core import get_matching_files
+from tests.pdf_fixtures import batch, expected_texts, output_texts, run_batch
+
+
+def counting_cache(max_bytes=10 ** 9):
+    opened = []
+
+    def opener(path):
+        opened.append(os.path.basename(path))
+        return object()
+    return PdfReaderCache(max_bytes, opener), opened
+
+
+def write(path, size):
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_readers_are_reused_until_the_file_changes(tmp_path):
+    cache, opened = counting_cache()
+    path = write(tmp_path / "a.pdf", 100)
+    reader = cache.get(path)
+    assert cache.get(path) is reader and (cache.hits, cache.misses) == (1, 1)
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # same size, newer mtime
+    assert cache.get(path) is not reader
+    write(tmp_path / "a.pdf", 200)  # new size
+    cache.get(path)
+    assert opened == ["a.pdf"] * 3 and cache.misses == 3
+
+
+def test_byte_bound_evicts_least_recently_used(tmp_path):
+    cache, opened = counting_cache(max_bytes=250)
+    a, b, c = (write(tmp_path / name, 100) for name in ("a.pdf", "b.pdf", "c.pdf"))
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)  # b is now the least recently used
+    cache.get(c)
+    assert len(cache) == 2 and cache.evictions == 1
+    cache.get(a)
+    cache.get(b)
+    assert opened == ["a.pdf", "b.pdf", "c.pdf", "b.pdf"]
+
+
+def test_a_reader_larger_than_the_bound_is_still_cached(tmp_path):
+    cache, opened = counting_cache(max_bytes=50)
+    path = write(tmp_path / "big.pdf", 100)
+    assert cache.get(path) is cache.get(path)
+    assert opened == ["big.pdf"]
+
+
+def names(paths):
+    return [os.path.basename(path) for path in paths]
+
+
+def test_directory_is_listed_once_until_invalidated(tmp_path):
+    write(tmp_path / "a.pdf", 10)
+    write(tmp_path / "notes.txt", 10)
+    dir_indexes = DirectoryIndexCache()
+    assert names(get_matching_files(str(tmp_path), "a", dir_indexes)) == ["a.pdf"]
+    index = dir_indexes.get(str(tmp_path))
+
+    write(tmp_path / "ab.pdf", 10)
+    assert names(get_matching_files(str(tmp_path), "a", dir_indexes)) == ["a.pdf"]  # the listing is reused
+    assert dir_indexes.get(str(tmp_path) + os.sep) is index
+
+    dir_indexes.invalidate(str(tmp_path))
+    assert names(get_matching_files(str(tmp_path), "a", dir_indexes)) == ["a.pdf", "ab.pdf"]
+    assert names(get_matching_files(str(tmp_path), "=AB.PDF", dir_indexes)) == ["ab.pdf"]
+
+
+def test_written_output_is_visible_to_later_batches(workdir):
+    dir_indexes = DirectoryIndexCache()
+    run_batch(batch(workdir, 1, "part", ("=a.pdf",)), dir_indexes=dir_indexes)
+    final = batch(workdir, 2, "final", ("part", "=b.pdf"))
+    run_batch(final, dir_indexes=dir_indexes)
+    assert output_texts(final) == expected_texts(workdir, "a.pdf", "b.pdf")
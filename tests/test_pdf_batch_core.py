@@ -0,0 +1,33 @@
+import shutil
+
+import pytest
+
+from autopsy.core.pdf_batch_core import group_batches_by_output, iter_merge_events
+from autopsy.core.pdf_batch_events import ERROR, WARNING
+from tests.pdf_fixtures import batch, expected_texts, page_texts
+
+
+def chained_config(directory):
+    """part.pdf is merged from a.pdf and then merged again into final.pdf; other.pdf is independent."""
+    return [
+        batch(directory, 1, "part", ("=a.pdf",)),
+        batch(directory, 2, "final", ("part", "=b.pdf")),
+        batch(directory, 3, "other", ("=b.pdf",)),
+    ]
+
+
+def test_batches_reading_another_output_share_its_group(workdir):
+    config_data = chained_config(workdir)
+    groups = group_batches_by_output(config_data)
+    assert [[spec["batch_number"] for spec in group] for group in groups] == [[1, 2], [3]]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_pool_merges_chained_batches_like_a_sequential_run(workdir, tmp_path, max_workers):
+    directory = tmp_path / f"run{max_workers}"
+    shutil.copytree(str(workdir), str(directory))
+    events = list(iter_merge_events(chained_config(directory), max_workers=max_workers))
+    assert not [event for event in events if event.kind in (ERROR, WARNING)]
+    assert page_texts(str(directory / "final.pdf")) == expected_texts(workdir, "a.pdf", "b.pdf")
+    assert page_texts(str(directory / "other.pdf")) == expected_texts(workdir, "b.pdf")
+
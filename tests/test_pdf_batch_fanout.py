@@ -0,0 +1,37 @@
+import pytest
+
+from autopsy.core.pdf_batch_fanout import DEFAULT_RELEASE_PATTERN, derive_output_name, fan_out
+from tests.pdf_fixtures import batch
+
+
+@pytest.mark.parametrize("directory, expected", [
+    ("/jobs/A031111-2", "REL_2_A031111"),  # folder code sliced in, release number replaced
+    ("/jobs/A031111", "REL_1_A031111"),  # no release number: only the folder code changes
+])
+def test_derive_output_name(directory, expected):
+    assert derive_output_name("REL_1_A000000", directory, [-7], [-1], DEFAULT_RELEASE_PATTERN) == expected
+
+
+def test_derive_output_name_cuts_the_second_range():
+    assert derive_output_name("REL_1_A000000_draft", "/jobs/B1-3", [-13, -6], [-7, -1], "") == "REL_1_B1"
+
+
+def test_bad_release_pattern_raises():
+    with pytest.raises(ValueError, match="Invalid release pattern"):
+        derive_output_name("REL_1_A000000", "/jobs/A031111-2", [-7], [-1], "(REL_")
+
+
+def test_fan_out_retargets_every_batch(tmp_path):
+    directories = [str(tmp_path / "A031111-2"), str(tmp_path / "A042222-5")]
+    config_data = fan_out([batch(tmp_path, 1, "REL_1_A000000")], directories)
+    assert [(spec["working_directory"], spec["output_name"]) for spec in config_data] == [
+        (directories[0], "REL_2_A031111"), (directories[1], "REL_5_A042222")
+    ]
+
+
+def test_fan_out_rejects_outputs_two_directories_would_write(tmp_path):
+    directories = [str(tmp_path / "A031111-2"), str(tmp_path / "A042222-5")]
+    template = [batch(tmp_path, 1, "../combined", ("=a.pdf",))]
+    template[0]["slice_start"] = template[0]["slice_end"] = ""  # keep the name as it is
+    with pytest.raises(ValueError, match="would both write"):
+        fan_out(template, directories)
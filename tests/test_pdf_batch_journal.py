@@ -0,0 +1,83 @@
+import os
+import json
+
+from autopsy.batch.cli import main
+from autopsy.core import pdf_batch_journal
+from autopsy.core.pdf_batch_events import BATCH_FINISHED, BATCH_UP_TO_DATE, BATCH_WRITTEN, ERROR
+from autopsy.core.pdf_batch_journal import CheckpointJournal, batch_key, iter_checkpointed_events
+from tests.pdf_fixtures import batch, expected_texts, kinds, output_texts, page_texts, write_config
+
+
+def run(config_data, journal_path, resume=False, **options):
+    return list(iter_checkpointed_events(config_data, str(journal_path), resume, **options))
+
+
+def test_resume_skips_intact_outputs_without_hashing(workdir, tmp_path, monkeypatch):
+    config_data = [batch(workdir)]
+    journal_path = tmp_path / "c.journal"
+    run(config_data, journal_path)
+    record = next(iter(CheckpointJournal(str(journal_path)).load().values()))
+    assert "mtime_ns" in record and "sha256" not in record
+
+    def no_hashing(path):
+        raise AssertionError("intact outputs must not be hashed")
+
+    monkeypatch.setattr(pdf_batch_journal, "hash_file", no_hashing)
+    written = os.stat(os.path.join(str(workdir), "out.pdf")).st_mtime_ns
+    events = run(config_data, journal_path, resume=True)
+    assert kinds(events) == [BATCH_UP_TO_DATE, BATCH_FINISHED]
+    assert os.stat(os.path.join(str(workdir), "out.pdf")).st_mtime_ns == written
+    assert output_texts(config_data[0]) == expected_texts(workdir, "a.pdf", "b.pdf")
+
+
+def test_resume_rebuilds_modified_output(workdir, tmp_path):
+    config_data = [batch(workdir)]
+    journal_path = tmp_path / "c.journal"
+    run(config_data, journal_path)
+    output = os.path.join(str(workdir), "out.pdf")
+    with open(output, "r+b") as f:
+        f.truncate(100)  # a torn output from a dropped network drive
+    events = run(config_data, journal_path, resume=True)
+    assert BATCH_WRITTEN in kinds(events)
+    assert output_texts(config_data[0]) == expected_texts(workdir, "a.pdf", "b.pdf")
+
+
+def test_legacy_sha256_record_still_verifies(workdir, tmp_path):
+    config_data = [batch(workdir)]
+    journal_path = tmp_path / "c.journal"
+    run(config_data, journal_path)
+    journal = CheckpointJournal(str(journal_path))
+    record = next(iter(journal.load().values()))
+    output = os.path.join(str(workdir), "out.pdf")
+    del record["mtime_ns"]
+    record["sha256"] = pdf_batch_journal.hash_file(output)
+    with open(journal_path, "w") as f:
+        f.write(json.dumps(record) + "\n")
+    assert journal.verified_batches(config_data) == {batch_key(1, output)}
+
+
+def test_unwritable_journal_reports_error_and_still_merges(workdir, tmp_path):
+    journal_path = tmp_path / "missing" / "c.journal"
+    events = run([batch(workdir)], journal_path)
+    errors = [event for event in events if event.kind == ERROR]
+    assert len(errors) == 1 and errors[0].batch_number is None
+    assert BATCH_WRITTEN in kinds(events)
+    assert page_texts(os.path.join(str(workdir), "out.pdf")) == expected_texts(workdir, "a.pdf", "b.pdf")
+
+
+def test_shared_journal_keeps_every_config(workdir, tmp_path, capsys):
+    first = write_config(tmp_path / "first.json", [batch(workdir, 1, "one", ("=a.pdf",))])
+    second = write_config(tmp_path / "second.json", [batch(workdir, 1, "two", ("=b.pdf",))])
+    journal_path = str(tmp_path / "shared.journal")
+    assert main([first, second, "--journal", journal_path]) == 0
+    outputs = {record["output"] for record in CheckpointJournal(journal_path).load().values()}
+    assert {os.path.basename(output) for output in outputs} == {"one.pdf", "two.pdf"}
+
+    assert page_texts(str(workdir / "one.pdf")) == expected_texts(workdir, "a.pdf")
+    assert page_texts(str(workdir / "two.pdf")) == expected_texts(workdir, "b.pdf")
+
+    written = {name: (workdir / name).stat().st_mtime_ns for name in ("one.pdf", "two.pdf")}
+    capsys.readouterr()
+    assert main([first, second, "--journal", journal_path, "--resume"]) == 0
+    assert capsys.readouterr().out.count("checkpoint verified") == 2
+    assert {name: (workdir / name).stat().st_mtime_ns for name in written} == written
@@ -0,0 +1,93 @@
+import os
+import json
+
+import pytest
+
+from autopsy.batch.cli import main
+from autopsy.core.pdf_batch_core import batch_output_options, get_output_path
+from autopsy.core.pdf_batch_events import WARNING, STATUS_UP_TO_DATE, STATUS_WRITTEN
+from autopsy.core.pdf_batch_journal import spec_hash
+from autopsy.core.pdf_batch_manifest import load_manifest, manifest_path
+from tests.pdf_fixtures import batch, expected_texts, kinds, make_pdf, output_texts, run_batch
+
+
+def status(spec, **options):
+    return run_batch(spec, **options)[-1].status
+
+
+def test_unchanged_batch_is_up_to_date(workdir):
+    spec = batch(workdir)
+    assert status(spec) == STATUS_WRITTEN
+    written = os.stat(get_output_path(spec)).st_mtime_ns
+    assert status(spec) == STATUS_UP_TO_DATE
+    assert os.stat(get_output_path(spec)).st_mtime_ns == written  # not rewritten
+    assert output_texts(spec) == expected_texts(workdir, "a.pdf", "b.pdf")
+
+
+def test_changed_input_is_merged_again(workdir):
+    spec = batch(workdir)
+    assert status(spec) == STATUS_WRITTEN
+    make_pdf(str(workdir / "b.pdf"), pages=1, label="new b")
+    assert status(spec) == STATUS_WRITTEN
+    assert output_texts(spec) == expected_texts(workdir, "a.pdf", "b.pdf")
+
+
+@pytest.mark.parametrize("first, second", [
+    ({}, {"backend": "fitz"}),
+    ({"backend": "fitz"}, {"backend": "fitz", "links": False}),
+    ({}, {"streaming": True}),
+])
+def test_output_affecting_options_force_a_rebuild(workdir, first, second):
+    spec = batch(workdir, patterns=("=a.pdf", "=b.pdf"))
+    assert status(spec, **first) == STATUS_WRITTEN
+    assert status(spec, **second) == STATUS_WRITTEN
+    assert status(spec, **second) == STATUS_UP_TO_DATE
+    assert output_texts(spec) == expected_texts(workdir, "a.pdf", "b.pdf")
+
+
+def test_options_a_backend_ignores_do_not_force_a_rebuild(workdir):
+    spec = batch(workdir, patterns=("=a.pdf", "=b.pdf"))
+    assert status(spec) == STATUS_WRITTEN
+    assert status(spec, links=False) == STATUS_UP_TO_DATE  # pypdf2 always copies links
+    assert batch_output_options(spec, links=False) == batch_output_options(spec)
+
+
+def test_batch_keys_override_run_options(workdir):
+    spec = dict(batch(workdir), backend="pymupdf", links=False)
+    assert batch_output_options(spec, backend="pypdf2") == {"backend": "fitz", "dedupe": False, "links": False}
+
+
+def test_manifest_of_an_older_version_is_ignored(workdir):
+    spec = batch(workdir)
+    status(spec)
+    path = manifest_path(get_output_path(spec))
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest["version"] = 1
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+    assert load_manifest(get_output_path(spec)) is None
+    assert status(spec) == STATUS_WRITTEN
+
+
+def test_journal_spec_hash_covers_options(workdir):
+    spec = batch(workdir)
+    assert spec_hash(spec, {"backend": "fitz"}) != spec_hash(spec)
+    assert spec_hash(spec, {"backend": "fitz", "links": False}) != spec_hash(spec, {"backend": "fitz"})
+
+
+def test_fitz_batch_asking_to_stream_warns_and_is_built(workdir):
+    spec = batch(workdir)
+    events = run_batch(spec, backend="fitz", streaming=True)
+    assert kinds(events).count(WARNING) == 1
+    assert events[-1].status == STATUS_WRITTEN
+    assert output_texts(spec) == expected_texts(workdir, "a.pdf", "b.pdf")
+
+
+def test_cli_rejects_stream_with_fitz(workdir, tmp_path, capsys):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps([batch(workdir)]))
+    with pytest.raises(SystemExit) as exc:
+        main([str(config), "--stream", "--backend", "fitz"])
+    assert exc.value.code == 2
+    assert "--stream is not supported" in capsys.readouterr().err
@@ -0,0 +1,36 @@
+from autopsy.core.pdf_batch_planner import PAGE_SECONDS, format_page_ranges, page_ranges, plan_batch
+from tests.pdf_fixtures import batch, make_pdf
+
+
+def test_page_ranges_are_one_based_and_inclusive():
+    assert page_ranges([0, 1, 2, 5, 7, 8]) == [[1, 3], [6, 6], [8, 9]]
+    assert format_page_ranges(page_ranges([0, 1, 2, 5, 7, 8])) == "1-3,6,8-9"
+    assert page_ranges([]) == []
+
+
+def test_plan_resolves_pages_like_the_merge(tmp_path):
+    make_pdf(str(tmp_path / "a.pdf"), pages=10)
+    spec = batch(tmp_path, patterns=("a.pdf",))
+    spec["files"][0].update(include="FIRST-3, 8-LAST", exclude="9")
+    plan = plan_batch(spec)
+    assert plan.error is None
+    assert plan.files[0].pages == [[1, 3], [8, 8], [10, 10]]
+    assert plan.total_pages == 5
+
+
+def test_estimate_follows_backend_and_links(tmp_path):
+    make_pdf(str(tmp_path / "a.pdf"), pages=10)
+    spec = batch(tmp_path)
+    seconds = {
+        key: plan_batch(spec, **options).estimated_seconds
+        for key, options in {"pypdf2": {}, "fitz": {"backend": "fitz"},
+                             "fitz-nolinks": {"backend": "pymupdf", "links": False}}.items()
+    }
+    read_seconds = seconds["pypdf2"] - 10 * PAGE_SECONDS["pypdf2"]
+    for key, value in seconds.items():
+        assert abs(value - (10 * PAGE_SECONDS[key] + read_seconds)) < 1e-3
+
+
+def test_unknown_backend_is_reported(tmp_path):
+    make_pdf(str(tmp_path / "a.pdf"))
+    assert "Unknown merge backend" in plan_batch(batch(tmp_path), backend="nope").error
@@ -0,0 +1,60 @@
+import os
+import time
+import threading
+
+from autopsy.core.pdf_batch_core import iter_merge_events
+from autopsy.core.pdf_batch_events import BATCH_FINISHED, BATCH_WRITTEN
+from autopsy.core.pdf_batch_watch import BatchWatcher, affected_batches, diff_snapshots, snapshot_directory
+from tests.pdf_fixtures import batch, expected_texts, make_pdf, page_texts
+
+
+def two_batches(directory):
+    return [batch(directory, 1, "one", ("=a.pdf",)), batch(directory, 2, "two", ("=b.pdf",))]
+
+
+def test_diff_snapshots_reports_added_removed_and_modified():
+    old = {"a.pdf": (10, 1), "b.pdf": (20, 2), "c.pdf": (30, 3)}
+    new = {"a.pdf": (10, 1), "b.pdf": (20, 5), "d.pdf": (40, 4)}
+    assert diff_snapshots(old, new) == {"b.pdf", "c.pdf", "d.pdf"}
+    assert diff_snapshots(new, dict(new)) == set()
+
+
+def test_changed_input_affects_only_the_batch_that_uses_it(workdir):
+    config_data = two_batches(workdir)
+    before = snapshot_directory(str(workdir))
+    make_pdf(str(workdir / "a.pdf"), pages=4)
+    changes = {os.path.normcase(str(workdir)): diff_snapshots(before, snapshot_directory(str(workdir)))}
+    assert changes[os.path.normcase(str(workdir))] == {"a.pdf"}
+    assert affected_batches(config_data, changes) == [config_data[0]]
+
+
+def test_own_output_is_not_a_trigger_but_removed_inputs_are(workdir):
+    spec = batch(workdir, 1, "out", (".pdf",))
+    key = os.path.normcase(str(workdir))
+    assert affected_batches([spec], {key: {"out.pdf"}}) == []
+    assert affected_batches([spec], {key: {"gone.pdf"}}) == [spec]
+    assert affected_batches([spec], {os.path.normcase(str(workdir / "elsewhere")): {"a.pdf"}}) == []
+
+
+def test_watcher_rebuilds_only_the_affected_batch(workdir):
+    config_data = two_batches(workdir)
+    list(iter_merge_events(config_data))
+    events = []
+    rebuilt = threading.Event()
+
+    def on_event(event):
+        events.append(event)
+        if event.kind == BATCH_FINISHED:
+            rebuilt.set()
+
+    watcher = BatchWatcher(config_data, on_event, debounce=0.1, poll_interval=0.05, polling=True)
+    watcher.start()
+    try:
+        time.sleep(0.3)  # let the poller take its first snapshot
+        make_pdf(str(workdir / "a.pdf"), pages=4)
+        assert rebuilt.wait(10)
+    finally:
+        watcher.stop()
+    assert {event.batch_number for event in events} == {1}
+    assert BATCH_WRITTEN in [event.kind for event in events]
+    assert page_texts(str(workdir / "one.pdf")) == expected_texts(workdir, "a.pdf")
@@ -0,0 +1,171 @@
+import io
+import os
+
+import fitz
+import pytest
+from PIL import Image
+
+from autopsy.core import pdf_compress_core
+from autopsy.core.pdf_compress_core import (
+    KEEP_QUALITY, MAX_QUALITY, MIN_QUALITY, MIN_SCALE, SCALE_STEP,
+    _choose_jpeg_settings, _image_table, compress_pdf_report
+)
+from tests.pdf_fixtures import jpeg_bytes, make_pdf, png_bytes
+
+
+def test_image_table_matches_images_by_content(tmp_path):
+    photo, line_art = jpeg_bytes(), png_bytes()
+    src = fitz.open(make_pdf(str(tmp_path / "src.pdf"), pages=2, images=[photo, line_art]))
+    dst = fitz.open(make_pdf(str(tmp_path / "dst.pdf"), pages=2, images=[line_art, photo, photo]))
+    table = _image_table(src, dst)
+    assert sorted(dst_xref for dst_xref, _, _ in table) == sorted({img[0] for page in dst for img in page.get_images()})
+    for dst_xref, src_xref, page_num in table:
+        assert src_xref is not None
+        assert src.xref_stream_raw(src_xref) == dst.xref_stream_raw(dst_xref)
+
+
+def test_recompress_errors_are_reported_as_failed(tmp_path, monkeypatch):
+    source = make_pdf(str(tmp_path / "in.pdf"), pages=2, images=[jpeg_bytes(quality=95)])
+
+    def broken(*args, **kwargs):
+        raise OSError("decoder exploded")
+
+    monkeypatch.setattr(pdf_compress_core, "_recompress_image", broken)
+    report = compress_pdf_report(source, str(tmp_path / "out.pdf"), quality=30)
+    assert report.images and {image.status for image in report.images} == {"failed"}
+    assert all(image.error == "decoder exploded" and image.new_bytes is None for image in report.images)
+    assert sum(page.images_failed for page in report.pages) == sum(len(image.pages) for image in report.images)
+    assert report.failed_bytes == sum(image.original_bytes for image in report.images)
+    assert f"{len(report.images)} failed" in report.summary()
+
+
+def test_write_errors_are_reported_as_failed(tmp_path, monkeypatch):
+    source = make_pdf(str(tmp_path / "in.pdf"), pages=1, images=[jpeg_bytes(quality=95)])
+
+    def broken(self, xref, stream, **kwargs):
+        raise RuntimeError("cannot replace")
+
+    monkeypatch.setattr(fitz.Document, "update_stream", broken)
+    report = compress_pdf_report(source, str(tmp_path / "out.pdf"), quality=30)
+    [image] = report.images
+    assert image.status == "failed" and image.error == "cannot replace"
+    assert image.saved_bytes == 0
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_compressed_output_keeps_every_page(tmp_path, workers):
+    source = make_pdf(str(tmp_path / "in.pdf"), pages=3, images=[jpeg_bytes(quality=95), png_bytes()])
+    output = str(tmp_path / "out.pdf")
+    report = compress_pdf_report(source, output, quality=30, workers=workers)
+    assert report.count("saved") >= 1 and report.count("failed") == 0
+    with fitz.open(output) as doc:
+        assert len(doc) == 3
+        assert all(len({img[0] for img in page.get_images()}) == 2 for page in doc)
+
+
+def half_transparent_png(size=(200, 150)):
+    """Noisy red, opaque on the right half and 50% transparent on the left half."""
+    red = Image.effect_noise(size, 60).point(lambda v: 128 + v // 2)
+    black = Image.new("L", size, 0)
+    alpha = Image.new("L", size, 255)
+    alpha.paste(128, (0, 0, size[0] // 2, size[1]))
+    buf = io.BytesIO()
+    Image.merge("RGBA", (red, black, black, alpha)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_transparent_images_keep_their_alpha_and_object(tmp_path):
+    source = make_pdf(str(tmp_path / "in.pdf"), pages=2, images=[half_transparent_png()])
+    output = str(tmp_path / "out.pdf")
+    report = compress_pdf_report(source, output, quality=30)
+    [image] = report.images
+    assert image.status == "saved"
+    with fitz.open(source) as src, fitz.open(output) as out:
+        assert out.xref_length() <= src.xref_length()
+        for src_page, out_page in zip(src, out):
+            [info] = out_page.get_images(full=True)
+            assert info[1] != 0 and info[8] == "DCTDecode"  # re-encoded, soft mask still attached
+            assert len(out_page.get_contents()) == len(src_page.get_contents())
+            pixmap = out_page.get_pixmap()
+            assert pixmap.pixel(50, 175)[1] > 100  # white shows through the transparent half
+            assert pixmap.pixel(190, 175)[1] < 30
+
+
+def counting(estimate):
+    calls = []
+
+    def wrapped(quality, scale):
+        calls.append((quality, scale))
+        return estimate(quality, scale)
+    return wrapped, calls
+
+
+@pytest.mark.parametrize("target, expected", [
+    (10 ** 9, (MAX_QUALITY, 1.0)),  # everything fits
+    (70_500, (70, 1.0)),  # stage 1: quality at full size
+    (1, (MIN_QUALITY, MIN_SCALE)),  # nothing fits: smallest settings
+    (1_875, (30, MIN_SCALE)),  # stage 3: quality at MIN_SCALE
+])
+def test_choose_jpeg_settings_stages(target, expected):
+    estimate, calls = counting(lambda quality, scale: 1000 * quality * scale * scale)
+    assert _choose_jpeg_settings(estimate, target) == expected
+    assert len(calls) == len(set(calls)) <= 12  # bisection, each setting estimated once
+
+
+def test_choose_jpeg_settings_downscales_at_keep_quality():
+    estimate, _ = counting(lambda quality, scale: 1000 * quality * scale * scale)
+    target = 1000 * KEEP_QUALITY * 0.5 * 0.5
+    quality, scale = _choose_jpeg_settings(estimate, target)
+    assert quality == KEEP_QUALITY
+    assert 0.5 - SCALE_STEP <= scale <= 0.5
+    assert estimate(quality, scale) <= target
+
+
+@pytest.mark.parametrize("mode", ["preserve", "rasterize"])
+def test_target_size_is_reported_not_printed(tmp_path, capsys, mode):
+    images = [jpeg_bytes((600, 450), 95, seed) for seed in range(3)]
+    source = make_pdf(str(tmp_path / "in.pdf"), pages=4, images=images)
+    target_mb = os.path.getsize(source) / (1024 * 1024) / 3
+    report = compress_pdf_report(source, str(tmp_path / "out.pdf"), mode=mode, target_size_mb=target_mb)
+    assert capsys.readouterr().out == ""
+    assert report.target_bytes == int(target_mb * 1024 * 1024)
+    assert MIN_QUALITY <= report.quality <= MAX_QUALITY and MIN_SCALE <= report.scale <= 1.0
+    assert abs(report.output_bytes - report.estimated_bytes) < 0.25 * report.estimated_bytes
+    assert f"JPEG quality {report.quality}" in report.target_summary()
+
+
+def images_by_status(report):
+    return {image.status: image for image in report.images}
+
+
+def test_only_worthwhile_re_encodes_replace_images(tmp_path):
+    source = make_pdf(str(tmp_path / "in.pdf"), pages=2, images=[jpeg_bytes(quality=95), png_bytes()])
+    output = str(tmp_path / "out.pdf")
+    report = compress_pdf_report(source, output, quality=30)
+    saved, grown = images_by_status(report)["saved"], images_by_status(report)["grown"]
+    assert saved.new_bytes < saved.original_bytes and saved.saved_bytes == saved.original_bytes - saved.new_bytes
+    assert grown.new_bytes >= grown.original_bytes and grown.grown_bytes == grown.new_bytes - grown.original_bytes
+    with fitz.open(source) as src, fitz.open(output) as out:
+        raw_streams = {out.xref_stream_raw(img[0]) for img in out[0].get_images()}
+        assert src.xref_stream_raw(grown.xref) in raw_streams  # the original line art was kept
+        assert src.xref_stream_raw(saved.xref) not in raw_streams
+
+
+def test_savings_below_threshold_are_skipped(tmp_path):
+    source = make_pdf(str(tmp_path / "in.pdf"), pages=1, images=[jpeg_bytes(quality=95)])
+    report = compress_pdf_report(source, str(tmp_path / "out.pdf"), quality=85, min_savings=0.95)
+    [image] = report.images
+    assert image.status == "skipped" and image.new_bytes < image.original_bytes
+    assert image.saved_bytes == 0 and image.skipped_bytes == image.original_bytes
+
+
+def test_page_savings_count_shared_images_on_every_page(tmp_path):
+    source = make_pdf(str(tmp_path / "in.pdf"), pages=3, images=[jpeg_bytes(quality=95), png_bytes()])
+    report = compress_pdf_report(source, str(tmp_path / "out.pdf"), quality=30)
+    saved, grown = images_by_status(report)["saved"], images_by_status(report)["grown"]
+    assert saved.pages == grown.pages == [0, 1, 2]
+    assert [page.page for page in report.pages] == [0, 1, 2]
+    for page in report.pages:
+        assert (page.images_saved, page.images_grown, page.images_skipped, page.images_failed) == (1, 1, 0, 0)
+        assert page.saved_bytes == saved.saved_bytes and page.grown_bytes == grown.grown_bytes
+    assert report.saved_bytes == saved.saved_bytes  # counted once document-wide
@@ -0,0 +1,60 @@
+import fitz
+import pytest
+
+from autopsy.core.pdf_batch_events import STATUS_UP_TO_DATE, STATUS_WRITTEN
+from tests.pdf_fixtures import batch, expected_texts, jpeg_bytes, make_pdf, page_texts, run_batch
+
+MODES = [{"backend": "pypdf2"}, {"backend": "pypdf2", "streaming": True}, {"backend": "fitz"}]
+
+
+def add_links(path, uri="https://example.com/spec"):
+    """Give every page an identical link annotation (no /P, so the dicts are byte-identical)."""
+    doc = fitz.open(path)
+    for page in doc:
+        page.insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(40, 300, 200, 320), "uri": uri})
+    doc.saveIncr()
+    doc.close()
+
+
+@pytest.fixture
+def logo_dir(tmp_path):
+    """Two inputs that embed the same logo and carry identical link annotations."""
+    logo = jpeg_bytes((400, 300))
+    for name in ("a", "b"):
+        path = str(tmp_path / f"{name}.pdf")
+        make_pdf(path, pages=2, images=(logo,))
+        add_links(path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("options", MODES)
+def test_dedupe_shares_images_but_not_annotations(logo_dir, options):
+    plain = run_batch(batch(logo_dir, output_name="plain", patterns=("=a.pdf", "=b.pdf")), **options)[-1]
+    deduped = run_batch(
+        batch(logo_dir, output_name="deduped", patterns=("=a.pdf", "=b.pdf")), dedupe=True, **options
+    )[-1]
+    assert deduped.status == STATUS_WRITTEN
+    assert deduped.saved_bytes > 0
+    assert deduped.bytes < plain.bytes
+
+    assert page_texts(str(logo_dir / "deduped.pdf")) == expected_texts(logo_dir, "a.pdf", "b.pdf")
+    with fitz.open(str(logo_dir / "deduped.pdf")) as doc:
+        image_xrefs = {img[0] for page in doc for img in page.get_images(full=True)}
+        annot_xrefs = [xref for page in doc for xref in page.annot_xrefs()]
+        uris = [link["uri"] for page in doc for link in page.get_links()]
+        assert len(image_xrefs) == 1
+        assert len(annot_xrefs) == doc.page_count == 4
+        assert len(set(annot_xrefs)) == len(annot_xrefs)
+        assert uris == ["https://example.com/spec"] * 4
+
+
+def test_turning_on_dedupe_rebuilds_an_up_to_date_output(logo_dir):
+    spec = batch(logo_dir, patterns=("=a.pdf", "=b.pdf"))
+    assert run_batch(spec)[-1].status == STATUS_WRITTEN
+    assert run_batch(spec)[-1].status == STATUS_UP_TO_DATE
+    before = (logo_dir / "out.pdf").stat().st_size
+    event = run_batch(spec, dedupe=True)[-1]
+    assert event.status == STATUS_WRITTEN
+    assert event.saved_bytes > 0
+    assert (logo_dir / "out.pdf").stat().st_size < before
+    assert run_batch(spec, dedupe=True)[-1].status == STATUS_UP_TO_DATE
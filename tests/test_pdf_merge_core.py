@@ -0,0 +1,27 @@
+from autopsy.core.pdf_merge_core import merge_selected_pdfs, selections_from_pages
+from tests.pdf_fixtures import make_pdf, page_texts
+
+
+class Checkbox:
+    def __init__(self, checked):
+        self.checked = checked
+
+    def isChecked(self):
+        return self.checked
+
+
+def test_merge_selected_pdfs_keeps_file_and_page_order(tmp_path):
+    a = make_pdf(str(tmp_path / "a.pdf"), pages=5)
+    b = make_pdf(str(tmp_path / "b.pdf"), pages=3)
+    checked = {a: [0, 1, 2, 4], b: [0, 2]}
+    pages_to_include = {
+        (path, page): Checkbox(page in checked[path])
+        for path, total in ((a, 5), (b, 3)) for page in range(total)
+    }
+    assert selections_from_pages([b, a], {a: [4, 2, 1, 0], b: [2, 0]}) == [(b, [(0, 1), (2, 3)]), (a, [(0, 3), (4, 5)])]
+
+    result = merge_selected_pdfs([b, a], pages_to_include, str(tmp_path / "out.pdf"))
+    assert (result.pages, result.files) == (6, 2)
+    assert page_texts(result.output_path) == [
+        "b page 1", "b page 3", "a page 1", "a page 2", "a page 3", "a page 5"
+    ]
@@ -0,0 +1,108 @@
+import re
+
+import fitz
+import pytest
+
+from autopsy.core import pdf_page_analysis
+from autopsy.core.pdf_compress_core import TEXT_THRESHOLD, _classify_page, compress_pdf_report
+from autopsy.core.pdf_page_analysis import (
+    PageAnalysisCache, PageFeatures, analyze_document, analyze_page, document_digest
+)
+from tests.pdf_fixtures import jpeg_bytes, make_pdf
+
+
+def visible_chars(page):
+    return len(re.sub(r"\s", "", page.get_text()))
+
+
+def page_with_content(content):
+    """A page that uses the Helvetica font resource /helv and shows content as its content stream."""
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=300)
+    page.insert_text((20, 40), "x", fontname="helv")
+    doc.update_stream(page.get_contents()[0], content)
+    return doc, page
+
+
+def nested_document():
+    """A page drawing, twice, a form that draws a form with simple and CID-font text."""
+    inner = fitz.open()
+    page = inner.new_page(width=300, height=300)
+    page.insert_text((20, 40), "inner simple text", fontname="helv")
+    page.insert_text((20, 80), "你好世界", fontname="china-s")
+    page.draw_line((0, 0), (300, 300))
+    middle = fitz.open()
+    page = middle.new_page(width=300, height=300)
+    page.show_pdf_page(page.rect, inner, 0)
+    page.insert_text((20, 200), "middle", fontname="tiro")
+    outer = fitz.open()
+    page = outer.new_page(width=300, height=300)
+    page.show_pdf_page(fitz.Rect(0, 0, 150, 150), middle, 0)
+    page.show_pdf_page(fitz.Rect(150, 150, 300, 300), middle, 0)
+    return outer
+
+
+def test_text_chars_follow_fonts_and_nested_forms():
+    doc = nested_document()
+    features = analyze_page(doc[0])
+    assert features.text_chars == visible_chars(doc[0]) == 2 * len("innersimpletext你好世界middle")
+    assert features.text_ops == 6
+    assert features.paths == 2  # the line inside the innermost form, drawn twice
+
+
+def test_strings_are_decoded_and_whitespace_ignored():
+    doc, page = page_with_content(
+        b"BT /helv 11 Tf 20 40 Td (a\\(b\\)c) Tj ( \\t ) Tj [(d) -250 ( ) 120 <6566>] TJ (\\101\\102) Tj ET"
+    )
+    features = analyze_page(page)
+    assert features.text_ops == 4
+    assert features.text_chars == len("a(b)cdefAB") == visible_chars(page)
+
+
+def test_operators_inside_strings_and_inline_images_are_not_counted():
+    doc, page = page_with_content(
+        b"BT /helv 11 Tf 20 40 Td (S f B Do) Tj ET 0 0 m 10 10 l S "
+        b"q 10 0 0 10 50 50 cm BI /W 1 /H 1 /CS /G /BPC 8 ID S\xff EI Q"
+    )
+    features = analyze_page(page)
+    assert (features.paths, features.text_ops, features.image_count) == (1, 1, 1)
+    assert features.text_chars == len("SfBDo")
+
+
+def test_analysis_is_cached_by_content(tmp_path):
+    source = make_pdf(str(tmp_path / "a.pdf"), pages=2)
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(open(source, "rb").read())
+    cache = PageAnalysisCache(str(tmp_path / "analysis.db"))
+    with fitz.open(source) as doc:
+        pages = analyze_document(doc, source, cache)
+    assert cache.get(document_digest(str(copy))) == pages  # a copy has the same digest
+    cache.close()
+
+
+@pytest.mark.parametrize("features, skip_text, skip_vector, expected", [
+    (PageFeatures(text_ops=5, text_chars=TEXT_THRESHOLD), True, False, True),
+    (PageFeatures(text_ops=5, text_chars=TEXT_THRESHOLD - 1), True, False, False),
+    (PageFeatures(text_ops=5, text_chars=TEXT_THRESHOLD, image_count=3), True, False, False),
+    (PageFeatures(paths=4, image_count=3), False, True, True),
+    (PageFeatures(paths=4, image_count=3, max_image_area=10 ** 6), False, True, False),
+    (PageFeatures(text_ops=0, text_chars=10 ** 4), True, False, False),
+])
+def test_classify_page(features, skip_text, skip_vector, expected):
+    skip, message = _classify_page(0, features, skip_text, skip_vector)
+    assert skip is expected and message.startswith("Page 1:")
+
+
+def test_rasterize_reports_kept_pages_instead_of_printing(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(pdf_page_analysis, "_default_cache", False)  # keep the user's cache out of it
+    doc = fitz.open()
+    doc.insert_pdf(fitz.open(make_pdf(str(tmp_path / "photo.pdf"), pages=1, images=[jpeg_bytes((600, 450))])))
+    page = doc.new_page(width=300, height=400)
+    for line in range(20):
+        page.insert_text((20, 20 + line * 15), "Lorem ipsum dolor sit amet %d" % line, fontname="helv")
+    source = str(tmp_path / "in.pdf")
+    doc.save(source)
+    report = compress_pdf_report(source, str(tmp_path / "out.pdf"), mode="rasterize", skip_text_rich=True)
+    assert capsys.readouterr().out == ""
+    assert report.kept_pages == [1]
+    assert len(report.messages) == 2 and "Skipping rasterization" in report.messages[1]
@@ -0,0 +1,36 @@
+from PyPDF2 import PdfReader
+
+from autopsy.core.pdf_batch_backends import BackendPool
+from autopsy.core.pdf_batch_core import get_output_path
+from autopsy.core.pdf_batch_events import STATUS_WRITTEN
+from tests.pdf_fixtures import batch, jpeg_bytes, make_pdf, page_texts, png_bytes, run_batch
+
+import fitz
+
+
+def test_streamed_output_keeps_compressed_streams_readable(workdir):
+    make_pdf(str(workdir / "c.pdf"), images=(jpeg_bytes(), png_bytes()))
+    spec = batch(workdir)
+    events = run_batch(spec, streaming=True)
+    assert events[-1].status == STATUS_WRITTEN
+
+    output = get_output_path(spec)
+    expected = page_texts(str(workdir / "a.pdf")) + page_texts(str(workdir / "b.pdf")) + page_texts(str(workdir / "c.pdf"))
+    assert page_texts(output) == expected
+    assert [page.extract_text().strip() for page in PdfReader(output).pages] == expected
+
+    # Image streams are copied raw with their /Filter and still decode to the same bytes.
+    with fitz.open(str(workdir / "c.pdf")) as src, fitz.open(output) as out:
+        src_images = [src.extract_image(img[0])["image"] for img in src[0].get_images(full=True)]
+        out_images = [out.extract_image(img[0])["image"] for img in out[6].get_images(full=True)]
+    assert out_images == src_images
+
+
+def test_streaming_releases_sources_but_buffered_keeps_them(workdir):
+    backends = BackendPool()
+    run_batch(batch(workdir, patterns=("=a.pdf", "=b.pdf")), backends=backends, streaming=True)
+    assert len(backends.get().sources) == 0
+
+    backends = BackendPool()
+    run_batch(batch(workdir, output_name="buffered", patterns=("=a.pdf", "=b.pdf")), backends=backends)
+    assert len(backends.get().sources) == 2
@@ -0,0 +1,40 @@
+import sqlite3
+
+from autopsy.core import pdf_thumbnail_cache
+from autopsy.core.pdf_thumbnail_cache import ThumbnailCache
+
+
+def last_used(cache_path, page):
+    with sqlite3.connect(cache_path) as conn:
+        return conn.execute("SELECT last_used FROM thumbnails WHERE page = ?", (page,)).fetchone()[0]
+
+
+def test_hits_are_written_back_in_batches(workdir, tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_thumbnail_cache, "TOUCH_FLUSH_THRESHOLD", 3)
+    cache_path = str(tmp_path / "thumbs.db")
+    source = str(workdir / "a.pdf")
+    cache = ThumbnailCache(cache_path)
+    for page in range(3):
+        cache.put(source, page, 100, b"png%d" % page)
+    stored = last_used(cache_path, 0)
+
+    assert cache.get(source, 0, 100) == b"png0"
+    assert last_used(cache_path, 0) == stored  # noted in memory only
+    cache.get(source, 1, 100)
+    cache.get(source, 2, 100)
+    assert last_used(cache_path, 0) > stored  # threshold reached: one write for all three
+
+    cache.get(source, 0, 100)
+    cache.close()
+    assert ThumbnailCache(cache_path).get(source, 0, 100) == b"png0"
+
+
+def test_pending_hits_count_for_eviction(workdir, tmp_path):
+    source = str(workdir / "a.pdf")
+    cache = ThumbnailCache(str(tmp_path / "thumbs.db"), max_bytes=250)
+    cache.put(source, 0, 100, b"x" * 100)
+    cache.put(source, 1, 100, b"x" * 100)
+    cache.get(source, 0, 100)  # page 0 is now the most recently used
+    cache.put(source, 2, 100, b"x" * 100)
+    assert cache.get(source, 0, 100) is not None
+    assert cache.get(source, 1, 100) is None